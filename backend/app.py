@@ -1,77 +1,264 @@
-from flask import Flask, render_template, request, jsonify, send_file
+import time
+
+# Start of this module's import; the total is checked against IMPORT_BUDGET_MS
+_import_started = time.perf_counter()
+
+from flask import (Flask, Response, jsonify, make_response, render_template, request, send_file,
+                   stream_with_context, url_for)
 from flask_cors import CORS
 import io
+import math
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor, wait
 import re
-import requests
+import tempfile
 import json
-import urllib3
+import warnings
+import zipfile
+
+from lazy import lazy_import
 
-# Disable SSL warnings for testing (not recommended for production)
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+# The HTTP client stack is only needed by the /test-*, /discover and /export
+# routes, so it is imported on first use rather than at startup
+requests = lazy_import('requests')
 
-from controllers import (
-    generate_arduino_code,
-    generate_esp32_code,
-    generate_esp8266_code,
-    generate_python_code
+# Disable SSL warnings for testing (not recommended for production); matched by
+# message so urllib3 doesn't have to be imported for its warning class
+warnings.filterwarnings('ignore', message='Unverified HTTPS request')
+
+from controllers import TARGETS, load_generator, preload, status as controller_status
+from assets import AssetBundle
+from discovery import (
+    RESOURCE_TYPES,
+    DiscoveryCache,
+    DiscoveryError,
+    fetch_discovery_page,
+    iter_discovery,
+    prefix_slice,
+    resource_name
 )
+from export import csv_chunks, fetch_cin_page, iter_cins, ndjson_lines, to_onem2m_time
+from jobs import FINISHED, JobError, JobQueue
+from manifest import KINDS, name_targets, parse_manifest, targets_from_document
+from preview import PreviewHub
+from profiles import FILTER_COLUMNS, ProfileError, ProfileStore, deep_merge
+from probe import CircuitBreaker, CircuitOpenError, ProbeCache, timed_request, verify_ingest
+from profiling import RequestProfiler
+from ratelimit import MemoryBucketStore, RateLimitedError, RateLimiter, SQLiteBucketStore, host_key
+from validation import validate_request_config
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
 CORS(app)
 
+# Seconds an identical /test-get result is reused (0 disables caching;
+# concurrent identical probes are still coalesced into one upstream call)
+app.config['PROBE_CACHE_TTL'] = float(os.environ.get('PROBE_CACHE_TTL', '3'))
+
+# Per-host circuit breaker: after this many consecutive connection failures
+# or timeouts, calls to that host fail fast for BREAKER_RESET_TIMEOUT seconds
+# before a single half-open trial request is let through
+app.config['BREAKER_FAILURE_THRESHOLD'] = int(os.environ.get('BREAKER_FAILURE_THRESHOLD', '3'))
+app.config['BREAKER_RESET_TIMEOUT'] = float(os.environ.get('BREAKER_RESET_TIMEOUT', '30'))
+
+# Upper bound (seconds) for a whole /test-endpoints run and the number of
+# candidate bindings it will probe at once
+app.config['PROBE_DEADLINE'] = float(os.environ.get('PROBE_DEADLINE', '5'))
+app.config['PROBE_MAX_CANDIDATES'] = int(os.environ.get('PROBE_MAX_CANDIDATES', '8'))
+
+# /discover: seconds a cached AE/container listing is served as fresh, seconds
+# it may still be served (while refreshing in the background), listings kept
+# in memory (least recently used dropped first), and the lim= page size used
+# against the CSE
+app.config['DISCOVERY_TTL'] = float(os.environ.get('DISCOVERY_TTL', '60'))
+app.config['DISCOVERY_MAX_STALE'] = float(os.environ.get('DISCOVERY_MAX_STALE', '900'))
+app.config['DISCOVERY_MAX_ENTRIES'] = int(os.environ.get('DISCOVERY_MAX_ENTRIES', '256'))
+app.config['DISCOVERY_PAGE_SIZE'] = int(os.environ.get('DISCOVERY_PAGE_SIZE', '500'))
+
+# /export: CINs retrieved per request (lim=) and pages fetched ahead of the
+# one being streamed
+app.config['EXPORT_PAGE_SIZE'] = int(os.environ.get('EXPORT_PAGE_SIZE', '200'))
+app.config['EXPORT_PREFETCH'] = int(os.environ.get('EXPORT_PREFETCH', '2'))
+
+# Shared secret for /admin/* routes (sent as X-Admin-Token); unset leaves only
+# their read-only GETs open
+app.config['ADMIN_TOKEN'] = os.environ.get('ADMIN_TOKEN', '')
+
+# /preview: seconds a session's edits must pause before the code is regenerated
+app.config['PREVIEW_DEBOUNCE'] = float(os.environ.get('PREVIEW_DEBOUNCE', '0.15'))
+
+# Rebuild fingerprinted assets when their source files change (development)
+app.config['ASSETS_AUTO_RELOAD'] = os.environ.get('ASSETS_AUTO_RELOAD', '') == '1'
+
+# Request profiling: fraction of /generate and /test-* requests profiled
+# automatically (admins can also send X-Profile: 1), and profiles kept
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+app.config['PROFILE_KEEP'] = int(os.environ.get('PROFILE_KEEP', '50'))
+
+# /test-* token buckets: requests per minute and burst, per client IP and per
+# target CSE host:port (a rate of 0 disables that limit). RATE_LIMIT_DB keeps
+# the buckets in a local SQLite file so every worker process shares them.
+app.config['RATE_LIMIT_CLIENT_PER_MIN'] = float(os.environ.get('RATE_LIMIT_CLIENT_PER_MIN', '30'))
+app.config['RATE_LIMIT_CLIENT_BURST'] = int(os.environ.get('RATE_LIMIT_CLIENT_BURST', '10'))
+app.config['RATE_LIMIT_HOST_PER_MIN'] = float(os.environ.get('RATE_LIMIT_HOST_PER_MIN', '60'))
+app.config['RATE_LIMIT_HOST_BURST'] = int(os.environ.get('RATE_LIMIT_HOST_BURST', '20'))
+app.config['RATE_LIMIT_DB'] = os.environ.get('RATE_LIMIT_DB', '')
+
+# /jobs: directory for job artifacts, jobs generating at once, seconds a
+# finished job is kept, and the largest fleet one job may hold
+app.config['FLEET_JOBS_DIR'] = os.environ.get(
+    'FLEET_JOBS_DIR', os.path.join(tempfile.gettempdir(), 'onem2m-fleet-jobs'))
+app.config['FLEET_JOB_WORKERS'] = int(os.environ.get('FLEET_JOB_WORKERS', '2'))
+app.config['FLEET_JOB_TTL'] = float(os.environ.get('FLEET_JOB_TTL', '3600'))
+app.config['FLEET_JOB_MAX_TARGETS'] = int(os.environ.get('FLEET_JOB_MAX_TARGETS', '100000'))
+
+# Controller generators imported at startup instead of on first use: 'all' or
+# a comma-separated list of controller names (empty loads each on demand)
+app.config['PRELOAD_CONTROLLERS'] = os.environ.get('PRELOAD_CONTROLLERS', '')
+
+# Milliseconds importing this module may take before a warning is printed
+# (0 disables the check); see bench_startup.py
+app.config['IMPORT_BUDGET_MS'] = float(os.environ.get('IMPORT_BUDGET_MS', '400'))
+
+# SQLite file holding saved device profiles (created on first use)
+app.config['SAVED_PROFILES_DB'] = os.environ.get(
+    'SAVED_PROFILES_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'saved_profiles.db'))
+
+probe_cache = ProbeCache(ttl=app.config['PROBE_CACHE_TTL'])
+breaker = CircuitBreaker(
+    failure_threshold=app.config['BREAKER_FAILURE_THRESHOLD'],
+    reset_timeout=app.config['BREAKER_RESET_TIMEOUT']
+)
+
+discovery_cache = DiscoveryCache(
+    ttl=app.config['DISCOVERY_TTL'],
+    max_stale=app.config['DISCOVERY_MAX_STALE'],
+    max_entries=app.config['DISCOVERY_MAX_ENTRIES']
+)
+
+profiler = RequestProfiler(keep=app.config['PROFILE_KEEP'])
+
+saved_profiles = ProfileStore(app.config['SAVED_PROFILES_DB'])
+
+rate_limiter = RateLimiter(
+    {
+        'client': (app.config['RATE_LIMIT_CLIENT_PER_MIN'], app.config['RATE_LIMIT_CLIENT_BURST']),
+        'host': (app.config['RATE_LIMIT_HOST_PER_MIN'], app.config['RATE_LIMIT_HOST_BURST']),
+    },
+    store=SQLiteBucketStore(app.config['RATE_LIMIT_DB']) if app.config['RATE_LIMIT_DB'] else MemoryBucketStore()
+)
+
+# Minified, content-hashed UI assets served with immutable caching
+assets = AssetBundle(
+    app.static_folder,
+    ['style.css', 'configure.css', 'configure.js', 'generate.js'],
+    auto_reload=app.config['ASSETS_AUTO_RELOAD']
+)
+
+
+@app.context_processor
+def asset_helpers():
+    return {'asset_url': lambda name: url_for('asset', filename=assets.url_name(name))}
+
+
+def cached_page(html):
+    """Rendered page with an ETag so repeat loads get a 304"""
+    response = make_response(html)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+def breaker_failures():
+    """Upstream errors that count against a host's circuit breaker"""
+    return (requests.exceptions.Timeout, requests.exceptions.ConnectionError)
+
 
 # Basic routes
 @app.route('/')
 def index():
-    return render_template('controller_select.html')
+    return cached_page(render_template('controller_select.html'))
 
 
 @app.route('/configure/<controller>')
 def configure(controller):
-    valid_controllers = ['arduino_nano', 'esp32', 'esp8266', 'python']
-    if controller not in valid_controllers:
+    if controller not in TARGETS:
         return "Invalid controller", 400
-    return render_template('configure.html', controller=controller)
+    return cached_page(render_template('configure.html', controller=controller))
 
 
 @app.route('/generate-view')
 def generate_view():
-    return render_template('generate.html')
+    return cached_page(render_template('generate.html'))
+
+
+@app.route('/assets/<filename>')
+def asset(filename):
+    """Serve a fingerprinted asset; its URL changes whenever its content does"""
+    entry = assets.get(filename)
+    if entry is None:
+        return "Not found", 404
+
+    headers = {
+        'Cache-Control': 'public, max-age=31536000, immutable',
+        'Vary': 'Accept-Encoding',
+        'ETag': f'"{filename}"',
+    }
+    if request.headers.get('If-None-Match') == headers['ETag']:
+        return Response(status=304, headers=headers)
+    body = entry['body']
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        body = entry['gzip']
+        headers['Content-Encoding'] = 'gzip'
+    return Response(body, mimetype=entry['mimetype'], headers=headers)
+
 
+def build_code(data):
+    """Validate a generation config and run the matching generator.
 
-def validate_request_config(data, controller):
-    """Validate incoming config for URL/port and platform rules.
+    Returns:
+        Tuple of (code, filename, release_report); the report is None unless
+        a firmware sketch was built with the release profile
 
-    Returns (True, None) or (False, message)
+    Raises:
+        ValueError: If the config is invalid or the controller is unknown
     """
-    cse = (data.get('cse_url') or '').strip()
-    port = data.get('port')
-    protocol = data.get('protocol', 'https').lower()
+    controller = data.get('controller')
+    with profiler.span('validate_request_config'):
+        valid, msg = validate_request_config(data, controller)
+    if not valid:
+        raise ValueError(msg)
 
-    if not cse:
-        return False, 'CSE host is required.'
+    target = TARGETS.get(controller)
+    if target is None:
+        raise ValueError('Invalid controller')
 
-    if re.match(r'^https?://', cse, re.IGNORECASE):
-        return False, 'CSE host should not include a protocol (enter host only).'
+    # The first call for a controller imports its generator module
+    generator = load_generator(controller)
+    build = getattr(generator, 'build', None)
+    with profiler.span(target.entry):
+        code, report = build(data) if build else (generator(data), None)
+    return code, target.filename, report
+
+
+def render_code(data):
+    """build_code without the release report.
+
+    Returns:
+        Tuple of (code, filename)
+    """
+    code, filename, _ = build_code(data)
+    return code, filename
 
-    try:
-        p = int(port)
-        if not (1 <= p <= 65535):
-            return False, 'Port must be between 1 and 65535.'
-    except Exception:
-        return False, 'Port must be an integer.'
-    
-    # Validate protocol
-    if protocol not in ('http', 'https'):
-        return False, 'Protocol must be either http or https.'
-    
-    data['protocol'] = protocol  # Ensure protocol is in data for generators to use
 
-    if controller in ('esp32', 'esp8266', 'arduino_nano'):
-        if cse.lower() in ('localhost', '127.0.0.1', '::1'):
-            return False, 'Localhost is not allowed for microcontroller targets.'
+preview_hub = PreviewHub(render_code, debounce=app.config['PREVIEW_DEBOUNCE'])
 
-    return True, None
+fleet_jobs = JobQueue(
+    render_code,
+    app.config['FLEET_JOBS_DIR'],
+    workers=app.config['FLEET_JOB_WORKERS'],
+    ttl=app.config['FLEET_JOB_TTL']
+)
 
 
 @app.route('/generate', methods=['POST'])
@@ -82,30 +269,18 @@ def generate():
     print(f"[DEBUG] Received generate request for controller: {controller}")
     print(f"[DEBUG] Config data: {data}")
 
-    valid, msg = validate_request_config(data, controller)
-    if not valid:
-        print(f"[DEBUG] Validation failed: {msg}")
-        return jsonify({'error': msg}), 400
-
     try:
-        if controller == 'arduino_nano':
-            code = generate_arduino_code(data)
-            filename = 'onem2m_client.ino'
-        elif controller == 'esp32':
-            code = generate_esp32_code(data)
-            filename = 'onem2m_client.ino'
-        elif controller == 'esp8266':
-            code = generate_esp8266_code(data)
-            filename = 'onem2m_client.ino'
-        elif controller == 'python':
-            code = generate_python_code(data)
-            filename = 'onem2m_client.py'
-        else:
-            return jsonify({'error': 'Invalid controller'}), 400
-        
+        code, filename, report = build_code(data)
         print(f"[DEBUG] Code generated successfully, length: {len(code)}")
-        return jsonify({'code': code, 'filename': filename, 'controller': controller})
-        
+        body = {'code': code, 'filename': filename, 'controller': controller}
+        # Release-profile sketches come with their estimated savings
+        if report:
+            body['release_report'] = report
+        return jsonify(body)
+
+    except ValueError as e:
+        print(f"[DEBUG] Validation failed: {e}")
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"[ERROR] Failed to generate code: {str(e)}")
         import traceback
@@ -123,6 +298,433 @@ def download():
     return send_file(stream, as_attachment=True, download_name=filename, mimetype='text/plain')
 
 
+@app.errorhandler(JobError)
+def job_error(e):
+    return jsonify({'error': str(e)}), e.status
+
+
+def job_targets():
+    """Targets of a /jobs submission: an uploaded manifest file or a JSON body"""
+    upload = request.files.get('manifest')
+    if upload is not None:
+        kind = KINDS.get(os.path.splitext(upload.filename or '')[1].lower())
+        if kind is None:
+            raise JobError('Upload a .csv, .yaml, .yml or .json manifest.')
+        return parse_manifest(upload.read().decode('utf-8'), kind, upload.filename)
+    data = request.json
+    if isinstance(data, dict) and 'targets' in data:
+        data = data['targets']
+    return name_targets(targets_from_document(data), 'request')
+
+
+@app.route('/jobs', methods=['GET', 'POST'])
+def jobs_index():
+    """List fleet jobs (GET) or queue one for a manifest (POST)"""
+    if request.method == 'GET':
+        return jsonify({'jobs': fleet_jobs.list()})
+
+    try:
+        targets = job_targets()
+    except (ValueError, ImportError) as e:
+        raise JobError(str(e))
+    if not targets:
+        raise JobError('The manifest has no targets.')
+    if len(targets) > app.config['FLEET_JOB_MAX_TARGETS']:
+        raise JobError(f"At most {app.config['FLEET_JOB_MAX_TARGETS']} targets per job.", 413)
+
+    job = fleet_jobs.submit(targets)
+    print(f"[DEBUG] Queued fleet job {job['id']} with {job['total']} targets")
+    response = jsonify(job)
+    response.headers['Location'] = url_for('job_status', job_id=job['id'])
+    return response, 202
+
+
+@app.route('/jobs/<job_id>', methods=['GET', 'DELETE'])
+def job_status(job_id):
+    """Progress of one job (GET), or cancel it and remove its files (DELETE)"""
+    if request.method == 'DELETE':
+        fleet_jobs.delete(job_id)
+        return '', 204
+    return jsonify(fleet_jobs.get(job_id).snapshot())
+
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Stop a job; the targets generated so far stay downloadable"""
+    return jsonify(fleet_jobs.cancel(job_id))
+
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-Sent Events stream of a job's progress until it finishes"""
+    fleet_jobs.get(job_id)
+
+    def generate():
+        yield 'retry: 2000\n\n'
+        for snap in fleet_jobs.watch(job_id):
+            if snap is None:
+                yield ': keepalive\n\n'
+            else:
+                event = 'finished' if snap['state'] in FINISHED else 'progress'
+                yield f"event: {event}\ndata: {json.dumps(snap)}\n\n"
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/jobs/<job_id>/artifact')
+def job_artifact(job_id):
+    """Download a finished job's zip; Range requests fetch it in chunks"""
+    path = fleet_jobs.artifact(job_id)
+    return send_file(path, mimetype='application/zip', as_attachment=True,
+                     download_name=f'fleet-{job_id[:8]}.zip', conditional=True, max_age=0)
+
+
+@app.errorhandler(ProfileError)
+def profile_error(e):
+    return jsonify({'error': str(e)}), e.status
+
+
+def profile_name(data):
+    name = str(data.get('name') or '').strip()
+    if not name or len(name) > 128:
+        raise ProfileError('Profile name is required (at most 128 characters).')
+    return name
+
+
+def checked_profile_config(config):
+    """Raise ProfileError unless `config` would generate code"""
+    if not isinstance(config, dict):
+        raise ProfileError('Profile config must be an object.')
+    valid, msg = validate_request_config(config, config.get('controller'))
+    if not valid:
+        raise ProfileError(msg)
+    if config.get('controller') not in TARGETS:
+        raise ProfileError('Invalid controller')
+    return config
+
+
+@app.route('/saved-profiles', methods=['GET', 'POST'])
+def saved_profiles_index():
+    """Search saved profiles (GET, paged by name) or save a new one (POST)"""
+    if request.method == 'POST':
+        data = request.json or {}
+        profile = saved_profiles.create(profile_name(data), checked_profile_config(data.get('config')))
+        return jsonify(profile), 201
+
+    args = request.args
+    try:
+        limit = min(max(int(args.get('limit', 100)), 1), 500)
+    except ValueError:
+        raise ProfileError('limit must be a number.')
+    filters = {column: args[column] for column in FILTER_COLUMNS if args.get(column)}
+    profiles, next_after = saved_profiles.search(
+        prefix=args.get('prefix', ''), field=args.get('field', 'name'), filters=filters,
+        label=args.get('label') or None, after=args.get('after') or None, limit=limit)
+    return jsonify({'profiles': profiles, 'next_after': next_after})
+
+
+@app.route('/saved-profiles/<int:profile_id>', methods=['GET', 'PUT', 'DELETE'])
+def saved_profile(profile_id):
+    """Read, replace or delete one saved profile"""
+    if request.method == 'DELETE':
+        saved_profiles.delete(profile_id)
+        return '', 204
+    if request.method == 'PUT':
+        data = request.json or {}
+        config = checked_profile_config(data.get('config'))
+        return jsonify(saved_profiles.update(profile_id, config, name=data.get('name') and profile_name(data)))
+    return jsonify(saved_profiles.get(profile_id))
+
+
+@app.route('/saved-profiles/<int:profile_id>/clone', methods=['POST'])
+def clone_saved_profile(profile_id):
+    """Copy a profile under a new name with `overrides` merged into its config"""
+    data = request.json or {}
+    name = profile_name(data)
+    overrides = data.get('overrides') or {}
+    if not isinstance(overrides, dict):
+        raise ProfileError('overrides must be an object.')
+    checked_profile_config(deep_merge(saved_profiles.get(profile_id)['config'], overrides))
+    return jsonify(saved_profiles.clone(profile_id, name, overrides)), 201
+
+
+@app.route('/saved-profiles/regenerate', methods=['POST'])
+def regenerate_saved_profiles():
+    """Regenerate every profile targeting one CSE host as a zip of sketches/scripts.
+
+    Optional `overrides` (e.g. a new cse_url/port after a CSE move) are merged
+    into each config first and, with `save`, written back to the profiles.
+    """
+    data = request.json or {}
+    cse_url = str(data.get('cse_url') or '').strip()
+    if not cse_url:
+        raise ProfileError('cse_url is required.')
+    overrides = data.get('overrides') or {}
+    if not isinstance(overrides, dict):
+        raise ProfileError('overrides must be an object.')
+
+    matches = saved_profiles.by_host(cse_url, data.get('port'), data.get('controller'))
+    if not matches:
+        raise ProfileError(f'No saved profiles target {cse_url}.', 404)
+
+    report = {'generated': [], 'failed': {}}
+    stream = io.BytesIO()
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for profile_id, name, config in matches:
+            config = deep_merge(config, overrides)
+            try:
+                code, filename = render_code(config)
+            except ValueError as e:
+                report['failed'][name] = str(e)
+                continue
+            # Arduino IDE needs each sketch in a folder of the same name
+            safe = re.sub(r'[^A-Za-z0-9_.-]+', '_', name)
+            archive.writestr(f"{safe}/{safe}{os.path.splitext(filename)[1]}", code)
+            report['generated'].append(name)
+            if overrides and data.get('save'):
+                saved_profiles.update(profile_id, config)
+        archive.writestr('regenerate-report.json', json.dumps(report, indent=2))
+
+    print(f"[DEBUG] Regenerated {len(report['generated'])} profiles for {cse_url}, "
+          f"{len(report['failed'])} failed")
+    stream.seek(0)
+    return send_file(stream, as_attachment=True, mimetype='application/zip',
+                     download_name=f"profiles-{re.sub(r'[^A-Za-z0-9_.-]+', '_', cse_url)}.zip")
+
+
+def valid_preview_session(session_id):
+    return re.fullmatch(r'[A-Za-z0-9_-]{8,64}', session_id) is not None
+
+
+@app.route('/preview/<session_id>', methods=['POST'])
+def preview_update(session_id):
+    """Queue a config edit for a live preview session"""
+    if not valid_preview_session(session_id):
+        return jsonify({'error': 'Invalid preview session id.'}), 400
+    seq = preview_hub.submit(session_id, request.json or {})
+    return jsonify({'seq': seq}), 202
+
+
+@app.route('/preview/<session_id>/events')
+def preview_events(session_id):
+    """Server-Sent Events stream of debounced code diffs for a session"""
+    if not valid_preview_session(session_id):
+        return jsonify({'error': 'Invalid preview session id.'}), 400
+
+    def generate():
+        yield 'retry: 2000\n\n'
+        for event in preview_hub.stream(session_id):
+            if event is None:
+                yield ': keepalive\n\n'
+            else:
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+def admin_authorized(require_token=False):
+    """Check X-Admin-Token; without ADMIN_TOKEN only routes that don't
+    require_token are open"""
+    token = app.config.get('ADMIN_TOKEN')
+    if not token:
+        return not require_token
+    return request.headers.get('X-Admin-Token') == token
+
+
+def circuit_open_response(e):
+    response = jsonify({
+        'error': f'CSE host {e.host} is marked unreachable. Retry in {e.retry_after:.0f}s.',
+        'circuit': 'open'
+    })
+    response.headers['Retry-After'] = str(max(1, int(e.retry_after + 0.5)))
+    return response, 503
+
+
+def rate_limited_response(e):
+    response = jsonify({
+        'error': f'Too many test requests for this {e.scope}. Retry in {math.ceil(e.retry_after)}s.',
+        'rate_limit': e.scope
+    })
+    response.headers['Retry-After'] = str(max(1, math.ceil(e.retry_after)))
+    return response, 429
+
+
+def take_test_tokens(data):
+    """Charge a /test-* request to the client's and the target host's buckets"""
+    rate_limiter.take({'client': request.remote_addr or 'unknown',
+                       'host': host_key(data.get('cse_url'), data.get('port'))})
+
+
+@app.route('/admin/breakers', methods=['GET', 'DELETE'])
+def admin_breakers():
+    """Inspect (GET) or reset (DELETE, optional ?host=) circuit breaker state"""
+    # Closing breakers needs ADMIN_TOKEN even when reading them doesn't
+    if not admin_authorized(require_token=request.method == 'DELETE'):
+        return jsonify({'error': 'Admin token required.'}), 403
+
+    if request.method == 'DELETE':
+        breaker.reset(request.args.get('host') or None)
+
+    return jsonify({
+        'failure_threshold': breaker.failure_threshold,
+        'reset_timeout': breaker.reset_timeout,
+        'hosts': breaker.snapshot()
+    })
+
+
+@app.route('/admin/rate-limits', methods=['GET', 'DELETE'])
+def admin_rate_limits():
+    """Inspect (GET) or reset (DELETE, optional ?key=) /test-* token buckets"""
+    # Resetting buckets needs ADMIN_TOKEN even when reading them doesn't
+    if not admin_authorized(require_token=request.method == 'DELETE'):
+        return jsonify({'error': 'Admin token required.'}), 403
+
+    if request.method == 'DELETE':
+        rate_limiter.reset(request.args.get('key') or None)
+
+    return jsonify({
+        'limits': {scope: {'per_minute': round(rate * 60, 3), 'burst': burst}
+                   for scope, (rate, burst) in rate_limiter.limits.items()},
+        'shared': isinstance(rate_limiter.store, SQLiteBucketStore),
+        'buckets': rate_limiter.snapshot()
+    })
+
+
+@app.route('/admin/controllers', methods=['GET', 'POST'])
+def admin_controllers():
+    """Registered controllers and their load state; POST preloads (?names=all)"""
+    # Preloading needs ADMIN_TOKEN even when reading the state doesn't
+    if not admin_authorized(require_token=request.method == 'POST'):
+        return jsonify({'error': 'Admin token required.'}), 403
+
+    if request.method == 'POST':
+        try:
+            preload(request.args.get('names', 'all'))
+        except KeyError as e:
+            return jsonify({'error': f'Unknown controller {e}.'}), 400
+
+    return jsonify({
+        'startup_ms': app.config['STARTUP_MS'],
+        'import_budget_ms': app.config['IMPORT_BUDGET_MS'],
+        'controllers': controller_status()
+    })
+
+
+# Routes a nonzero PROFILE_SAMPLE_RATE applies to
+PROFILED_ENDPOINTS = {'generate', 'test_get', 'test_post', 'test_endpoints'}
+
+
+@app.before_request
+def start_profiling():
+    # The tracer and tracemalloc are process-wide; never let anonymous
+    # clients switch them on
+    requested = request.headers.get('X-Profile') == '1' and admin_authorized(require_token=True)
+    sampled = (request.endpoint in PROFILED_ENDPOINTS
+               and random.random() < app.config['PROFILE_SAMPLE_RATE'])
+    if requested or sampled:
+        profiler.start(f"{request.method} {request.path}")
+
+
+@app.after_request
+def finish_profiling(response):
+    profile = profiler.finish()
+    if profile is not None:
+        response.headers['X-Profile-Id'] = str(profile.id)
+        timings = [f"{span['name']};dur={span['ms']}" for span in profile.spans]
+        response.headers['Server-Timing'] = ', '.join(timings + [f"total;dur={profile.elapsed_ms}"])
+    return response
+
+
+@app.teardown_request
+def abort_profiling(exc):
+    # after_request is skipped when a view raises; don't leave the tracer on
+    profiler.finish()
+
+
+@app.route('/admin/profiles', methods=['GET', 'DELETE'])
+def admin_profiles():
+    """List (GET) or drop (DELETE) stored request profiles"""
+    if not admin_authorized(require_token=True):
+        return jsonify({'error': 'Admin token required.'}), 403
+
+    if request.method == 'DELETE':
+        profiler.clear()
+
+    return jsonify({
+        'sample_rate': app.config['PROFILE_SAMPLE_RATE'],
+        'profiles': profiler.list()
+    })
+
+
+@app.route('/admin/profiles/<int:profile_id>')
+def admin_profile(profile_id):
+    """One profile as JSON, or ?format=folded for flamegraph tools"""
+    if not admin_authorized(require_token=True):
+        return jsonify({'error': 'Admin token required.'}), 403
+
+    profile = profiler.get(profile_id)
+    if profile is None:
+        return jsonify({'error': 'Profile not found (it may have been evicted).'}), 404
+
+    if request.args.get('format') == 'folded':
+        return Response(profile.folded_text(), mimetype='text/plain',
+                        headers={'Content-Disposition': f'attachment; filename=profile-{profile_id}.folded'})
+    return jsonify(profile.to_dict())
+
+
+def fetch_latest(data, timing=False, timeout=10):
+    """GET the container's latest CIN (.../Data/la) through the circuit breaker.
+
+    Untimed fetches go through the single-flight probe cache; timed fetches
+    always go upstream on a fresh connection.
+
+    Returns:
+        Tuple of (url, status_code, text, cache_meta, timing)
+    """
+    # Build URL - use /la endpoint to get latest resource
+    protocol = data.get('protocol', 'http')
+    cse_url = data.get('cse_url')
+    port = data.get('port')
+    ae_name = data.get('ae_name')
+    container_name = data.get('container_name')
+    origin = data.get('origin')
+
+    # GET endpoint: /~/in-cse/in-name/{AE}/{Container}/Data/la
+    url = f"{protocol}://{cse_url}:{port}/~/in-cse/in-name/{ae_name}/{container_name}/Data/la"
+
+    # Set headers
+    headers = {
+        'X-M2M-Origin': origin,
+        'Accept': 'application/json'
+    }
+
+    print(f"[DEBUG] GET URL: {url}")
+    print(f"[DEBUG] Headers: {headers}")
+
+    host = f"{cse_url}:{port}"
+
+    if timing:
+        with profiler.span('upstream_get'):
+            status_code, text, phases = breaker.call(
+                host, lambda: timed_request('GET', url, headers, timeout=timeout), breaker_failures())
+        return url, status_code, text, None, phases
+
+    # Identical probes (same URL and origin) share one upstream call and a
+    # short-lived cached result
+    def fetch():
+        with profiler.span('upstream_get'):
+            response = requests.get(url, headers=headers, timeout=timeout, verify=False)
+        return response.status_code, response.text
+
+    def guarded_fetch():
+        return breaker.call(host, fetch, breaker_failures())
+
+    (status_code, text), cache_meta = probe_cache.fetch((url, origin), guarded_fetch)
+    return url, status_code, text, cache_meta, None
+
+
 @app.route('/test-get', methods=['POST'])
 def test_get():
     """Test GET operation to oneM2M server"""
@@ -131,46 +733,38 @@ def test_get():
     print(f"[DEBUG] Test GET request: {data}")
     
     # Validate config
-    valid, msg = validate_request_config(data, 'python')
+    with profiler.span('validate_request_config'):
+        valid, msg = validate_request_config(data, 'python')
     if not valid:
         return jsonify({'error': msg}), 400
+
+    try:
+        take_test_tokens(data)
+    except RateLimitedError as e:
+        return rate_limited_response(e)
     
     try:
-        # Build URL - use /la endpoint to get latest resource
-        protocol = data.get('protocol', 'http')
-        cse_url = data.get('cse_url')
-        port = data.get('port')
-        ae_name = data.get('ae_name')
-        container_name = data.get('container_name')
-        origin = data.get('origin')
+        url, status_code, text, cache_meta, timing = fetch_latest(data, timing=data.get('timing') is True)
         
-        # GET endpoint: /~/in-cse/in-name/{AE}/{Container}/Data/la
-        url = f"{protocol}://{cse_url}:{port}/~/in-cse/in-name/{ae_name}/{container_name}/Data/la"
-        
-        # Set headers
-        headers = {
-            'X-M2M-Origin': origin,
-            'Accept': 'application/json'
-        }
-        
-        print(f"[DEBUG] GET URL: {url}")
-        print(f"[DEBUG] Headers: {headers}")
-        
-        # Execute GET request
-        response = requests.get(url, headers=headers, timeout=10, verify=False)
-        
-        print(f"[DEBUG] Response Status: {response.status_code}")
+        print(f"[DEBUG] Response Status: {status_code}")
         
         # Consider success only if status code is in 2xx range
-        is_success = 200 <= response.status_code < 300
+        is_success = 200 <= status_code < 300
         
-        return jsonify({
+        result = {
             'success': is_success,
-            'status_code': response.status_code,
-            'response': response.text,
+            'status_code': status_code,
+            'response': text,
             'url': url
-        })
+        }
+        if cache_meta:
+            result['cache'] = cache_meta
+        if timing:
+            result['timing'] = timing
+        return jsonify(result)
         
+    except CircuitOpenError as e:
+        return circuit_open_response(e)
     except requests.exceptions.Timeout:
         return jsonify({'error': 'Request timeout. Server did not respond.'}), 408
     except requests.exceptions.ConnectionError:
@@ -180,6 +774,264 @@ def test_get():
         return jsonify({'error': f'Test failed: {str(e)}'}), 500
 
 
+# Shortest /test-endpoints deadline a caller may ask for (seconds)
+MIN_PROBE_DEADLINE = 0.1
+
+
+def probe_candidate(data, deadline):
+    """Probe one protocol/port binding with a timed GET; never raises"""
+    result = {'protocol': data['protocol'], 'port': data['port'], 'success': False,
+              'status_code': None, 'latency_ms': None, 'error': None}
+    try:
+        rate_limiter.take({'host': host_key(data.get('cse_url'), data.get('port'))})
+        url, status_code, _, _, timing = fetch_latest(data, timing=True, timeout=deadline)
+        result.update(url=url, status_code=status_code, latency_ms=timing['total_ms'],
+                      success=200 <= status_code < 300)
+    except RateLimitedError as e:
+        result['error'] = f'Rate limited (retry in {math.ceil(e.retry_after)}s)'
+    except CircuitOpenError:
+        result['error'] = 'Circuit open (host recently unreachable)'
+    except requests.exceptions.Timeout:
+        result['error'] = 'Timeout'
+    except requests.exceptions.ConnectionError:
+        result['error'] = 'Connection error'
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+@app.route('/test-endpoints', methods=['POST'])
+def test_endpoints():
+    """Probe several protocol/port bindings concurrently and rank them"""
+    data = request.json or {}
+
+    print(f"[DEBUG] Test endpoints request: {data}")
+
+    candidates = data.get('candidates') or []
+    if not isinstance(candidates, list) or not candidates:
+        return jsonify({'error': 'At least one candidate endpoint is required.'}), 400
+    if len(candidates) > app.config['PROBE_MAX_CANDIDATES']:
+        return jsonify({'error': f"At most {app.config['PROBE_MAX_CANDIDATES']} candidates are allowed."}), 400
+
+    configs = []
+    for c in candidates:
+        if not isinstance(c, dict):
+            return jsonify({'error': 'Each candidate must be an object with protocol and port.'}), 400
+        candidate = {**data, 'protocol': c.get('protocol', 'http'), 'port': c.get('port')}
+        valid, msg = validate_request_config(candidate, 'python')
+        if not valid:
+            return jsonify({'error': f"{c.get('protocol')}:{c.get('port')}: {msg}"}), 400
+        candidate['port'] = int(candidate['port'])
+        configs.append(candidate)
+
+    try:
+        deadline = float(data.get('deadline') or app.config['PROBE_DEADLINE'])
+    except (TypeError, ValueError):
+        deadline = math.nan
+    if not math.isfinite(deadline):
+        return jsonify({'error': 'Deadline must be a number of seconds.'}), 400
+    # Socket timeouts and wait() need a positive value
+    deadline = max(MIN_PROBE_DEADLINE, min(deadline, app.config['PROBE_DEADLINE']))
+
+    # One run costs the client one token; each candidate is charged to its host
+    try:
+        rate_limiter.take({'client': request.remote_addr or 'unknown'})
+    except RateLimitedError as e:
+        return rate_limited_response(e)
+
+    # One overall deadline: every candidate runs at once and whatever has not
+    # answered when it expires is reported as timed out
+    executor = ThreadPoolExecutor(max_workers=len(configs))
+    futures = [executor.submit(probe_candidate, c, deadline) for c in configs]
+    # Probes run on worker threads, so the profile only sees the wait
+    with profiler.span('upstream_probes'):
+        wait(futures, timeout=deadline)
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    results = []
+    for c, future in zip(configs, futures):
+        if future.done():
+            results.append(future.result())
+        else:
+            results.append({'protocol': c['protocol'], 'port': c['port'], 'success': False,
+                            'status_code': None, 'latency_ms': None, 'error': 'Deadline exceeded'})
+
+    # Working bindings first, then any that answered at all, fastest first
+    results.sort(key=lambda r: (not r['success'], r['status_code'] is None,
+                                r['latency_ms'] if r['latency_ms'] is not None else float('inf')))
+    best = results[0] if results[0]['success'] else None
+
+    return jsonify({'results': results, 'best': best, 'deadline': deadline})
+
+
+@app.route('/discover', methods=['POST'])
+def discover():
+    """List AEs under the CSE, or containers under `ae_name`, for autocomplete"""
+    data = request.json or {}
+
+    valid, msg = validate_request_config(data, 'python')
+    if not valid:
+        return jsonify({'error': msg}), 400
+
+    protocol = data.get('protocol', 'http')
+    cse_url = data.get('cse_url')
+    port = data.get('port')
+    origin = data.get('origin') or ''
+    ae_name = (data.get('ae_name') or '').strip()
+    prefix = data.get('prefix') or ''
+
+    try:
+        offset = max(0, int(data.get('offset') or 0))
+        limit = min(max(1, int(data.get('limit') or 50)), 1000)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Offset and limit must be integers.'}), 400
+
+    base = f"{protocol}://{cse_url}:{port}"
+    url = f"{base}/~/in-cse/in-name"
+    if ae_name:
+        url += f"/{ae_name}"
+    kind = 'container' if ae_name else 'ae'
+    ty = RESOURCE_TYPES[kind]
+    page_size = app.config['DISCOVERY_PAGE_SIZE']
+    key = (base, origin, ae_name, ty)
+    host = f"{cse_url}:{port}"
+
+    def fetch_page(page_offset):
+        return breaker.call(
+            host,
+            lambda: fetch_discovery_page(url, origin, ty, offset=page_offset, limit=page_size),
+            breaker_failures()
+        )
+
+    def load():
+        return [resource_name(u) for page in iter_discovery(fetch_page, page_size) for u in page]
+
+    def generate():
+        # Cold cache: forward names as each upstream page arrives, then keep
+        # the full listing for subsequent (paginated) requests
+        names = []
+        try:
+            for page in iter_discovery(fetch_page, page_size):
+                page_names = [resource_name(u) for u in page]
+                names.extend(page_names)
+                for name in page_names:
+                    if name.startswith(prefix):
+                        yield json.dumps({'name': name, 'type': kind}) + '\n'
+            discovery_cache.put(key, names)
+        except (CircuitOpenError, DiscoveryError, requests.exceptions.RequestException) as e:
+            yield json.dumps({'error': str(e)}) + '\n'
+
+    try:
+        if data.get('refresh'):
+            discovery_cache.put(key, load())
+        elif data.get('stream') and not discovery_cache.has(key):
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        names, meta = discovery_cache.get(key, load)
+    except CircuitOpenError as e:
+        return circuit_open_response(e)
+    except DiscoveryError as e:
+        return jsonify({'error': str(e), 'status_code': e.status_code, 'response': e.body}), 502
+    except requests.exceptions.Timeout:
+        return jsonify({'error': 'Request timeout. Server did not respond.'}), 408
+    except requests.exceptions.ConnectionError:
+        return jsonify({'error': 'Connection error. Could not reach server.'}), 503
+
+    matches = prefix_slice(names, prefix)
+
+    if data.get('stream'):
+        def generate_cached():
+            for name in matches:
+                yield json.dumps({'name': name, 'type': kind}) + '\n'
+
+        return Response(generate_cached(), mimetype='application/x-ndjson')
+
+    return jsonify({
+        'type': kind,
+        'items': matches[offset:offset + limit],
+        'total': len(matches),
+        'offset': offset,
+        'limit': limit,
+        **meta
+    })
+
+
+@app.route('/export', methods=['POST'])
+def export():
+    """Stream a container's contentInstances as NDJSON or CSV"""
+    data = request.json or {}
+
+    print(f"[DEBUG] Export request: {data}")
+
+    valid, msg = validate_request_config(data, 'python')
+    if not valid:
+        return jsonify({'error': msg}), 400
+
+    protocol = data.get('protocol', 'http')
+    cse_url = data.get('cse_url')
+    port = data.get('port')
+    ae_name = data.get('ae_name')
+    container_name = data.get('container_name')
+    origin = data.get('origin')
+    fmt = (data.get('format') or 'ndjson').lower()
+    if fmt not in ('ndjson', 'csv'):
+        return jsonify({'error': 'Format must be ndjson or csv.'}), 400
+
+    # Column names for the [epoch, v1, v2, ...] array come from the
+    # configured parameters, in order
+    names = [p.get('name') for p in data.get('parameters') or []
+             if isinstance(p, dict) and p.get('name')]
+
+    filters = {}
+    try:
+        if data.get('created_after'):
+            filters['cra'] = to_onem2m_time(data['created_after'])
+        if data.get('created_before'):
+            filters['crb'] = to_onem2m_time(data['created_before'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        max_rows = max(0, int(data.get('max_rows') or 0))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'max_rows must be a whole number.'}), 400
+
+    url = f"{protocol}://{cse_url}:{port}/~/in-cse/in-name/{ae_name}/{container_name}/Data"
+    page_size = app.config['EXPORT_PAGE_SIZE']
+    host = f"{cse_url}:{port}"
+
+    def fetch_page(page_offset):
+        return breaker.call(
+            host,
+            lambda: fetch_cin_page(url, origin, offset=page_offset, limit=page_size, filters=filters),
+            breaker_failures()
+        )
+
+    # Fetch the first page before streaming so errors get a proper status
+    try:
+        first_page = fetch_page(0)
+    except CircuitOpenError as e:
+        return circuit_open_response(e)
+    except DiscoveryError as e:
+        return jsonify({'error': str(e), 'status_code': e.status_code, 'response': e.body}), 502
+    except requests.exceptions.Timeout:
+        return jsonify({'error': 'Request timeout. Server did not respond.'}), 408
+    except requests.exceptions.ConnectionError:
+        return jsonify({'error': 'Connection error. Could not reach server.'}), 503
+
+    def pages(page_offset):
+        return first_page if page_offset == 0 else fetch_page(page_offset)
+
+    rows = iter_cins(pages, page_size, prefetch=app.config['EXPORT_PREFETCH'], max_rows=max_rows)
+
+    filename = f"{ae_name}_{container_name}.{fmt}"
+    if fmt == 'csv':
+        body, mimetype = csv_chunks(rows, names), 'text/csv'
+    else:
+        body, mimetype = ndjson_lines(rows, names), 'application/x-ndjson'
+
+    return Response(body, mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+
 @app.route('/test-post', methods=['POST'])
 def test_post():
     """Test POST operation to oneM2M server"""
@@ -188,9 +1040,15 @@ def test_post():
     print(f"[DEBUG] Test POST request: {data}")
     
     # Validate config
-    valid, msg = validate_request_config(data, 'python')
+    with profiler.span('validate_request_config'):
+        valid, msg = validate_request_config(data, 'python')
     if not valid:
         return jsonify({'error': msg}), 400
+
+    try:
+        take_test_tokens(data)
+    except RateLimitedError as e:
+        return rate_limited_response(e)
     
     try:
         # Build URL
@@ -206,7 +1064,6 @@ def test_post():
         url = f"{protocol}://{cse_url}:{port}/~/in-cse/in-name/{ae_name}/{container_name}/Data"
         
         # Build payload - array format [epoch, value1, value2, ...]
-        import time
         inner_data = [int(time.time())]  # Start with epoch timestamp
         
         for p in params:
@@ -249,24 +1106,44 @@ def test_post():
         print(f"[DEBUG] Headers: {headers}")
         
         # Execute POST request with try-except like PYTHON_POST.py
-        try:
-            response = requests.post(url, json=payload, headers=headers, timeout=10, verify=False)
-        except TypeError:
-            response = requests.post(url, data=json.dumps(payload), headers=headers, timeout=10, verify=False)
+        def send():
+            try:
+                response = requests.post(url, json=payload, headers=headers, timeout=10, verify=False)
+            except TypeError:
+                response = requests.post(url, data=json.dumps(payload), headers=headers, timeout=10, verify=False)
+            return response.status_code, response.text, None
+
+        def timed_send():
+            return timed_request('POST', url, headers, body=json.dumps(payload))
+
+        started = time.perf_counter()
+        with profiler.span('upstream_post'):
+            status_code, text, timing = breaker.call(
+                f"{cse_url}:{port}", timed_send if data.get('timing') is True else send, breaker_failures())
         
-        print(f"[DEBUG] Response Status: {response.status_code}")
+        print(f"[DEBUG] Response Status: {status_code}")
         
         # Consider success only if status code is in 2xx range
-        is_success = 200 <= response.status_code < 300
+        is_success = 200 <= status_code < 300
         
-        return jsonify({
+        result = {
             'success': is_success,
-            'status_code': response.status_code,
-            'response': response.text,
+            'status_code': status_code,
+            'response': text,
             'url': url,
             'payload': payload
-        })
+        }
+        if timing:
+            result['timing'] = timing
+        if is_success and data.get('verify_ingest') is True:
+            # Read /la back until it returns this CIN: end-to-end ingest latency
+            la_headers = {'X-M2M-Origin': origin, 'Accept': 'application/json'}
+            with profiler.span('verify_ingest'):
+                result['verify'] = verify_ingest(f"{url}/la", la_headers, payload['m2m:cin']['con'], started)
+        return jsonify(result)
         
+    except CircuitOpenError as e:
+        return circuit_open_response(e)
     except requests.exceptions.Timeout:
         return jsonify({'error': 'Request timeout. Server did not respond.'}), 408
     except requests.exceptions.ConnectionError:
@@ -278,5 +1155,15 @@ def test_post():
         return jsonify({'error': f'Test failed: {str(e)}'}), 500
 
 
+if app.config['PRELOAD_CONTROLLERS']:
+    preload(app.config['PRELOAD_CONTROLLERS'])
+
+# Import time of this module (Flask, helpers, preloaded controllers)
+app.config['STARTUP_MS'] = round((time.perf_counter() - _import_started) * 1000, 1)
+if app.config['IMPORT_BUDGET_MS'] and app.config['STARTUP_MS'] > app.config['IMPORT_BUDGET_MS']:
+    print(f"[DEBUG] Startup took {app.config['STARTUP_MS']} ms, over the "
+          f"{app.config['IMPORT_BUDGET_MS']:.0f} ms IMPORT_BUDGET_MS budget")
+
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
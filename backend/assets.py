@@ -0,0 +1,184 @@
+"""
+Fingerprinted static assets for the web UI.
+
+CSS and JS files are minified once, named after a hash of their content
+(`configure.3f2a9c1d04.js`) and pre-compressed with gzip, so pages can serve
+them with `Cache-Control: immutable`: a changed file gets a new URL, and a
+repeat page load never has to revalidate them.
+"""
+import gzip
+import hashlib
+import os
+import threading
+
+MIMETYPES = {
+    '.css': 'text/css; charset=utf-8',
+    '.js': 'text/javascript; charset=utf-8',
+}
+
+
+def minify_css(text):
+    """Strip comments and redundant whitespace; strings are kept verbatim."""
+    out = []
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if c in ('"', "'"):
+            end = i + 1
+            while end < n and text[end] != c:
+                end += 2 if text[end] == '\\' else 1
+            out.append(text[i:end + 1])
+            i = end + 1
+        elif text.startswith('/*', i):
+            end = text.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+        elif c.isspace():
+            while i < n and text[i].isspace():
+                i += 1
+            # A space is only needed between two tokens of a selector or value
+            if out and out[-1][-1:] not in ('{', '}', ';', ':', ',', '>', ' ') \
+                    and i < n and text[i] not in ('{', '}', ';', ',', '>'):
+                out.append(' ')
+        else:
+            if c == '}' and out and out[-1] == ';':
+                out.pop()
+            out.append(c)
+            i += 1
+    return ''.join(out).strip()
+
+
+def minify_js(text):
+    """Conservative line-level JS minification.
+
+    Drops indentation, blank lines and whole-line // comments outside
+    template literals. Line breaks are kept so automatic semicolon insertion
+    behaves exactly as in the source.
+    """
+    lines = []
+    in_template = False
+    depth = []  # open ${ ... } expressions inside template literals
+    for line in text.split('\n'):
+        if not in_template:
+            line = line.strip()
+            if not line or line.startswith('//'):
+                continue
+        quote = None
+        i = 0
+        while i < len(line):
+            c = line[i]
+            if quote:
+                if c == '\\':
+                    i += 1
+                elif c == quote:
+                    quote = None
+            elif in_template:
+                if c == '\\':
+                    i += 1
+                elif c == '`':
+                    in_template = False
+                elif line.startswith('${', i):
+                    depth.append(0)
+                    in_template = False
+                    i += 1
+            elif c in ('"', "'"):
+                quote = c
+            elif c == '`':
+                in_template = True
+            elif c == '{' and depth:
+                depth[-1] += 1
+            elif c == '}' and depth:
+                if depth[-1] == 0:
+                    depth.pop()
+                    in_template = True
+                else:
+                    depth[-1] -= 1
+            elif line.startswith('//', i):
+                break
+            i += 1
+        lines.append(line)
+    if in_template or depth:
+        # Couldn't follow the source's template literals; serve it unchanged
+        return text
+    return '\n'.join(lines)
+
+
+MINIFIERS = {
+    '.css': minify_css,
+    '.js': minify_js,
+}
+
+
+class AssetBundle:
+    """Minified, content-hashed copies of a fixed set of static files.
+
+    Args:
+        static_dir: Directory holding the source files
+        names: File names (relative to static_dir) to serve
+        auto_reload: Rebuild a file when its modification time changes
+                     (for development; costs one stat per lookup)
+
+    Files are minified on first lookup rather than at startup.
+    """
+
+    def __init__(self, static_dir, names, auto_reload=False):
+        self.static_dir = static_dir
+        self.auto_reload = auto_reload
+        self.names = list(names)
+        self._lock = threading.Lock()
+        self._assets = {}   # logical name -> entry
+        self._hashed = {}   # fingerprinted name -> entry
+
+    def _build(self, name):
+        path = os.path.join(self.static_dir, name)
+        mtime = os.path.getmtime(path)
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        stem, ext = os.path.splitext(name)
+        body = MINIFIERS.get(ext, lambda text: text)(source).encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()[:10]
+        entry = {
+            'name': f'{stem}.{digest}{ext}',
+            'mtime': mtime,
+            'body': body,
+            'gzip': gzip.compress(body, compresslevel=9, mtime=0),
+            'mimetype': MIMETYPES.get(ext, 'application/octet-stream'),
+            'source_bytes': len(source.encode('utf-8')),
+        }
+        with self._lock:
+            old = self._assets.get(name)
+            if old is not None:
+                self._hashed.pop(old['name'], None)
+            self._assets[name] = entry
+            self._hashed[entry['name']] = entry
+        return entry
+
+    def _entry(self, name):
+        entry = self._assets.get(name)
+        if entry is None:
+            if name not in self.names:
+                raise KeyError(name)
+            entry = self._build(name)
+        elif self.auto_reload and os.path.getmtime(os.path.join(self.static_dir, name)) != entry['mtime']:
+            entry = self._build(name)
+        return entry
+
+    def url_name(self, name):
+        """Fingerprinted file name for a logical asset name."""
+        return self._entry(name)['name']
+
+    def get(self, hashed_name):
+        """Entry for a fingerprinted name, or None if it isn't current."""
+        if self.auto_reload or len(self._assets) < len(self.names):
+            for name in self.names:
+                self._entry(name)
+        with self._lock:
+            return self._hashed.get(hashed_name)
+
+    def stats(self):
+        """Per-asset source, minified and gzip sizes in bytes."""
+        for name in self.names:
+            self._entry(name)
+        with self._lock:
+            return {name: {'url': e['name'], 'source': e['source_bytes'],
+                           'minified': len(e['body']), 'gzip': len(e['gzip'])}
+                    for name, e in self._assets.items()}
@@ -0,0 +1,58 @@
+import sys
+import os
+import json
+import random
+import time
+sys.path.insert(0, os.path.dirname(__file__))
+
+from decoder import decode_batch
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+parameters = [
+    {'name': 'temperature', 'type': 'float', 'default': '25.5'},
+    {'name': 'humidity', 'type': 'int', 'default': '60'},
+    {'name': 'relay', 'type': 'boolean', 'default': 'false'},
+]
+
+# Build CIN documents the way test_post() / the generated clients write them
+documents = []
+for i in range(ROWS):
+    con = json.dumps([1700000000 + i, round(random.uniform(10, 40), 2),
+                      random.randint(0, 100), random.randint(0, 1)])
+    documents.append({'m2m:cin': {'con': con, 'lbl': [], 'cnf': 'text'}})
+
+
+def naive(docs):
+    """Per-row loop: json.loads each con into a Python list"""
+    rows = []
+    for d in docs:
+        rows.append(json.loads(d['m2m:cin']['con']))
+    return rows
+
+
+print("=" * 80)
+print(f"BENCHMARK: con decoding, {ROWS} rows, {len(parameters)} parameters")
+print("=" * 80)
+
+start = time.perf_counter()
+naive(documents)
+naive_s = time.perf_counter() - start
+print(f"Naive per-row json.loads : {ROWS / naive_s:>12,.0f} rows/s ({naive_s:.3f}s)")
+
+start = time.perf_counter()
+columns, skipped = decode_batch(documents, parameters)
+bulk_s = time.perf_counter() - start
+print(f"Columnar decode_batch    : {ROWS / bulk_s:>12,.0f} rows/s ({bulk_s:.3f}s)")
+
+strings = parameters + [{'name': 'status', 'type': 'string'}]
+string_docs = [{'m2m:cin': {'con': d['m2m:cin']['con'][:-1] + ', "ok"]'}} for d in documents]
+start = time.perf_counter()
+decode_batch(string_docs, strings)
+mixed_s = time.perf_counter() - start
+print(f"Columnar (with a string) : {ROWS / mixed_s:>12,.0f} rows/s ({mixed_s:.3f}s)")
+
+print("=" * 80)
+print(f"Speedup (numeric schema): {naive_s / bulk_s:.1f}x, skipped rows: {skipped}")
+for name, values in columns.items():
+    print(f"  {name:<12} {values.dtype}  first={values[0]}")
@@ -0,0 +1,92 @@
+import sys
+import os
+import json
+import statistics
+import subprocess
+
+BACKEND = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND)
+
+from controllers import TARGETS
+
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+BUDGET_MS = float(os.environ.get('IMPORT_BUDGET_MS', '400'))
+
+# Each measurement runs in a fresh interpreter so nothing is already imported
+COLD_IMPORT = """
+import json, time
+started = time.perf_counter()
+import app
+print(json.dumps({'import_ms': (time.perf_counter() - started) * 1000}))
+"""
+
+FIRST_GENERATE = """
+import json, sys, time
+import app
+client = app.app.test_client()
+config = {'cse_url': 'cse.example.com', 'port': 8080, 'protocol': 'http', 'ae_name': 'BenchAE',
+          'container_name': 'data', 'wifi_ssid': 'bench', 'wifi_password': 'bench',
+          'controller': sys.argv[1]}
+timings = []
+for _ in range(2):
+    started = time.perf_counter()
+    response = client.post('/generate', json=config)
+    timings.append((time.perf_counter() - started) * 1000)
+    assert response.status_code == 200, response.get_data(as_text=True)
+print(json.dumps({'first_ms': timings[0], 'warm_ms': timings[1]}))
+"""
+
+
+def run(code, *args, env=None, importtime=False):
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code, *args]
+    result = subprocess.run(command, cwd=BACKEND, capture_output=True, text=True,
+                            env=dict(os.environ, **(env or {})), check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def top_imports(stderr, count=10):
+    """Slowest imports made directly by app.py, from -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            rows.append((int(cumulative), name.strip()))
+        elif depth == 0:
+            # Children are listed before their parent; keep app's only
+            if name.strip() == 'app':
+                return sorted(rows, reverse=True)[:count]
+            rows = []
+    return []
+
+
+print("=" * 80)
+print(f"BENCHMARK: cold start of the backend, {RUNS} runs, budget {BUDGET_MS:.0f} ms")
+print("=" * 80)
+
+lazy = [run(COLD_IMPORT, env={'PRELOAD_CONTROLLERS': ''})[0]['import_ms'] for _ in range(RUNS)]
+preloaded = [run(COLD_IMPORT, env={'PRELOAD_CONTROLLERS': 'all'})[0]['import_ms'] for _ in range(RUNS)]
+lazy_median = statistics.median(lazy)
+
+print(f"\n{'import app (lazy controllers)':<40} median {lazy_median:7.1f} ms   min {min(lazy):7.1f} ms")
+print(f"{'import app (PRELOAD_CONTROLLERS=all)':<40} median {statistics.median(preloaded):7.1f} ms"
+      f"   min {min(preloaded):7.1f} ms")
+
+_, stderr = run(COLD_IMPORT, importtime=True)
+print("\nSlowest imports (cumulative):")
+for cumulative, name in top_imports(stderr):
+    print(f"  {name:<30} {cumulative / 1000:7.1f} ms")
+
+print("\nFirst /generate per controller (includes loading its generator):")
+for name in TARGETS:
+    first = [run(FIRST_GENERATE, name)[0] for _ in range(max(1, RUNS // 2))]
+    print(f"  {name:<14} first {statistics.median(t['first_ms'] for t in first):6.2f} ms"
+          f"   warm {statistics.median(t['warm_ms'] for t in first):6.2f} ms")
+
+print()
+if BUDGET_MS and lazy_median > BUDGET_MS:
+    print(f"FAIL: median import {lazy_median:.1f} ms is over the {BUDGET_MS:.0f} ms budget")
+    sys.exit(1)
+print(f"OK: median import {lazy_median:.1f} ms is within the {BUDGET_MS:.0f} ms budget")
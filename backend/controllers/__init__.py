@@ -1,16 +1,29 @@
 """
 Controllers module for oneM2M code generation.
-Each controller has its own generator function.
+Each controller has its own generator function, registered in
+controllers.registry and imported the first time it is used.
 """
 
-from .arduino import generate_arduino_code
-from .esp32 import generate_esp32_code
-from .esp8266 import generate_esp8266_code
-from .python_controller import generate_python_code
+from .registry import TARGETS, Target, load_generator, preload, status
+
+# generate_*_code names resolve lazily to the registered entry points
+_ENTRY_POINTS = {target.entry: name for name, target in TARGETS.items()}
+
+
+def __getattr__(name):
+    if name in _ENTRY_POINTS:
+        return load_generator(_ENTRY_POINTS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     'generate_arduino_code',
     'generate_esp32_code',
     'generate_esp8266_code',
-    'generate_python_code'
+    'generate_python_code',
+    'TARGETS',
+    'Target',
+    'load_generator',
+    'preload',
+    'status'
 ]
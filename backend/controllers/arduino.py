@@ -1,8 +1,27 @@
 """
 Arduino Nano 33 IoT code generator for oneM2M - Simplified based on working test code.
 """
-
-
+from .utils import (build_combined_tasks, build_retrieval_block, build_schedule_block,
+                    build_sensor_variables, normalize_retrieval, normalize_schedule,
+                    with_build_profile)
+
+
+# WiFiNINA reads the time from the module's own NTP client
+ARDUINO_EPOCH_SOURCE = '''// Unix time from the WiFiNINA module, or 0 if it isn't available yet
+unsigned long currentEpoch() {
+  unsigned long epoch = 0;
+  for (int i = 0; i < 10 && epoch == 0; i++) {
+    epoch = WiFi.getTime();
+    if (epoch == 0) {
+      delay(500);
+    }
+  }
+  return epoch;
+}'''
+
+
+# SAMD keeps string literals in flash already, so release builds save flash only
+@with_build_profile(literals_in_ram=False)
 def generate_arduino_code(config):
     """Generate Arduino Nano 33 IoT code for oneM2M operations.
     
@@ -32,6 +51,9 @@ def generate_arduino_code(config):
     wifi_ssid = config.get('wifi_ssid', '').strip() or 'YOUR_WIFI_SSID'
     wifi_password = config.get('wifi_password', '').strip() or 'YOUR_WIFI_PASSWORD'
     
+    schedule_block = build_schedule_block(normalize_schedule(config), ARDUINO_EPOCH_SOURCE)
+    retrieval_block = build_retrieval_block(normalize_retrieval(config))
+
     # Auto-select WiFi client based on protocol
     use_ssl = protocol == 'https'
     
@@ -98,16 +120,21 @@ const char* origin = "{origin}";
 {client_type} wifi;
 HttpClient client(wifi, server, port);
 
+{schedule_block}
+
+{retrieval_block}
+
 void setup() {{
   Serial.begin(115200);
   while (!Serial);
 
   connectWiFi();
+  initSchedule();
 }}
 
 void loop() {{
-  getOneM2MData();
-  delay(10000);
+  bool ok = getOneM2MData();
+  delay(nextDelayMs(ok));
 }}
 
 // ---------- WiFi Connect ----------
@@ -126,17 +153,17 @@ void connectWiFi() {{
 }}
 
 // ---------- oneM2M GET ----------
-void getOneM2MData() {{
+bool getOneM2MData() {{
 
   if (WiFi.status() != WL_CONNECTED) {{
     Serial.println("WiFi disconnected");
-    return;
+    return false;
   }}
 
   Serial.println("\\nSending GET request...");
 
   client.beginRequest();
-  client.get(resourcePath);
+  client.get(String(resourcePath) + pollQuery());
   client.sendHeader("X-M2M-Origin", origin);
   client.sendHeader("Accept", "application/json");
   client.endRequest();
@@ -146,11 +173,18 @@ void getOneM2MData() {{
 
   Serial.print("HTTP Status: ");
   Serial.println(statusCode);
+  countPollBytes(response.length());
+
+  // Conditional retrieval: nothing newer than the last content instance
+  if (statusCode == 204 || (statusCode == 200 && response.length() == 0)) {{
+    Serial.println("Unchanged");
+    return true;
+  }}
 
   if (statusCode != 200) {{
     Serial.println("GET failed");
     Serial.println(response);
-    return;
+    return false;
   }}
 
   // Print raw JSON
@@ -164,23 +198,185 @@ void getOneM2MData() {{
   if (error) {{
     Serial.print("JSON error: ");
     Serial.println(error.c_str());
-    return;
+    return true;
+  }}
+
+  if (!rememberCin(doc["m2m:cin"]["ri"], doc["m2m:cin"]["ct"])) {{
+    Serial.println("Unchanged");
+    return true;
   }}
 
   const char* con = doc["m2m:cin"]["con"];
 
   if (!con) {{
     Serial.println("con not found");
-    return;
+    return true;
   }}
 
   Serial.print("✅ con value: ");
   Serial.println(con);
+  return true;
 }}
 '''
 
         return code
 
+    # Combined POST + GET sketch driven by a cooperative millis() scheduler
+    if operation == 'BOTH':
+        sensor_decls, data_lines = build_sensor_variables(params)
+        tasks_block, loop_block, http_timeout_ms = build_combined_tasks(config, sensor_decls)
+        code = f'''/*
+ * Arduino Nano 33 IoT - oneM2M POST + GET (cooperative scheduler)
+ * Report: {base_url}/~/in-cse/in-name/{ae_name}/{container_name}/Data
+ * Poll:   {base_url}/~/in-cse/in-name/{ae_name}/{container_name}/Data/la
+ * Protocol: {protocol.upper()}
+ */
+
+#include <WiFiNINA.h>
+#include <ArduinoHttpClient.h>
+#include <ArduinoJson.h>
+
+// ---------- WiFi ----------
+const char* ssid     = "{wifi_ssid}";
+const char* password = "{wifi_password}";
+
+// ---------- oneM2M ----------
+const char* server = "{cse_url}";
+const int   port   = {port};
+const char* postPath = "/~/in-cse/in-name/{ae_name}/{container_name}/Data";
+const char* pollPath = "/~/in-cse/in-name/{ae_name}/{container_name}/Data/la";
+
+// oneM2M credentials
+const char* origin = "{origin}";
+
+// ---------- Clients ----------
+// One keep-alive connection shared by the POST and GET tasks
+{client_type} wifi;
+HttpClient client(wifi, server, port);
+const unsigned long HTTP_TIMEOUT_MS = {http_timeout_ms};
+
+{schedule_block}
+
+{retrieval_block}
+
+{tasks_block}
+
+void setup() {{
+  Serial.begin(115200);
+  while (!Serial);
+
+  connectWiFi();
+  initSchedule();
+  client.setHttpResponseTimeout(HTTP_TIMEOUT_MS);
+  startTasks();
+}}
+
+{loop_block}
+
+// ---------- WiFi Connect ----------
+void connectWiFi() {{
+  Serial.print("Connecting to WiFi");
+
+  WiFi.begin(ssid, password);
+  while (WiFi.status() != WL_CONNECTED) {{
+    delay(500);
+    Serial.print(".");
+  }}
+
+  Serial.println("\\nWiFi connected");
+  Serial.print("IP: ");
+  Serial.println(WiFi.localIP());
+}}
+
+// Reconnect without waiting in a loop; note that WiFiNINA's begin() itself
+// waits for the module's answer, so an attempt can take a few seconds
+bool maintainWiFi(unsigned long now) {{
+  if (WiFi.status() == WL_CONNECTED) {{
+    return true;
+  }}
+  if (due(now, nextWifiAttemptAt)) {{
+    Serial.println("WiFi lost. Reconnecting...");
+    client.stop();
+    WiFi.begin(ssid, password);
+    nextWifiAttemptAt = millis() + WIFI_RETRY_MS;
+  }}
+  return false;
+}}
+
+// ---------- oneM2M POST ----------
+bool postOneM2MData() {{
+  // Build data array: [epoch, value1, value2, ...]
+  unsigned long epoch = nowMs() / 1000; // Unix time once the clock is synced, else seconds since boot
+  String dataArray = "[" + String(epoch);
+{data_lines}
+  dataArray += "]";
+
+  // Build oneM2M cin payload
+  StaticJsonDocument<512> cinDoc;
+{labels_code}  cinDoc["m2m:cin"]["con"] = dataArray;
+
+  String payload;
+  serializeJson(cinDoc, payload);
+
+  client.connectionKeepAlive();
+  client.beginRequest();
+  client.post(postPath);
+  client.sendHeader("X-M2M-Origin", origin);
+  client.sendHeader("Content-Type", "application/json;ty=4");
+  client.sendHeader("Content-Length", payload.length());
+  client.beginBody();
+  client.print(payload);
+  client.endRequest();
+
+  int statusCode = client.responseStatusCode();
+  client.responseBody();  // drain so the connection can be reused
+
+  Serial.print("POST HTTP Status: ");
+  Serial.println(statusCode);
+  return statusCode == 201;
+}}
+
+// ---------- oneM2M GET ----------
+bool getOneM2MData() {{
+  client.connectionKeepAlive();
+  client.beginRequest();
+  client.get(String(pollPath) + pollQuery());
+  client.sendHeader("X-M2M-Origin", origin);
+  client.sendHeader("Accept", "application/json");
+  client.endRequest();
+
+  int statusCode = client.responseStatusCode();
+  String response = client.responseBody();
+  countPollBytes(response.length());
+
+  // Conditional retrieval: nothing newer than the last content instance
+  if (statusCode == 204 || (statusCode == 200 && response.length() == 0)) {{
+    return true;
+  }}
+
+  if (statusCode != 200) {{
+    Serial.print("GET HTTP Status: ");
+    Serial.println(statusCode);
+    return false;
+  }}
+
+  StaticJsonDocument<512> doc;
+  DeserializationError error = deserializeJson(doc, response);
+  if (error) {{
+    Serial.print("JSON error: ");
+    Serial.println(error.c_str());
+    return true;
+  }}
+
+  const char* con = doc["m2m:cin"]["con"];
+  if (con && rememberCin(doc["m2m:cin"]["ri"], doc["m2m:cin"]["ct"])) {{
+    handleCommand(con);
+  }}
+  return true;
+}}
+'''
+        return code
+
     # POST fallback: original POST generation
     code = f'''/*
  * Arduino Nano 33 IoT - oneM2M POST Operation
@@ -208,16 +404,19 @@ const char* origin = "{origin}";
 {client_type} wifi;
 HttpClient client(wifi, server, port);
 
+{schedule_block}
+
 void setup() {{
   Serial.begin(115200);
   while (!Serial);
   
   connectWiFi();
+  initSchedule();
 }}
 
 void loop() {{
-  postOneM2MData();
-  delay(10000);
+  bool ok = postOneM2MData();
+  delay(nextDelayMs(ok));
 }}
 
 // ---------- WiFi Connect ----------
@@ -236,17 +435,17 @@ void connectWiFi() {{
 }}
 
 // ---------- oneM2M POST ----------
-void postOneM2MData() {{
+bool postOneM2MData() {{
   
   if (WiFi.status() != WL_CONNECTED) {{
     Serial.println("WiFi disconnected");
-    return;
+    return false;
   }}
   
   Serial.println("\\nSending POST request...");
   
   // Build data array: [epoch, value1, value2, ...]
-  unsigned long epoch = millis() / 1000; // Seconds since boot (use RTC for actual time)
+  unsigned long epoch = nowMs() / 1000; // Unix time once the clock is synced, else seconds since boot
   String dataArray = "[" + String(epoch){values_str} + "]";
   
   // Build oneM2M cin payload
@@ -278,6 +477,7 @@ void postOneM2MData() {{
     Serial.println("POST failed");
     Serial.println(response);
   }}
+  return statusCode == 201;
 }}
 '''
     
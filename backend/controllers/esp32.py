@@ -1,8 +1,13 @@
 """
 ESP32 code generator for oneM2M - Simplified based on working test code.
 """
+from .utils import (NTP_EPOCH_SOURCE, build_combined_tasks, build_retrieval_block,
+                    build_schedule_block, build_sensor_variables, normalize_retrieval,
+                    normalize_schedule, with_build_profile)
 
 
+# ESP32 reads string literals from flash-mapped .rodata, so release builds save flash only
+@with_build_profile(literals_in_ram=False)
 def generate_esp32_code(config):
         """Generate ESP32 code for oneM2M operations.
 
@@ -23,6 +28,9 @@ def generate_esp32_code(config):
         wifi_password = config.get('wifi_password', '').strip() or 'YOUR_WIFI_PASSWORD'
 
         use_ssl = protocol == 'https'
+        schedule = normalize_schedule(config)
+        schedule_block = build_schedule_block(schedule, NTP_EPOCH_SOURCE)
+        retrieval_block = build_retrieval_block(normalize_retrieval(config), '    ')
         base_url = f"{protocol}://{cse_url}:{port}"
 
         # Build array of values (no labels) - [epoch, value1, value2, ...]
@@ -65,6 +73,7 @@ def generate_esp32_code(config):
 #include <WiFi.h>
 #include <HTTPClient.h>
 #include <ArduinoJson.h>
+#include <time.h>
 
 // WiFi credentials
 const char* ssid     = "{wifi_ssid}";
@@ -80,6 +89,10 @@ String url = String(server) + resourcePath;
 // Authentication
 const char* origin = "{origin}";
 
+{schedule_block}
+
+{retrieval_block}
+
 // ---------- WiFi Handling ----------
 void connectWiFi() {{
     Serial.print("Connecting to WiFi");
@@ -98,16 +111,17 @@ void connectWiFi() {{
 void setup() {{
     Serial.begin(115200);
     connectWiFi();
+    initSchedule();
 }}
 
 // ---------- Loop ----------
 void loop() {{
-    getOneM2MData();
-    delay(10000);
+    bool ok = getOneM2MData();
+    delay(nextDelayMs(ok));
 }}
 
 // ---------- oneM2M GET ----------
-void getOneM2MData()
+bool getOneM2MData()
 {{
     if (WiFi.status() != WL_CONNECTED)
     {{
@@ -116,7 +130,7 @@ void getOneM2MData()
         connectWiFi();
     }}
 
-    http.begin(url);
+    http.begin(url + pollQuery());
     http.addHeader("X-M2M-Origin", origin);
     http.addHeader("Content-Type", "application/json");
 
@@ -125,6 +139,14 @@ void getOneM2MData()
 
     Serial.print("HTTP Code: ");
     Serial.println(httpCode);
+    countPollBytes(payload.length());
+
+    // Conditional retrieval: nothing newer than the last content instance
+    if (httpCode == 204 || (httpCode == 200 && payload.length() == 0)) {{
+        Serial.println("Unchanged");
+        http.end();
+        return true;
+    }}
     Serial.println("Response Payload:");
     Serial.println(payload);
 
@@ -137,7 +159,9 @@ void getOneM2MData()
             Serial.println(err.c_str());
         }} else {{
             const char* con = doc["m2m:cin"]["con"];
-            if (con) {{
+            if (!rememberCin(doc["m2m:cin"]["ri"], doc["m2m:cin"]["ct"])) {{
+                Serial.println("Unchanged");
+            }} else if (con) {{
                 Serial.print("✅ con value: ");
                 Serial.println(con);
             }} else {{
@@ -147,10 +171,163 @@ void getOneM2MData()
     }}
 
     http.end();
+    return httpCode == 200;
 }}
 '''
                 return code
 
+        # Combined POST + GET sketch driven by a cooperative millis() scheduler
+        if operation == 'BOTH':
+                sensor_decls, data_lines = build_sensor_variables(params, '    ')
+                tasks_block, loop_block, http_timeout_ms = build_combined_tasks(config, sensor_decls, '    ')
+                code = f'''/*
+ * ESP32 - oneM2M POST + GET (cooperative scheduler)
+ * Report: {base_url}/~/in-cse/in-name/{ae_name}/{container_name}/Data
+ * Poll:   {base_url}/~/in-cse/in-name/{ae_name}/{container_name}/Data/la
+ * Protocol: {protocol.upper()}
+ */
+
+#include <WiFi.h>
+#include <HTTPClient.h>
+#include <ArduinoJson.h>
+#include <time.h>
+
+// WiFi credentials
+const char* ssid = "{wifi_ssid}";
+const char* password = "{wifi_password}";
+
+// oneM2M Server Configuration
+const char* server = "{protocol}://{cse_url}:{port}";
+const char* postPath = "/~/in-cse/in-name/{ae_name}/{container_name}/Data";
+const char* pollPath = "/~/in-cse/in-name/{ae_name}/{container_name}/Data/la";
+
+// Authentication
+const char* origin = "{origin}";
+
+// One keep-alive connection shared by the POST and GET tasks
+HTTPClient http;
+const uint16_t HTTP_TIMEOUT_MS = {http_timeout_ms};
+
+{schedule_block}
+
+{retrieval_block}
+
+{tasks_block}
+
+// ---------- WiFi Handling ----------
+void connectWiFi() {{
+    Serial.print("Connecting to WiFi");
+    WiFi.begin(ssid, password);
+    while (WiFi.status() != WL_CONNECTED) 
+    {{
+        delay(500);
+        Serial.print(".");
+    }}
+    Serial.println("\\nWiFi connected");
+    Serial.print("IP: ");
+    Serial.println(WiFi.localIP());
+}}
+
+// Non-blocking reconnect: start an attempt and let loop() keep sampling
+bool maintainWiFi(unsigned long now) {{
+    if (WiFi.status() == WL_CONNECTED) {{
+        return true;
+    }}
+    if (due(now, nextWifiAttemptAt)) {{
+        Serial.println("WiFi lost. Reconnecting...");
+        WiFi.disconnect();
+        WiFi.begin(ssid, password);
+        nextWifiAttemptAt = now + WIFI_RETRY_MS;
+    }}
+    return false;
+}}
+
+// ---------- Setup ----------
+void setup() {{
+    Serial.begin(115200);
+    connectWiFi();
+    initSchedule();
+    http.setReuse(true);
+    http.setTimeout(HTTP_TIMEOUT_MS);
+    startTasks();
+}}
+
+{loop_block}
+
+// ---------- oneM2M POST ----------
+bool postOneM2MData()
+{{
+    // Build data array: [epoch, value1, value2, ...]
+    unsigned long epoch = nowMs() / 1000; // Unix time once the clock is synced, else seconds since boot
+    String dataArray = "[" + String(epoch);
+{data_lines}
+    dataArray += "]";
+
+    // Build oneM2M cin payload
+    StaticJsonDocument<512> cinDoc;
+{labels_code}  cinDoc["m2m:cin"]["con"] = dataArray;
+
+    String payload;
+    serializeJson(cinDoc, payload);
+
+    http.begin(String(server) + postPath);
+    http.addHeader("X-M2M-Origin", origin);
+    http.addHeader("Content-Type", "application/json;ty=4");
+
+    int httpCode = http.POST(payload);
+    http.end();
+
+    Serial.print("POST HTTP Code: ");
+    Serial.println(httpCode);
+    return httpCode == 201;
+}}
+
+// ---------- oneM2M GET ----------
+bool getOneM2MData()
+{{
+    http.begin(String(server) + pollPath + pollQuery());
+    http.addHeader("X-M2M-Origin", origin);
+    http.addHeader("Accept", "application/json");
+
+    int httpCode = http.GET();
+    String payload = httpCode == 200 ? http.getString() : "";
+    http.end();
+    countPollBytes(payload.length());
+
+    // Conditional retrieval: nothing newer than the last content instance
+    if (httpCode == 204 || (httpCode == 200 && payload.length() == 0)) {{
+        return true;
+    }}
+
+    if (httpCode != 200) {{
+        Serial.print("GET HTTP Code: ");
+        Serial.println(httpCode);
+        return false;
+    }}
+
+    StaticJsonDocument<512> doc;
+    DeserializationError err = deserializeJson(doc, payload);
+    if (err) {{
+        Serial.print("JSON parse error: ");
+        Serial.println(err.c_str());
+        return true;
+    }}
+
+    const char* con = doc["m2m:cin"]["con"];
+    if (con && rememberCin(doc["m2m:cin"]["ri"], doc["m2m:cin"]["ct"])) {{
+        handleCommand(con);
+    }}
+    return true;
+}}
+'''
+                return code
+
+        # Dual-core FreeRTOS pipeline: sampling never waits on the network
+        rtos = config.get('freertos') or {}
+        if rtos.get('enabled'):
+                layout = _freertos_layout(params, schedule, rtos)
+                return _generate_freertos_sketch(config, params, labels_code, schedule_block, layout)
+
         # Generate POST sketch
         code = f'''/*
  * ESP32 - oneM2M POST Operation
@@ -161,6 +338,7 @@ void getOneM2MData()
 #include <WiFi.h>
 #include <HTTPClient.h>
 #include <ArduinoJson.h>
+#include <time.h>
 
 // WiFi credentials
 const char* ssid = "{wifi_ssid}";
@@ -175,6 +353,8 @@ String url = String(server) + resourcePath;
 // Authentication
 const char* origin = "{origin}";
 
+{schedule_block}
+
 // ---------- WiFi Handling ----------
 void connectWiFi() {{
     Serial.print("Connecting to WiFi");
@@ -193,16 +373,17 @@ void connectWiFi() {{
 void setup() {{
     Serial.begin(115200);
     connectWiFi();
+    initSchedule();
 }}
 
 // ---------- Loop ----------
 void loop() {{
-    postOneM2MData();
-    delay(10000);
+    bool ok = postOneM2MData();
+    delay(nextDelayMs(ok));
 }}
 
 // ---------- oneM2M POST ----------
-void postOneM2MData()
+bool postOneM2MData()
 {{
     if (WiFi.status() != WL_CONNECTED)
     {{
@@ -212,7 +393,7 @@ void postOneM2MData()
     }}
 
     // Build data array: [epoch, value1, value2, ...]
-    unsigned long epoch = millis() / 1000; // Seconds since boot (use RTC for actual time)
+    unsigned long epoch = nowMs() / 1000; // Unix time once the clock is synced, else seconds since boot
     String dataArray = "[" + String(epoch){values_str} + "]";
 
     // Build oneM2M cin payload
@@ -241,7 +422,303 @@ void postOneM2MData()
     }}
 
     http.end();
+    return httpCode == 201;
 }}
 '''
 
         return code
+
+
+# Bytes per field in the queued Reading struct (strings are fixed char arrays)
+READING_FIELD_BYTES = {'int': 4, 'float': 4, 'bool': 1, 'string': 32}
+
+
+def _freertos_layout(params, schedule, rtos):
+        """Size the FreeRTOS pipeline from the configured parameters.
+
+        Args:
+                params: Parameter list from the generation config
+                schedule: Dictionary from normalize_schedule (post interval)
+                rtos: 'freertos' settings; sample_interval, batch_size,
+                      queue_depth, sample_stack and network_stack override
+                      the derived values
+
+        Returns:
+                Dictionary with fields (name, ctype, default), reading_bytes,
+                json_capacity, sample_ms, batch_size, queue_depth,
+                sample_stack and network_stack
+        """
+        def positive(key, default):
+                try:
+                        value = float(rtos.get(key))
+                except (TypeError, ValueError):
+                        return default
+                return value if value > 0 else default
+
+        fields = []
+        reading_bytes = 4  # epoch
+        con_chars = 12
+        for p in params if isinstance(params, list) else []:
+                if not isinstance(p, dict) or not p.get('name'):
+                        continue
+                dtype = (p.get('type') or 'string').lower()
+                default = p.get('default', '')
+                if dtype in ('int', 'integer'):
+                        kind, default = 'int', default or 0
+                elif dtype in ('float', 'decimal'):
+                        kind, default = 'float', default or 0.0
+                elif dtype in ('boolean', 'bool'):
+                        kind, default = 'bool', 'true' if str(default).lower() in ('1', 'true', 'yes') else 'false'
+                else:
+                        kind = 'string'
+                fields.append((p['name'], kind, default))
+                reading_bytes += READING_FIELD_BYTES[kind]
+                con_chars += 36 if kind == 'string' else 14
+        reading_bytes = (reading_bytes + 3) // 4 * 4
+
+        sample_ms = int(positive('sample_interval', 1) * 1000)
+        per_slot = max(1, -(-int(schedule['interval'] * 1000) // sample_ms))
+        batch_size = int(positive('batch_size', min(per_slot, 20)))
+        # Room for about four missed slots, capped at 16 KB of queue storage
+        queue_depth = int(positive('queue_depth', min(per_slot * 4, 16384 // reading_bytes)))
+        queue_depth = max(queue_depth, batch_size)
+
+        # The JSON document (labels, con string and its escaped copy) and the
+        # serialized payload live on the network task's stack
+        json_capacity = max(512, (con_chars * 2 + 256 + 127) // 128 * 128)
+        network_stack = 6144 + batch_size * reading_bytes + json_capacity * 3
+        sample_stack = 2048 + reading_bytes * 2
+        return {
+                'fields': fields,
+                'reading_bytes': reading_bytes,
+                'json_capacity': json_capacity,
+                'sample_ms': sample_ms,
+                'batch_size': batch_size,
+                'queue_depth': queue_depth,
+                'sample_stack': int(positive('sample_stack', (sample_stack + 1023) // 1024 * 1024)),
+                'network_stack': int(positive('network_stack', (network_stack + 1023) // 1024 * 1024)),
+        }
+
+
+def _generate_freertos_sketch(config, params, labels_code, schedule_block, layout):
+        """Generate the dual-core ESP32 POST sketch.
+
+        A sampling task on core 1 pushes readings into a bounded queue; a
+        network task on core 0 wakes at the device's schedule slot and posts
+        everything queued, in batches over one keep-alive connection.
+        """
+        cse_url = config.get('cse_url', 'onem2m.iiit.ac.in')
+        port = config.get('port', 443)
+        protocol = config.get('protocol', 'https').lower()
+        ae_name = config.get('ae_name', '')
+        container_name = config.get('container_name', '')
+        origin = config.get('origin', '')
+        wifi_ssid = config.get('wifi_ssid', '').strip() or 'YOUR_WIFI_SSID'
+        wifi_password = config.get('wifi_password', '').strip() or 'YOUR_WIFI_PASSWORD'
+        base_url = f"{protocol}://{cse_url}:{port}"
+
+        struct_lines = []
+        read_lines = []
+        for name, kind, default in layout['fields']:
+                if kind == 'string':
+                        struct_lines.append(f'    char {name}[{READING_FIELD_BYTES["string"]}];')
+                        read_lines.append(f'    strlcpy(r.{name}, "{default}", sizeof(r.{name}));')
+                else:
+                        struct_lines.append(f'    {kind} {name};')
+                        read_lines.append(f'    r.{name} = {default};')
+        struct_block = '\n'.join(struct_lines) if struct_lines else '    // No parameters configured'
+        read_block = '\n'.join(read_lines) if read_lines else '    // No parameters configured'
+        _, data_lines = build_sensor_variables(params, '    ', prefix='r.')
+
+        return f'''/*
+ * ESP32 - oneM2M POST Operation (dual-core FreeRTOS pipeline)
+ * Target: {base_url}/~/in-cse/in-name/{ae_name}/{container_name}/Data
+ * Protocol: {protocol.upper()}
+ *
+ * Core 1: samplingTask -> queue ({layout['queue_depth']} x {layout['reading_bytes']} B) -> Core 0: networkTask
+ * Sampling never waits on the network; readings queue up while a POST is in flight.
+ */
+
+#include <WiFi.h>
+#include <HTTPClient.h>
+#include <ArduinoJson.h>
+#include <time.h>
+
+// WiFi credentials
+const char* ssid = "{wifi_ssid}";
+const char* password = "{wifi_password}";
+
+// oneM2M Server Configuration
+const char* server = "{protocol}://{cse_url}:{port}";
+const char* resourcePath = "/~/in-cse/in-name/{ae_name}/{container_name}/Data";
+String url = String(server) + resourcePath;
+
+// Authentication
+const char* origin = "{origin}";
+
+// ---------- Pipeline ----------
+// Sized from the configured parameters; check the stack high-water marks
+// printed after each slot and trim if there is plenty of headroom
+const uint32_t    SAMPLE_MS     = {layout['sample_ms']};
+const UBaseType_t QUEUE_DEPTH   = {layout['queue_depth']};    // readings buffered while posting
+const size_t      BATCH_SIZE    = {layout['batch_size']};    // readings per batch over one connection
+const uint32_t    SAMPLE_STACK  = {layout['sample_stack']};  // bytes
+const uint32_t    NETWORK_STACK = {layout['network_stack']};  // bytes
+const BaseType_t  SAMPLE_CORE   = 1;  // Arduino core
+const BaseType_t  NETWORK_CORE  = 0;  // WiFi / lwIP core
+
+// One sample of every configured parameter
+struct Reading {{
+    uint32_t epoch;
+{struct_block}
+}};
+
+QueueHandle_t readings;
+TaskHandle_t samplingHandle = NULL;
+volatile uint32_t droppedReadings = 0;
+
+{schedule_block}
+
+// ---------- Sensors ----------
+void readSensors(Reading& r) {{
+    // Replace with real sensor reads
+{read_block}
+}}
+
+String toCon(const Reading& r) {{
+    // Build data array: [epoch, value1, value2, ...]
+    String dataArray = "[" + String(r.epoch);
+{data_lines}
+    dataArray += "]";
+    return dataArray;
+}}
+
+// ---------- Sampling task (core 1) ----------
+void samplingTask(void* arg) {{
+    TickType_t lastWake = xTaskGetTickCount();
+    for (;;) {{
+        Reading r;
+        r.epoch = nowMs() / 1000; // Unix time once the clock is synced, else seconds since boot
+        readSensors(r);
+        if (xQueueSend(readings, &r, 0) != pdTRUE) {{
+            // Queue full: drop the oldest reading to keep the newest
+            Reading oldest;
+            xQueueReceive(readings, &oldest, 0);
+            xQueueSend(readings, &r, 0);
+            droppedReadings++;
+        }}
+        vTaskDelayUntil(&lastWake, pdMS_TO_TICKS(SAMPLE_MS));
+    }}
+}}
+
+// ---------- oneM2M POST ----------
+bool postReading(HTTPClient& http, const Reading& r) {{
+    // Build oneM2M cin payload
+    StaticJsonDocument<{layout['json_capacity']}> cinDoc;
+{labels_code}  cinDoc["m2m:cin"]["con"] = toCon(r);
+
+    String payload;
+    serializeJson(cinDoc, payload);
+
+    http.begin(url);
+    http.addHeader("X-M2M-Origin", origin);
+    http.addHeader("Content-Type", "application/json;ty=4");
+    int httpCode = http.POST(payload);
+    http.end();
+
+    if (httpCode != 201) {{
+        Serial.print("❌ POST failed, HTTP Code: ");
+        Serial.println(httpCode);
+    }}
+    return httpCode == 201;
+}}
+
+// ---------- Network task (core 0) ----------
+void networkTask(void* arg) {{
+    HTTPClient http;
+    http.setReuse(true);
+    Reading batch[BATCH_SIZE];
+    size_t count = 0;
+    size_t sent = 0;
+    unsigned int failures = 0;
+
+    for (;;) {{
+        // Sleep until this device's slot, then post what has queued up so far
+        vTaskDelay(pdMS_TO_TICKS(msUntilNextSlot()));
+        UBaseType_t pending = uxQueueMessagesWaiting(readings);
+        uint32_t posted = 0;
+
+        while (pending > 0 || sent < count) {{
+            if (sent == count) {{
+                count = 0;
+                sent = 0;
+                while (count < BATCH_SIZE && pending > 0 && xQueueReceive(readings, &batch[count], 0) == pdTRUE) {{
+                    count++;
+                    pending--;
+                }}
+                if (count == 0) {{
+                    break;
+                }}
+            }}
+
+            if (WiFi.status() != WL_CONNECTED) {{
+                Serial.println("WiFi lost. Reconnecting...");
+                WiFi.reconnect();
+                vTaskDelay(pdMS_TO_TICKS(1000));
+                continue;
+            }}
+
+            while (sent < count && postReading(http, batch[sent])) {{
+                sent++;
+                posted++;
+            }}
+            if (sent < count) {{
+                failures++;
+                unsigned long wait = backoffMs(failures);
+                Serial.print("Retrying in ");
+                Serial.print(wait);
+                Serial.println(" ms");
+                vTaskDelay(pdMS_TO_TICKS(wait));
+            }} else {{
+                failures = 0;
+            }}
+        }}
+
+        Serial.printf("✅ Posted %u readings, %u queued, %u dropped, stack free: sampling %u B, network %u B\\n",
+                      (unsigned) posted, (unsigned) uxQueueMessagesWaiting(readings), (unsigned) droppedReadings,
+                      (unsigned) uxTaskGetStackHighWaterMark(samplingHandle),
+                      (unsigned) uxTaskGetStackHighWaterMark(NULL));
+    }}
+}}
+
+// ---------- WiFi Handling ----------
+void connectWiFi() {{
+    Serial.print("Connecting to WiFi");
+    WiFi.begin(ssid, password);
+    while (WiFi.status() != WL_CONNECTED) 
+    {{
+        delay(500);
+        Serial.print(".");
+    }}
+    Serial.println("\\nWiFi connected");
+    Serial.print("IP: ");
+    Serial.println(WiFi.localIP());
+}}
+
+// ---------- Setup ----------
+void setup() {{
+    Serial.begin(115200);
+    connectWiFi();
+    initSchedule();
+
+    readings = xQueueCreate(QUEUE_DEPTH, sizeof(Reading));
+    xTaskCreatePinnedToCore(samplingTask, "sampling", SAMPLE_STACK, NULL, 2, &samplingHandle, SAMPLE_CORE);
+    xTaskCreatePinnedToCore(networkTask, "network", NETWORK_STACK, NULL, 1, NULL, NETWORK_CORE);
+}}
+
+// ---------- Loop ----------
+void loop() {{
+    // All work happens in the FreeRTOS tasks
+    vTaskDelete(NULL);
+}}
+'''
@@ -1,8 +1,23 @@
 """
 ESP8266 code generator for oneM2M - Simplified based on working test code.
 """
+from .utils import (NTP_EPOCH_SOURCE, build_combined_tasks, build_retrieval_block,
+                    build_schedule_block, build_sensor_variables, normalize_retrieval,
+                    normalize_schedule, with_build_profile)
+
+_HTTP_NOTE = """ * NOTE:
+ * - Uses HTTP only
+ * - Assumes server allows HTTP access
+"""
+
+_TLS_NOTE = """ * NOTE:
+ * - HTTPS via BearSSL with Max Fragment Length negotiation and small buffers
+ * - TLS sessions are cached so reconnects skip the full handshake
+"""
 
 
+# ESP8266 copies string literals into RAM unless they are in PROGMEM
+@with_build_profile(literals_in_ram=True)
 def generate_esp8266_code(config):
     """Generate ESP8266 code for oneM2M operations.
 
@@ -22,6 +37,15 @@ def generate_esp8266_code(config):
     wifi_password = config.get('wifi_password', '').strip() or 'YOUR_WIFI_PASSWORD'
 
     use_ssl = protocol == 'https'
+    transport_title = 'BearSSL' if use_ssl else 'NO SSL'
+    tls = _tls_settings(config, cse_url, port) if use_ssl else None
+    transport_note = _TLS_NOTE if use_ssl else _HTTP_NOTE
+    client_decl = 'WiFiClientSecure wifiClient;' if use_ssl else 'WiFiClient wifiClient;'
+    tls_include = '#include <WiFiClientSecure.h>\n' if use_ssl else ''
+    tls_block = tls['block'] + '\n\n' if use_ssl else ''
+    tls_setup = '  configureTls();\n' if use_ssl else ''
+    schedule_block = build_schedule_block(normalize_schedule(config), NTP_EPOCH_SOURCE)
+    retrieval_block = build_retrieval_block(normalize_retrieval(config))
     base_url = f"{protocol}://{cse_url}:{port}"
 
     # Build array of values (no labels) - [epoch, value1, value2, ...]
@@ -56,17 +80,15 @@ def generate_esp8266_code(config):
     # Generate minimal GET sketch
     if operation == 'GET':
         code = f'''/*
- * ESP8266 - oneM2M GET Operation (NO SSL)
+ * ESP8266 - oneM2M GET Operation ({transport_title})
  * Target: {base_url}/~/in-cse/in-name/{ae_name}/{container_name}/Data/la
  * Protocol: {protocol.upper()}
- * NOTE:
- * - Uses HTTP only
- * - Assumes server allows HTTP access
- */
+{transport_note} */
 
 #include <ESP8266WiFi.h>
 #include <ESP8266HTTPClient.h>
-#include <ArduinoJson.h>
+{tls_include}#include <ArduinoJson.h>
+#include <time.h>
 
 // ---------- WiFi credentials ----------
 const char* ssid     = "{wifi_ssid}";
@@ -81,9 +103,13 @@ const char* resourcePath = "/~/in-cse/in-name/{ae_name}/{container_name}/Data/la
 const char* origin = "{origin}";
 
 // ---------- Objects ----------
-WiFiClient wifiClient;
+{client_decl}
 HTTPClient http;
 
+{tls_block}{schedule_block}
+
+{retrieval_block}
+
 // ---------- WiFi Connect ----------
 void connectWiFi() {{
   Serial.print("Connecting to WiFi");
@@ -102,24 +128,25 @@ void connectWiFi() {{
 void setup() {{
   Serial.begin(115200);
   connectWiFi();
-}}
+  initSchedule();
+{tls_setup}}}
 
 void loop() {{
-  getOneM2MData();
-  delay(10000);
+  bool ok = getOneM2MData();
+  delay(nextDelayMs(ok));
 }}
 
 // ---------- oneM2M GET ----------
-void getOneM2MData() {{
+bool getOneM2MData() {{
 
   if (WiFi.status() != WL_CONNECTED) {{
     Serial.println("WiFi lost. Reconnecting...");
     WiFi.disconnect();
     connectWiFi();
-    return;
+    return false;
   }}
 
-  String url = String(server) + resourcePath;
+  String url = String(server) + resourcePath + pollQuery();
 
   Serial.println("\\nSending GET request...");
   Serial.println("URL: " + url);
@@ -133,6 +160,14 @@ void getOneM2MData() {{
 
   Serial.print("HTTP Code: ");
   Serial.println(httpCode);
+  countPollBytes(payload.length());
+
+  // Conditional retrieval: nothing newer than the last content instance
+  if (httpCode == 204 || (httpCode == 200 && payload.length() == 0)) {{
+    Serial.println("Unchanged");
+    http.end();
+    return true;
+  }}
   Serial.println("Received payload:");
   Serial.println(payload);
 
@@ -147,7 +182,9 @@ void getOneM2MData() {{
     }} else {{
       const char* con = doc["m2m:cin"]["con"];
 
-      if (con) {{
+      if (!rememberCin(doc["m2m:cin"]["ri"], doc["m2m:cin"]["ct"])) {{
+        Serial.println("Unchanged");
+      }} else if (con) {{
         Serial.print("✅ con value: ");
         Serial.println(con);
       }} else {{
@@ -159,23 +196,168 @@ void getOneM2MData() {{
   }}
 
   http.end();
+  return httpCode == 200;
+}}
+'''
+        return code
+
+    # Combined POST + GET sketch driven by a cooperative millis() scheduler
+    if operation == 'BOTH':
+        sensor_decls, data_lines = build_sensor_variables(params)
+        tasks_block, loop_block, http_timeout_ms = build_combined_tasks(config, sensor_decls)
+        code = f'''/*
+ * ESP8266 - oneM2M POST + GET (cooperative scheduler, {transport_title})
+ * Report: {base_url}/~/in-cse/in-name/{ae_name}/{container_name}/Data
+ * Poll:   {base_url}/~/in-cse/in-name/{ae_name}/{container_name}/Data/la
+ * Protocol: {protocol.upper()}
+{transport_note} */
+
+#include <ESP8266WiFi.h>
+#include <ESP8266HTTPClient.h>
+{tls_include}#include <ArduinoJson.h>
+#include <time.h>
+
+// ---------- WiFi credentials ----------
+const char* ssid     = "{wifi_ssid}";
+const char* password = "{wifi_password}";
+
+// ---------- oneM2M Server ----------
+const char* server = "{protocol}://{cse_url}:{port}";
+const char* postPath = "/~/in-cse/in-name/{ae_name}/{container_name}/Data";
+const char* pollPath = "/~/in-cse/in-name/{ae_name}/{container_name}/Data/la";
+
+// Authentication
+const char* origin = "{origin}";
+
+// ---------- Objects ----------
+// One keep-alive connection shared by the POST and GET tasks
+{client_decl}
+HTTPClient http;
+const uint16_t HTTP_TIMEOUT_MS = {http_timeout_ms};
+
+{tls_block}{schedule_block}
+
+{retrieval_block}
+
+{tasks_block}
+
+// ---------- WiFi Connect ----------
+void connectWiFi() {{
+  Serial.print("Connecting to WiFi");
+  WiFi.begin(ssid, password);
+
+  while (WiFi.status() != WL_CONNECTED) {{
+    delay(500);
+    Serial.print(".");
+  }}
+
+  Serial.println("\\nWiFi connected");
+  Serial.print("IP: ");
+  Serial.println(WiFi.localIP());
+}}
+
+// Non-blocking reconnect: start an attempt and let loop() keep sampling
+bool maintainWiFi(unsigned long now) {{
+  if (WiFi.status() == WL_CONNECTED) {{
+    return true;
+  }}
+  if (due(now, nextWifiAttemptAt)) {{
+    Serial.println("WiFi lost. Reconnecting...");
+    WiFi.disconnect();
+    WiFi.begin(ssid, password);
+    nextWifiAttemptAt = now + WIFI_RETRY_MS;
+  }}
+  return false;
+}}
+
+void setup() {{
+  Serial.begin(115200);
+  connectWiFi();
+  initSchedule();
+{tls_setup}  http.setReuse(true);
+  http.setTimeout(HTTP_TIMEOUT_MS);
+  startTasks();
+}}
+
+{loop_block}
+
+// ---------- oneM2M POST ----------
+bool postOneM2MData() {{
+  // Build data array: [epoch, value1, value2, ...]
+  unsigned long epoch = nowMs() / 1000; // Unix time once the clock is synced, else seconds since boot
+  String dataArray = "[" + String(epoch);
+{data_lines}
+  dataArray += "]";
+
+  // Build oneM2M cin payload
+  StaticJsonDocument<512> cinDoc;
+{labels_code}  cinDoc["m2m:cin"]["con"] = dataArray;
+
+  String payload;
+  serializeJson(cinDoc, payload);
+
+  http.begin(wifiClient, String(server) + postPath);
+  http.addHeader("X-M2M-Origin", origin);
+  http.addHeader("Content-Type", "application/json;ty=4");
+
+  int httpCode = http.POST(payload);
+  http.end();
+
+  Serial.print("POST HTTP Code: ");
+  Serial.println(httpCode);
+  return httpCode == 201;
+}}
+
+// ---------- oneM2M GET ----------
+bool getOneM2MData() {{
+  http.begin(wifiClient, String(server) + pollPath + pollQuery());
+  http.addHeader("X-M2M-Origin", origin);
+  http.addHeader("Accept", "application/json");
+
+  int httpCode = http.GET();
+  String payload = httpCode == 200 ? http.getString() : "";
+  http.end();
+  countPollBytes(payload.length());
+
+  // Conditional retrieval: nothing newer than the last content instance
+  if (httpCode == 204 || (httpCode == 200 && payload.length() == 0)) {{
+    return true;
+  }}
+
+  if (httpCode != 200) {{
+    Serial.print("GET HTTP Code: ");
+    Serial.println(httpCode);
+    return false;
+  }}
+
+  StaticJsonDocument<512> doc;
+  DeserializationError err = deserializeJson(doc, payload);
+  if (err) {{
+    Serial.print("JSON parse error: ");
+    Serial.println(err.c_str());
+    return true;
+  }}
+
+  const char* con = doc["m2m:cin"]["con"];
+  if (con && rememberCin(doc["m2m:cin"]["ri"], doc["m2m:cin"]["ct"])) {{
+    handleCommand(con);
+  }}
+  return true;
 }}
 '''
         return code
 
     # Generate POST sketch
     code = f'''/*
- * ESP8266 - oneM2M POST Operation (NO SSL)
+ * ESP8266 - oneM2M POST Operation ({transport_title})
  * Target: {base_url}/~/in-cse/in-name/{ae_name}/{container_name}/Data
  * Protocol: {protocol.upper()}
- * NOTE:
- * - Uses HTTP only
- * - Assumes server allows HTTP access
- */
+{transport_note} */
 
 #include <ESP8266WiFi.h>
 #include <ESP8266HTTPClient.h>
-#include <ArduinoJson.h>
+{tls_include}#include <ArduinoJson.h>
+#include <time.h>
 
 // ---------- WiFi credentials ----------
 const char* ssid     = "{wifi_ssid}";
@@ -189,9 +371,11 @@ const char* resourcePath = "/~/in-cse/in-name/{ae_name}/{container_name}/Data";
 const char* origin = "{origin}";
 
 // ---------- Objects ----------
-WiFiClient wifiClient;
+{client_decl}
 HTTPClient http;
 
+{tls_block}{schedule_block}
+
 // ---------- WiFi Connect ----------
 void connectWiFi() {{
   Serial.print("Connecting to WiFi");
@@ -210,25 +394,26 @@ void connectWiFi() {{
 void setup() {{
   Serial.begin(9600);
   connectWiFi();
-}}
+  initSchedule();
+{tls_setup}}}
 
 void loop() {{
-  postOneM2MData();
-  delay(10000);
+  bool ok = postOneM2MData();
+  delay(nextDelayMs(ok));
 }}
 
 // ---------- oneM2M POST ----------
-void postOneM2MData() {{
+bool postOneM2MData() {{
 
   if (WiFi.status() != WL_CONNECTED) {{
     Serial.println("WiFi lost. Reconnecting...");
     WiFi.disconnect();
     connectWiFi();
-    return;
+    return false;
   }}
 
   // Build data array: [epoch, value1, value2, ...]
-  unsigned long epoch = millis() / 1000; // Seconds since boot (use RTC for actual time)
+  unsigned long epoch = nowMs() / 1000; // Unix time once the clock is synced, else seconds since boot
   String dataArray = "[" + String(epoch){values_str} + "]";
   
   // Build oneM2M cin payload
@@ -263,7 +448,84 @@ void postOneM2MData() {{
   }}
   
   http.end();
+  return httpCode == 201;
 }}
 '''
     
     return code
+
+
+def _tls_settings(config, cse_url, port):
+    """Build the BearSSL setup for HTTPS sketches.
+
+    The server is probed for Max Fragment Length support so the receive
+    buffer can shrink from 16 KB to the smallest record size it accepts; the
+    session is cached for resumption, and the server is authenticated by
+    certificate fingerprint or trust anchor when one is configured.
+
+    Args:
+        config: Generation config; optional 'tls' dictionary with
+                'fingerprint' (SHA-1, hex) or 'trust_anchor' (PEM certificate)
+        cse_url: Server host name
+        port: Server port
+
+    Returns:
+        Dictionary with 'block' (globals, heapReport() and configureTls())
+    """
+    tls = config.get('tls') or {}
+    fingerprint = (tls.get('fingerprint') or '').strip()
+    trust_anchor = (tls.get('trust_anchor') or '').strip()
+
+    if trust_anchor:
+        pin_decl = f'// Trust anchor: only certificates issued by this CA (or this certificate) are accepted\nBearSSL::X509List trustAnchors(R"PEM(\n{trust_anchor}\n)PEM");\n'
+        pin_setup = '  wifiClient.setTrustAnchors(&trustAnchors);  // needs the clock set by initSchedule()'
+    elif fingerprint:
+        pin_decl = f'// SHA-1 fingerprint of the server certificate\nconst char* tlsFingerprint = "{fingerprint}";\n'
+        pin_setup = '  wifiClient.setFingerprint(tlsFingerprint);'
+    else:
+        pin_decl = ''
+        pin_setup = ('  // No fingerprint or trust anchor configured: the server is not authenticated\n'
+                     '  wifiClient.setInsecure();')
+
+    block = f'''// ---------- TLS (BearSSL) ----------
+const char* tlsHost = "{cse_url}";
+const uint16_t tlsPort = {port};
+BearSSL::Session tlsSession;  // resumed on reconnect, skipping the full handshake
+{pin_decl}
+void heapReport(const char* stage) {{
+  Serial.printf("[heap] %s: free %u B, largest block %u B, fragmentation %u%%\\n",
+                stage, (unsigned) ESP.getFreeHeap(), (unsigned) ESP.getMaxFreeBlockSize(),
+                (unsigned) ESP.getHeapFragmentation());
+}}
+
+void configureTls() {{
+{pin_setup}
+  wifiClient.setSession(&tlsSession);
+
+  // Use the smallest record size the server accepts instead of 16 KB buffers
+  const uint16_t sizes[] = {{512, 1024, 2048, 4096}};
+  uint16_t rx = 16384;
+  for (uint16_t size : sizes) {{
+    if (wifiClient.probeMaxFragmentLength(tlsHost, tlsPort, size)) {{
+      rx = size;
+      break;
+    }}
+  }}
+  wifiClient.setBufferSizes(rx, 512);
+  Serial.print("TLS receive buffer: ");
+  Serial.print(rx);
+  Serial.println(rx == 16384 ? " B (server does not support MFLN)" : " B (MFLN)");
+
+  heapReport("before TLS");
+  unsigned long started = millis();
+  if (wifiClient.connect(tlsHost, tlsPort)) {{
+    Serial.print("TLS handshake: ");
+    Serial.print(millis() - started);
+    Serial.println(" ms");
+    heapReport("TLS connected");
+    wifiClient.stop();  // the cached session makes the first request a resumption
+  }} else {{
+    Serial.println("TLS connection failed");
+  }}
+}}'''
+    return {'block': block}
@@ -3,6 +3,9 @@ Python code generator for oneM2M - Production-ready implementation.
 """
 import json
 
+from .utils import (build_python_retrieval_block, build_python_schedule_block, normalize_retrieval,
+                    normalize_schedule)
+
 
 def generate_python_code(config):
     """Generate Python code for oneM2M operations.
@@ -29,11 +32,23 @@ def generate_python_code(config):
     operation = config.get('operation', 'GET').upper()
     params = config.get('parameters', [])
     labels = config.get('labels', []) or []
+    schedule_block = build_python_schedule_block(normalize_schedule(config))
+
+    # Many AE/container pairs: concurrent live dashboard reader
+    targets = _parse_targets(config.get('targets'))
+    if operation == 'GET' and targets:
+        return _generate_dashboard_client(config, targets)
 
-    # Minimal GET template (matches testing_code/GET/PYTHON_GET.py)
+    # Minimal GET template (based on testing_code/GET/PYTHON_GET.py)
     if operation == 'GET':
+        retrieval_block = build_python_retrieval_block(normalize_retrieval(config))
         code = f'''import requests
 import json
+import random
+import time
+import uuid
+import zlib
+from urllib.parse import quote
 
 url = "{protocol}://{cse_url}:{port}/~/in-cse/in-name/{ae_name}/{container_name}/Data/la"
 
@@ -43,30 +58,51 @@ headers = {{
     'Content-Type': 'application/json'
 }}
 
+{schedule_block}
+
+
+{retrieval_block}
+
+
 def getData():
-    response = requests.request("GET", url, headers=headers, data=payload)
-    
+    response = requests.request("GET", poll_url(url), headers=headers, data=payload, timeout=10)
+    count_bytes(response)
+
+    # Conditional retrieval: nothing newer than the last content instance
+    if response.status_code == 204 or (response.status_code == 200 and not response.content.strip()):
+        print("unchanged")
+        return True
+
     # Check if the response status code is 200 (OK)
     if response.status_code == 200:
         # Parse the JSON response
         data = json.loads(response.text)
-        
+        cin = data.get("m2m:cin")
+        if not cin or not is_new(cin):
+            print("unchanged")
+            return True
+
         # Extract the "con" value using the get method
-        con_value = data.get("m2m:cin", {{}}).get("con", "Value not found")
+        con_value = cin.get("con", "Value not found")
         
         # Print the "con" value
         print("con:", con_value)
+        return True
     else:
         print("Request failed with status code:", response.status_code)
+        return False
 
-# Run once
-getData()
-
-# Uncomment below to run in loop every 10 seconds
-# import time
-# while True:
-#     getData()
-#     time.sleep(10)
+# Poll on this device's schedule, backing off while the CSE is unavailable
+time.sleep(start_offset())
+failures = 0
+while True:
+    try:
+        ok = getData()
+    except requests.exceptions.RequestException as e:
+        print("Request failed:", e)
+        ok = False
+    failures = 0 if ok else failures + 1
+    time.sleep(next_slot_delay() if ok else backoff_delay(failures))
 '''
         return code
 
@@ -107,10 +143,23 @@ getData()
     values_in_array = ', '.join(variable_names) if variable_names else ''
     labels_block = json.dumps(labels)
 
+    store = config.get('store_and_forward') or {}
+    aggregation = config.get('aggregation') or {}
+    metrics = _normalize_metrics(config)
+    if aggregation.get('enabled'):
+        return _generate_aggregating_client(config, params, aggregation, labels_block, store, metrics)
+    if store.get('enabled'):
+        return _generate_store_and_forward_client(
+            config, var_declarations_str, values_in_array, labels_block, store, metrics)
+
+    hooks = _metrics_hooks(metrics, ('json', 'random', 'requests', 'time', 'uuid', 'zlib'))
     code = f'''import requests
 import json
+import random
 import time
-
+import uuid
+import zlib
+{hooks['imports']}
 def create_cin(Om2mLable, value):
     
     headers = {{
@@ -126,31 +175,795 @@ def create_cin(Om2mLable, value):
     }}
     OM2M_URL = "{protocol}://{cse_url}:{port}/~/in-cse/in-name/{ae_name}/{container_name}/Data"
     try:
-        response = requests.post(OM2M_URL, json=body, headers=headers)
+        response = {hooks['post']}OM2M_URL, json=body, headers=headers, timeout=10)
         print(f'Return code: {{response.status_code}}')
         return response.status_code
     except TypeError:
-        response = requests.post(OM2M_URL, data=json.dumps(body), headers=headers)
+        response = {hooks['post']}OM2M_URL, data=json.dumps(body), headers=headers, timeout=10)
         print(f'Return code: {{response.status_code}}')
         return response.status_code
 
 
+{hooks['block']}{schedule_block}
+
+
 # Configure your data parameters
 {var_declarations_str}
 
-# Build data array: [epoch, value1, value2, ...]
-epoch = int(time.time())
-data = [epoch{", " + values_in_array if values_in_array else ""}]
+# Configure labels
+Om2mLable = {labels_block}
+
+# Send data on this device's schedule, backing off while the CSE is unavailable
+{hooks['start']}time.sleep(start_offset())
+failures = 0
+while True:
+    # Build data array: [epoch, value1, value2, ...]
+    epoch = int(time.time())
+    data = [epoch{", " + values_in_array if values_in_array else ""}]
 
-# Convert data array to JSON string
-data_json = json.dumps(data)
+    # Convert data array to JSON string
+    data_json = json.dumps(data)
+
+    try:
+        status = create_cin(Om2mLable, data_json)
+    except requests.exceptions.RequestException as e:
+        print(f'POST failed: {{e}}')
+        status = None
+    ok = status is not None and 200 <= status < 300
+    failures = 0 if ok else failures + 1
+    time.sleep(next_slot_delay() if ok else backoff_delay(failures))
+'''
+
+    return code
+
+
+
+# Statistics the aggregating client can compute per parameter
+AGGREGATE_STATS = ('mean', 'min', 'max', 'count')
+
+
+def _generate_aggregating_client(config, params, aggregation, labels_block, store=None, metrics=None):
+    """Generate a Python client that samples fast and posts window aggregates.
+
+    Readings are collected into preallocated NumPy ring buffers (one per
+    parameter) and every `window` seconds the configured statistics are
+    posted in the usual array format: [epoch, p1_stat1, p1_stat2, ..., p2_stat1, ...].
+
+    Args:
+        config: Generation config (server and origin settings)
+        params: Parameter list; each entry may carry an 'aggregate' dict with
+                'window' (seconds) and 'stats' (subset of AGGREGATE_STATS)
+        aggregation: Dictionary with 'sample_rate' (Hz), 'window' (post
+                     interval in seconds, overrides the schedule interval)
+                     and default 'stats'
+        labels_block: JSON list of labels for the CIN
+        store: Optional store_and_forward settings; when enabled the
+               aggregates go through the durable outbox
+        metrics: Result of _normalize_metrics (None = no metrics)
+
+    Returns:
+        String containing complete Python script
+    """
+    store = store or {}
+    cse_url = config.get('cse_url', 'onem2m.iiit.ac.in')
+    port = config.get('port', '443')
+    protocol = config.get('protocol', 'https').lower()
+    ae_name = config.get('ae_name', '')
+    container_name = config.get('container_name', '')
+    origin = config.get('origin', '')
+
+    sample_rate = float(aggregation.get('sample_rate') or 10)
+    window = float(aggregation.get('window') or 30)
+    default_stats = [st for st in (aggregation.get('stats') or AGGREGATE_STATS) if st in AGGREGATE_STATS]
+    default_stats = default_stats or list(AGGREGATE_STATS)
+
+    # Aggregates are posted once per window, at this device's phase within it
+    schedule = dict(config.get('schedule') or {}, interval=window)
+    schedule_block = build_python_schedule_block(normalize_schedule({'schedule': schedule}))
+
+    spec_lines = []
+    reading_lines = []
+    layout = ['epoch']
+    for p in params if isinstance(params, list) else []:
+        if not isinstance(p, dict) or not p.get('name'):
+            continue
+        name = p['name']
+        dtype = (p.get('type') or 'string').lower()
+        default = p.get('default', '')
+        agg = p.get('aggregate') or {}
+
+        if dtype in ('int', 'integer', 'float', 'decimal'):
+            reading = default if default != '' else '0'
+        elif dtype in ('boolean', 'bool'):
+            reading = '1' if str(default).lower() in ('true', '1', 'yes') else '0'
+        else:
+            # Text values can't be aggregated; the latest reading is posted
+            reading_lines.append(f'        "{name}": "{default}",')
+            spec_lines.append(f'    ("{name}", None, ["last"]),')
+            layout.append(f'{name}_last')
+            continue
+
+        stats = [st for st in (agg.get('stats') or default_stats) if st in AGGREGATE_STATS] or default_stats
+        param_window = float(agg.get('window') or window)
+        reading_lines.append(f'        "{name}": {reading},')
+        spec_lines.append(f'    ("{name}", {param_window:g}, {json.dumps(stats)}),')
+        layout.extend(f'{name}_{st}' for st in stats)
+
+    spec_block = '\n'.join(spec_lines) if spec_lines else '    # No parameters configured'
+    readings_block = '\n'.join(reading_lines) if reading_lines else '        # No parameters configured'
+
+    if store.get('enabled'):
+        hooks = _metrics_hooks(metrics, ('json', 'random', 'sqlite3', 'threading', 'time', 'uuid', 'zlib'), '    ')
+        imports = 'import json\nimport random\nimport sqlite3\nimport threading\nimport time\nimport uuid\nimport zlib'
+        post_block = _outbox_block(store, hooks)
+        setup = ('outbox = Outbox(OUTBOX_PATH)\n'
+                 + hooks['queue'] +
+                 '    print(f"Outbox: {outbox.depth()} unsent readings from previous runs")\n'
+                 '    threading.Thread(target=sender, args=(outbox,), daemon=True).start()\n    ')
+        submit = ('# Queue durably; the sender thread posts in order\n'
+                  '            outbox.append(json.dumps(data))')
+    else:
+        hooks = _metrics_hooks(metrics, ('json', 'random', 'threading', 'time', 'uuid', 'zlib'), '    ')
+        imports = 'import json\nimport random\nimport threading\nimport time\nimport uuid\nimport zlib'
+        post_block = _create_cin_block(hooks)
+        setup = ''
+        submit = ('# Post off the sampling thread so readings never stall on the network\n'
+                  '            threading.Thread(target=create_cin, args=(Om2mLable, json.dumps(data)), daemon=True).start()')
+
+    code = f'''{imports}
+{hooks['imports']}
+import numpy as np
+import requests
+
+OM2M_URL = "{protocol}://{cse_url}:{port}/~/in-cse/in-name/{ae_name}/{container_name}/Data"
+ORIGIN = "{origin}"
+
+SAMPLE_RATE_HZ = {sample_rate:g}
+
+{hooks['block']}{schedule_block}
+
+# (name, window seconds, statistics) - text parameters post their last value
+PARAMETERS = [
+{spec_block}
+]
+
+# con layout: {json.dumps(layout)}
 
-# Configure labels
 Om2mLable = {labels_block}
 
-# Send data
-create_cin(Om2mLable, data_json)
+
+def read_sensors():
+    """Return one reading per parameter. Replace with real sensor reads."""
+    return {{
+{readings_block}
+    }}
+
+
+class RingWindow:
+    """Preallocated ring buffer holding the last `seconds` of samples."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.size = max(1, int(round(seconds * SAMPLE_RATE_HZ)))
+        self.values = np.zeros(self.size, dtype=np.float64)
+        self.times = np.zeros(self.size, dtype=np.float64)
+        self.index = 0
+        self.filled = 0
+
+    def add(self, t, value):
+        self.values[self.index] = value
+        self.times[self.index] = t
+        self.index = (self.index + 1) % self.size
+        self.filled = min(self.filled + 1, self.size)
+
+    def stats(self, now, names):
+        times = self.times[:self.filled]
+        values = self.values[:self.filled][times > now - self.seconds]
+        if values.size == 0:
+            return [0 if name == "count" else None for name in names]
+        result = {{
+            "mean": lambda: round(float(values.mean()), 4),
+            "min": lambda: round(float(values.min()), 4),
+            "max": lambda: round(float(values.max()), 4),
+            "count": lambda: int(values.size),
+        }}
+        return [result[name]() for name in names]
+
+
+{post_block}
+
+
+def main():
+    {setup}windows = {{name: RingWindow(seconds) for name, seconds, _ in PARAMETERS if seconds}}
+    latest = {{}}
+    period = 1.0 / SAMPLE_RATE_HZ
+    {hooks['start']}time.sleep(start_offset())
+    next_sample = time.monotonic()
+    next_post = next_sample + next_slot_delay()
+
+    while True:
+        now = time.time()
+        readings = read_sensors()
+        for name, seconds, _ in PARAMETERS:
+            if seconds:
+                windows[name].add(now, float(readings[name]))
+            else:
+                latest[name] = readings[name]
+
+        if time.monotonic() >= next_post:
+            # Build data array: [epoch, aggregates...]
+            data = [int(now)]
+            for name, seconds, stats in PARAMETERS:
+                data.extend(windows[name].stats(now, stats) if seconds else [latest.get(name)])
+            {submit}
+            next_post += INTERVAL_S
+
+        next_sample += period
+        time.sleep(max(0.0, next_sample - time.monotonic()))
+
+
+if __name__ == "__main__":
+    main()
 '''
 
     return code
 
+
+def _parse_targets(targets):
+    """Normalise dashboard targets to a list of (ae_name, container_name).
+
+    Accepts dictionaries with ae_name/container_name or "AE/container" strings.
+    """
+    pairs = []
+    for t in targets or []:
+        if isinstance(t, dict):
+            ae, cnt = (t.get('ae_name') or '').strip(), (t.get('container_name') or '').strip()
+        elif isinstance(t, str) and '/' in t:
+            ae, cnt = (part.strip() for part in t.split('/', 1))
+        else:
+            continue
+        if ae and cnt and (ae, cnt) not in pairs:
+            pairs.append((ae, cnt))
+    return pairs
+
+
+def _generate_dashboard_client(config, targets):
+    """Generate a Python reader that polls many containers' latest CIN concurrently.
+
+    All requests share one pooled session, ask only for con/ct/ri through
+    attribute-limited retrieval (atrl) and the results are redrawn as a live
+    table with per-container fetch latency.
+
+    Args:
+        config: Generation config (server, origin and optional refresh_interval)
+        targets: List of (ae_name, container_name) pairs
+
+    Returns:
+        String containing complete Python script
+    """
+    cse_url = config.get('cse_url', 'onem2m.iiit.ac.in')
+    port = config.get('port', '443')
+    protocol = config.get('protocol', 'https').lower()
+    origin = config.get('origin', '')
+    refresh = float(config.get('refresh_interval') or 5)
+    workers = min(64, max(4, len(targets)))
+
+    targets_block = '\n'.join(f'    ("{ae}", "{cnt}"),' for ae, cnt in targets)
+
+    code = f'''import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_URL = "{protocol}://{cse_url}:{port}/~/in-cse/in-name"
+ORIGIN = "{origin}"
+
+REFRESH_S = {refresh:g}
+MAX_WORKERS = {workers}
+
+# Ask the CSE for con/ct/ri only (attribute-limited retrieval). Turned off
+# per container automatically if the CSE rejects the atrl parameter.
+USE_ATTRIBUTE_LIST = True
+
+TARGETS = [
+{targets_block}
+]
+
+session = requests.Session()
+adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS)
+session.mount("http://", adapter)
+session.mount("https://", adapter)
+headers = {{
+    'X-M2M-Origin': ORIGIN,
+    'Accept': 'application/json'
+}}
+
+state = {{target: {{"atrl": USE_ATTRIBUTE_LIST, "ri": None, "con": "", "ct": "",
+                   "status": "-", "latency_ms": None, "changed": False}}
+         for target in TARGETS}}
+
+
+def fetch(target):
+    ae, container = target
+    entry = state[target]
+    url = f"{{BASE_URL}}/{{ae}}/{{container}}/Data/la"
+    params = {{"atrl": "con ct ri"}} if entry["atrl"] else None
+    start = time.perf_counter()
+    try:
+        response = session.get(url, headers=headers, params=params, timeout=10)
+        if response.status_code == 400 and params:
+            entry["atrl"] = False
+            return fetch(target)
+        entry["latency_ms"] = (time.perf_counter() - start) * 1000
+        entry["status"] = response.status_code
+        if response.status_code == 200:
+            body = response.json()
+            cin = body.get("m2m:cin") if isinstance(body, dict) else None
+            if not isinstance(cin, dict):
+                # One odd container must not stop the others from refreshing
+                entry["status"] = "bad body"
+                return
+            entry["changed"] = cin.get("ri") != entry["ri"]
+            entry["ri"] = cin.get("ri")
+            entry["con"] = str(cin.get("con", ""))
+            entry["ct"] = str(cin.get("ct") or "")
+    except (requests.exceptions.RequestException, ValueError) as e:
+        entry["latency_ms"] = (time.perf_counter() - start) * 1000
+        entry["status"] = type(e).__name__
+
+
+def render(cycle_ms):
+    width = max(len(f"{{ae}}/{{c}}") for ae, c in TARGETS)
+    lines = [
+        f"oneM2M live view - {{len(TARGETS)}} containers, cycle {{cycle_ms:.0f}} ms, "
+        f"refresh {{REFRESH_S:g}}s - {{time.strftime('%H:%M:%S')}}",
+        "",
+        f"{{'CONTAINER':<{{width}}}}  {{'STATUS':>8}}  {{'MS':>7}}  {{'CT':<15}}  CON",
+    ]
+    for target in TARGETS:
+        e = state[target]
+        name = f"{{target[0]}}/{{target[1]}}"
+        ms = f"{{e['latency_ms']:.0f}}" if e["latency_ms"] is not None else "-"
+        marker = "*" if e["changed"] else " "
+        lines.append(f"{{name:<{{width}}}}  {{str(e['status']):>8}}  {{ms:>7}}  {{e['ct']:<15}} {{marker}}{{e['con'][:60]}}")
+    # Clear the screen and redraw from the top-left corner
+    sys.stdout.write("\\033[2J\\033[H" + "\\n".join(lines) + "\\n")
+    sys.stdout.flush()
+
+
+def main():
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        while True:
+            start = time.perf_counter()
+            list(pool.map(fetch, TARGETS))
+            cycle_s = time.perf_counter() - start
+            render(cycle_s * 1000)
+            time.sleep(max(0.0, REFRESH_S - cycle_s))
+
+
+if __name__ == "__main__":
+    main()
+'''
+    return code
+
+
+def _create_cin_block(hooks):
+    """Return the fire-and-forget POST used by clients without the durable outbox."""
+    return f'''def create_cin(Om2mLable, value):
+    
+    headers = {{
+        'X-M2M-Origin': ORIGIN,
+        'Content-type': 'application/json;ty=4'
+    }}
+    body = {{
+        "m2m:cin": {{
+            "con": "{{}}".format(value),
+            "lbl": Om2mLable,
+            "cnf": "text"
+        }}
+    }}
+    try:
+        response = {hooks['post']}OM2M_URL, json=body, headers=headers, timeout=10)
+        print(f'Return code: {{response.status_code}}')
+        return response.status_code
+    except requests.exceptions.RequestException as e:
+        print(f'POST failed: {{e}}')
+        return None'''
+
+
+def _outbox_block(store, hooks):
+    """Return generated code for the SQLite outbox and its background sender.
+
+    Expects OM2M_URL, ORIGIN, Om2mLable and the scheduling helpers to be
+    defined by the surrounding template and `sqlite3`, `threading`, `time`
+    and `requests` to be imported.
+
+    Args:
+        store: Dictionary with optional 'path' (database file) and 'max_rate'
+               (posts per second)
+        hooks: Result of _metrics_hooks
+    """
+    path = store.get('path') or 'onem2m_outbox.db'
+    max_rate = float(store.get('max_rate') or 5)
+
+    return f'''OUTBOX_PATH = "{path}"
+MAX_POSTS_PER_S = {max_rate:g}
+
+
+class Outbox:
+    """Durable FIFO of readings waiting to be posted (SQLite in WAL mode).
+
+    Every reading is committed before append() returns. The id of the last
+    reading the CSE acknowledged is kept in the progress table, so a restart
+    resumes with the first unacknowledged reading.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.ready = threading.Event()
+        self._local = threading.local()
+        conn = self._conn()
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS outbox ("
+                         "id INTEGER PRIMARY KEY AUTOINCREMENT, con TEXT NOT NULL, created REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS progress ("
+                         "k INTEGER PRIMARY KEY CHECK (k = 0), last_acked INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO progress VALUES (0, 0)")
+
+    def _conn(self):
+        # One connection per thread (sampler and sender)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, con):
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT INTO outbox (con, created) VALUES (?, ?)", (con, time.time()))
+        self.ready.set()
+
+    def pending(self, limit=50):
+        conn = self._conn()
+        last_acked = conn.execute("SELECT last_acked FROM progress").fetchone()[0]
+        return conn.execute("SELECT id, con FROM outbox WHERE id > ? ORDER BY id LIMIT ?",
+                            (last_acked, limit)).fetchall()
+
+    def ack(self, row_id):
+        conn = self._conn()
+        with conn:
+            conn.execute("UPDATE progress SET last_acked = ? WHERE k = 0", (row_id,))
+            conn.execute("DELETE FROM outbox WHERE id <= ?", (row_id,))
+
+    def depth(self):
+        conn = self._conn()
+        return conn.execute("SELECT COUNT(*) FROM outbox WHERE id > "
+                            "(SELECT last_acked FROM progress)").fetchone()[0]
+
+
+def post_cin(session, value):
+    headers = {{
+        'X-M2M-Origin': ORIGIN,
+        'Content-type': 'application/json;ty=4'
+    }}
+    body = {{
+        "m2m:cin": {{
+            "con": value,
+            "lbl": Om2mLable,
+            "cnf": "text"
+        }}
+    }}
+    try:
+        response = {hooks['session_post']}OM2M_URL, json=body, headers=headers, timeout=10)
+        return response.status_code
+    except requests.exceptions.RequestException as e:
+        print(f'POST failed: {{e}}')
+        return None
+
+
+def sender(outbox):
+    """Drain the outbox in order over one persistent connection."""
+    session = requests.Session()
+    min_gap = 1.0 / MAX_POSTS_PER_S
+    failures = 0
+    while True:
+        rows = outbox.pending()
+        if not rows:
+            outbox.ready.wait(timeout=INTERVAL_S)
+            outbox.ready.clear()
+            continue
+        for row_id, con in rows:
+            started = time.monotonic()
+            status = post_cin(session, con)
+            if status is not None and 200 <= status < 300:
+                failures = 0
+                outbox.ack(row_id)
+                print(f'Return code: {{status}} (row {{row_id}}, {{outbox.depth()}} queued)')
+            elif status is not None and 400 <= status < 500 and status not in (408, 429):
+                # The CSE will never accept this reading; don't block the queue on it
+                print(f'Return code: {{status}}, dropping row {{row_id}}')
+                outbox.ack(row_id)
+            else:
+                failures += 1
+                wait = backoff_delay(failures)
+                print(f'CSE unavailable ({{status}}), retrying in {{wait:.1f}}s')
+                time.sleep(wait)
+                break
+            time.sleep(max(0.0, min_gap - (time.monotonic() - started)))'''
+
+
+def _generate_store_and_forward_client(config, var_declarations_str, values_in_array, labels_block, store,
+                                       metrics=None):
+    """Generate a Python POST client that queues every reading on disk first.
+
+    Readings are appended to a SQLite (WAL) outbox and a background sender
+    drains it in order, so readings taken while the CSE is unreachable are
+    replayed once it is back.
+
+    Args:
+        config: Generation config (server, origin, 'schedule'; a top-level
+                'interval' is used when the schedule doesn't set one)
+        var_declarations_str: Parameter variable declarations
+        values_in_array: Comma-separated parameter names for the data array
+        labels_block: JSON list of labels for the CIN
+        store: store_and_forward settings, see _outbox_block
+        metrics: Result of _normalize_metrics (None = no metrics)
+
+    Returns:
+        String containing complete Python script
+    """
+    cse_url = config.get('cse_url', 'onem2m.iiit.ac.in')
+    port = config.get('port', '443')
+    protocol = config.get('protocol', 'https').lower()
+    ae_name = config.get('ae_name', '')
+    container_name = config.get('container_name', '')
+    origin = config.get('origin', '')
+    schedule = normalize_schedule(config, default_interval=float(config.get('interval') or 10))
+    hooks = _metrics_hooks(metrics, ('json', 'random', 'sqlite3', 'threading', 'time', 'uuid', 'zlib'), '    ')
+
+    code = f'''import json
+import random
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+{hooks['imports']}
+import requests
+
+OM2M_URL = "{protocol}://{cse_url}:{port}/~/in-cse/in-name/{ae_name}/{container_name}/Data"
+ORIGIN = "{origin}"
+
+{hooks['block']}{build_python_schedule_block(schedule)}
+
+# Configure labels
+Om2mLable = {labels_block}
+
+# Configure your data parameters
+{var_declarations_str}
+
+
+def read_data():
+    # Build data array: [epoch, value1, value2, ...]
+    epoch = int(time.time())
+    return [epoch{", " + values_in_array if values_in_array else ""}]
+
+
+{_outbox_block(store, hooks)}
+
+
+def main():
+    outbox = Outbox(OUTBOX_PATH)
+{hooks['queue']}    print(f"Outbox: {{outbox.depth()}} unsent readings from previous runs")
+    threading.Thread(target=sender, args=(outbox,), daemon=True).start()
+
+    {hooks['start']}time.sleep(start_offset())
+    while True:
+        outbox.append(json.dumps(read_data()))
+        time.sleep(next_slot_delay())
+
+
+if __name__ == "__main__":
+    main()
+'''
+    return code
+
+
+def _normalize_metrics(config):
+    """Normalise the optional 'metrics' settings of a Python POST client.
+
+    Returns:
+        None when disabled, else a dictionary with 'port' (None = no HTTP
+        endpoint), 'bind' and 'dump_interval' (seconds, 0 = no periodic dump)
+    """
+    metrics = config.get('metrics') or {}
+    if not metrics.get('enabled'):
+        return None
+    port = metrics.get('port', 9108)
+    port = int(port) if port else None
+    dump_interval = float(metrics.get('dump_interval') or 0)
+    if port is None and not dump_interval:
+        # Nothing would expose the numbers otherwise
+        dump_interval = 60.0
+    return {
+        'port': port,
+        'bind': metrics.get('bind') or '127.0.0.1',
+        'dump_interval': dump_interval,
+    }
+
+
+def _metrics_block(metrics):
+    """Return generated code for the client's metrics registry and exporters.
+
+    Expects `bisect`, `http.server`, `json`, `threading` and `time` to be
+    imported by the template.
+    """
+    return f'''# ---------- Metrics ----------
+# POST latency histogram, outcome counters, queue depth and bytes sent.
+# Served in Prometheus text format at http://METRICS_BIND:METRICS_PORT/metrics
+# (JSON at /metrics.json) and/or printed as one JSON line every METRICS_DUMP_S.
+METRICS_PORT = {metrics['port']}  # None = no HTTP endpoint
+METRICS_BIND = "{metrics['bind']}"
+METRICS_DUMP_S = {metrics['dump_interval']:g}  # 0 = no periodic dump
+LATENCY_BUCKETS_S = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metrics:
+    """Counters updated on the post path; exporters read them on demand."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = [0] * (len(LATENCY_BUCKETS_S) + 1)  # last one is +Inf
+        self.latency_sum = 0.0
+        self.results = {{"success": 0, "http_error": 0, "network_error": 0}}
+        self.bytes_sent = 0
+        self.in_flight = 0
+        self.queue_depth = None  # callable returning queued readings, if any
+        self.started = time.time()
+
+    def begin(self):
+        with self.lock:
+            self.in_flight += 1
+
+    def observe(self, seconds, status, sent):
+        bucket = bisect.bisect_left(LATENCY_BUCKETS_S, seconds)
+        if status is None:
+            result = "network_error"
+        else:
+            result = "success" if 200 <= status < 300 else "http_error"
+        with self.lock:
+            self.in_flight -= 1
+            self.buckets[bucket] += 1
+            self.latency_sum += seconds
+            self.results[result] += 1
+            self.bytes_sent += sent
+
+    def snapshot(self):
+        with self.lock:
+            snap = {{
+                "uptime_s": round(time.time() - self.started, 1),
+                "posts": dict(self.results),
+                "latency_buckets": dict(zip([str(b) for b in LATENCY_BUCKETS_S] + ["+Inf"], self.buckets)),
+                "latency_sum_s": round(self.latency_sum, 6),
+                "bytes_sent": self.bytes_sent,
+                "in_flight": self.in_flight,
+            }}
+        # Queued readings, or posts still waiting on the CSE when there's no queue
+        snap["queue_depth"] = self.queue_depth() if self.queue_depth else snap["in_flight"]
+        return snap
+
+    def prometheus(self):
+        snap = self.snapshot()
+        lines = ["# TYPE onem2m_post_latency_seconds histogram"]
+        total = 0
+        for le, count in snap["latency_buckets"].items():
+            total += count
+            lines.append(f'onem2m_post_latency_seconds_bucket{{{{le="{{le}}"}}}} {{total}}')
+        lines.append(f"onem2m_post_latency_seconds_sum {{snap['latency_sum_s']}}")
+        lines.append(f"onem2m_post_latency_seconds_count {{total}}")
+        lines.append("# TYPE onem2m_posts_total counter")
+        for result, count in snap["posts"].items():
+            lines.append(f'onem2m_posts_total{{{{result="{{result}}"}}}} {{count}}')
+        lines.append("# TYPE onem2m_bytes_sent_total counter")
+        lines.append(f"onem2m_bytes_sent_total {{snap['bytes_sent']}}")
+        lines.append("# TYPE onem2m_queue_depth gauge")
+        lines.append(f"onem2m_queue_depth {{snap['queue_depth']}}")
+        lines.append("# TYPE onem2m_posts_in_flight gauge")
+        lines.append(f"onem2m_posts_in_flight {{snap['in_flight']}}")
+        return "\\n".join(lines) + "\\n"
+
+
+METRICS = Metrics()
+
+
+def metered(send, *args, **kwargs):
+    """Call requests.post / session.post and record latency, outcome and body bytes."""
+    METRICS.begin()
+    started = time.perf_counter()
+    try:
+        response = send(*args, **kwargs)
+    except Exception:
+        METRICS.observe(time.perf_counter() - started, None, 0)
+        raise
+    METRICS.observe(time.perf_counter() - started, response.status_code, len(response.request.body or b""))
+    return response
+
+
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/metrics":
+            body, content_type = METRICS.prometheus(), "text/plain; version=0.0.4"
+        elif path == "/metrics.json":
+            body, content_type = json.dumps(METRICS.snapshot()), "application/json"
+        else:
+            self.send_error(404)
+            return
+        body = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # keep scrapes out of the client's output
+
+
+def dump_metrics():
+    while True:
+        time.sleep(METRICS_DUMP_S)
+        print("METRICS " + json.dumps(METRICS.snapshot()))
+
+
+def start_metrics():
+    """Start the metrics endpoint and/or the periodic dump (daemon threads)."""
+    if METRICS_PORT:
+        # Single-threaded server: scrapes are rare and cheap
+        server = http.server.HTTPServer((METRICS_BIND, METRICS_PORT), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"Metrics: http://{{METRICS_BIND}}:{{METRICS_PORT}}/metrics")
+    if METRICS_DUMP_S:
+        threading.Thread(target=dump_metrics, daemon=True).start()'''
+
+
+# Standard-library modules the metrics block needs
+_METRICS_IMPORTS = ('bisect', 'http.server', 'json', 'threading', 'time')
+
+
+def _metrics_hooks(metrics, imported, indent=''):
+    """Return the code each POST template places at its metrics hook points.
+
+    Hook points (every one is empty, or the plain call, when metrics is None):
+        imports: `import` lines for modules the metrics block needs and the
+                 template doesn't import itself; goes after its imports
+        block: the metrics registry and exporters; goes ahead of the
+               scheduling section
+        post / session_post: opening of the POST call, so that
+                 `{post}URL, json=body)` is either `requests.post(URL, ...)`
+                 or `metered(requests.post, URL, ...)`
+        start: starts the exporters; goes in front of the first
+               `time.sleep(start_offset())`
+        queue: reports the outbox depth; a full line after the outbox is opened
+
+    Args:
+        metrics: Result of _normalize_metrics
+        imported: Modules the template imports
+        indent: Indentation of the statement the start hook precedes
+    """
+    if metrics is None:
+        return {'imports': '', 'block': '', 'post': 'requests.post(', 'session_post': 'session.post(',
+                'start': '', 'queue': ''}
+    return {
+        'imports': ''.join(f'import {module}\n' for module in _METRICS_IMPORTS if module not in imported),
+        'block': _metrics_block(metrics) + '\n\n\n',
+        'post': 'metered(requests.post, ',
+        'session_post': 'metered(session.post, ',
+        'start': f'start_metrics()\n{indent}',
+        'queue': '    METRICS.queue_depth = outbox.depth\n',
+    }
@@ -0,0 +1,86 @@
+"""
+Registry of the targets code can be generated for.
+
+Each target declares its name, output extension and file name, and the
+module and function that generate its code. Generator modules are imported
+on first use (or up front through preload()), so a process only pays for the
+controllers it actually serves.
+"""
+import importlib
+import threading
+import time
+from collections import namedtuple
+
+Target = namedtuple('Target', [
+    'name',             # controller id used by the routes and manifests
+    'module',           # module in this package holding the generator
+    'entry',            # generator function: entry(config) -> code
+    'extension',        # extension of the generated file
+    'filename',         # default download name
+    'microcontroller',  # embedded target (no localhost CSE)
+    'sources',          # files whose contents change its output
+])
+
+TARGETS = {target.name: target for target in (
+    Target('arduino_nano', 'arduino', 'generate_arduino_code', '.ino', 'onem2m_client.ino', True,
+           ('arduino.py', 'utils.py')),
+    Target('esp32', 'esp32', 'generate_esp32_code', '.ino', 'onem2m_client.ino', True,
+           ('esp32.py', 'utils.py')),
+    Target('esp8266', 'esp8266', 'generate_esp8266_code', '.ino', 'onem2m_client.ino', True,
+           ('esp8266.py', 'utils.py')),
+    Target('python', 'python_controller', 'generate_python_code', '.py', 'onem2m_client.py', False,
+           ('python_controller.py', 'utils.py')),
+)}
+
+_lock = threading.Lock()
+_generators = {}   # target name -> generator function
+_load_ms = {}      # target name -> milliseconds its first import took
+
+
+def load_generator(name):
+    """Generator function of a target, importing its module on first use.
+
+    Raises:
+        KeyError: If no target has this name
+    """
+    generator = _generators.get(name)
+    if generator is None:
+        target = TARGETS[name]
+        with _lock:
+            generator = _generators.get(name)
+            if generator is None:
+                started = time.perf_counter()
+                module = importlib.import_module(f'.{target.module}', __package__)
+                generator = getattr(module, target.entry)
+                _load_ms[name] = round((time.perf_counter() - started) * 1000, 2)
+                _generators[name] = generator
+    return generator
+
+
+def preload(names='all'):
+    """Import generators ahead of their first request.
+
+    Args:
+        names: 'all', a comma-separated string or a list of target names;
+               empty loads nothing
+
+    Returns:
+        Names that were loaded
+
+    Raises:
+        KeyError: If a name isn't a registered target
+    """
+    if isinstance(names, str):
+        names = list(TARGETS) if names.strip() == 'all' else [n.strip() for n in names.split(',') if n.strip()]
+    for name in names:
+        load_generator(name)
+    return list(names)
+
+
+def status():
+    """Per-target registration and load state."""
+    return {name: {'extension': target.extension,
+                   'entry': f'{target.module}.{target.entry}',
+                   'loaded': name in _generators,
+                   'load_ms': _load_ms.get(name)}
+            for name, target in TARGETS.items()}
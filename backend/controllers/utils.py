@@ -1,6 +1,8 @@
 """
 Utility functions shared across controller generators.
 """
+import functools
+import re
 
 
 def build_escaped_inner_json(params):
@@ -40,3 +42,685 @@ def build_escaped_inner_json(params):
             lines.append('  inner += ",";')
 
     return '\n'.join(decls), '\n'.join(lines)
+
+
+# Both ESP cores ship an SNTP client behind configTime()
+NTP_EPOCH_SOURCE = '''// Unix time from NTP, or 0 if it can't be fetched within a few seconds
+unsigned long currentEpoch() {
+  configTime(0, 0, "pool.ntp.org", "time.nist.gov");
+  time_t now = time(nullptr);
+  for (int i = 0; i < 20 && now < 1600000000; i++) {
+    delay(250);
+    now = time(nullptr);
+  }
+  return now < 1600000000 ? 0 : (unsigned long)now;
+}'''
+
+
+def normalize_schedule(config, default_interval=10):
+    """Read the posting schedule shared by every generator.
+
+    Args:
+        config: Generation config; optional 'schedule' dictionary with
+                interval, start_jitter, backoff_base, backoff_max (seconds)
+                and phase (seconds, or None/'auto' to derive it per device)
+        default_interval: Interval used when the config doesn't set one
+
+    Returns:
+        Dictionary with the same keys, all numeric except phase
+    """
+    schedule = config.get('schedule') or {}
+
+    def seconds(key, default):
+        try:
+            value = float(schedule.get(key))
+        except (TypeError, ValueError):
+            return default
+        return value if value >= 0 else default
+
+    interval = seconds('interval', default_interval) or default_interval
+    phase = schedule.get('phase')
+    if phase in (None, '', 'auto'):
+        phase = None
+    else:
+        try:
+            phase = float(phase) % interval
+        except (TypeError, ValueError):
+            phase = None
+
+    return {
+        'interval': interval,
+        'start_jitter': seconds('start_jitter', interval),
+        'backoff_base': seconds('backoff_base', 2) or 2,
+        'backoff_max': max(seconds('backoff_max', 300), seconds('backoff_base', 2) or 2),
+        'phase': phase,
+    }
+
+
+def build_schedule_block(schedule, epoch_source):
+    """Build C++ scheduling helpers for the microcontroller sketches.
+
+    Posts are aligned to the wall clock (when the board can get the time)
+    at a per-device phase derived from the MAC address, boot adds a random
+    start offset, and failures back off exponentially with full jitter.
+
+    Args:
+        schedule: Dictionary from normalize_schedule
+        epoch_source: C++ definition of `unsigned long currentEpoch()`
+                      returning Unix time in seconds, or 0 if unknown
+
+    Returns:
+        String of C++ declarations and functions
+    """
+    phase_ms = -1 if schedule['phase'] is None else int(schedule['phase'] * 1000)
+    return f'''// ---------- Scheduling ----------
+// Each device reports at its own phase within the interval and backs off
+// exponentially (with full jitter) on failure, so a fleet never retries in
+// lockstep after a CSE restart.
+const unsigned long INTERVAL_MS     = {int(schedule['interval'] * 1000)}UL;
+const unsigned long START_JITTER_MS = {int(schedule['start_jitter'] * 1000)}UL;
+const unsigned long BACKOFF_BASE_MS = {int(schedule['backoff_base'] * 1000)}UL;
+const unsigned long BACKOFF_MAX_MS  = {int(schedule['backoff_max'] * 1000)}UL;
+const long          PHASE_MS        = {phase_ms};  // -1 = derive from MAC address
+
+unsigned long phaseMs = 0;
+unsigned int failures = 0;
+unsigned long long clockOffsetMs = 0;  // Unix time in ms minus millis(), 0 if unknown
+
+{epoch_source}
+
+uint32_t macHash() {{
+  byte mac[6];
+  WiFi.macAddress(mac);
+  uint32_t h = 2166136261UL;  // FNV-1a
+  for (int i = 0; i < 6; i++) {{
+    h ^= mac[i];
+    h *= 16777619UL;
+  }}
+  return h;
+}}
+
+void initSchedule() {{
+  uint32_t h = macHash();
+  randomSeed(h ^ micros());
+  phaseMs = PHASE_MS >= 0 ? (unsigned long)PHASE_MS % INTERVAL_MS : h % INTERVAL_MS;
+
+  unsigned long epoch = currentEpoch();
+  if (epoch > 0) {{
+    clockOffsetMs = (unsigned long long)epoch * 1000ULL - millis();
+  }}
+
+  unsigned long startDelay = random(START_JITTER_MS + 1);
+  Serial.print("Phase: ");
+  Serial.print(phaseMs);
+  Serial.print(" ms, start offset: ");
+  Serial.print(startDelay);
+  Serial.println(" ms");
+  delay(startDelay);
+}}
+
+unsigned long long nowMs() {{
+  return clockOffsetMs + millis();
+}}
+
+// Milliseconds until this device's next slot (clock-aligned when time is known)
+unsigned long msUntilNextSlot() {{
+  return INTERVAL_MS - (unsigned long)((nowMs() + INTERVAL_MS - phaseMs) % INTERVAL_MS);
+}}
+
+// Capped exponential backoff with full jitter after `attempt` failures in a row
+unsigned long backoffMs(unsigned int attempt) {{
+  unsigned long cap = BACKOFF_BASE_MS;
+  for (unsigned int i = 1; i < attempt && cap < BACKOFF_MAX_MS; i++) {{
+    cap *= 2;
+  }}
+  if (cap > BACKOFF_MAX_MS) {{
+    cap = BACKOFF_MAX_MS;
+  }}
+  return random(cap + 1);
+}}
+
+unsigned long nextDelayMs(bool ok) {{
+  if (ok) {{
+    failures = 0;
+    return msUntilNextSlot();
+  }}
+  failures++;
+  unsigned long wait = backoffMs(failures);
+  Serial.print("Retrying in ");
+  Serial.print(wait);
+  Serial.println(" ms");
+  return wait;
+}}'''
+
+
+def build_python_schedule_block(schedule):
+    """Build the Python equivalent of build_schedule_block.
+
+    Expects `random`, `time`, `uuid` and `zlib` to be imported by the template.
+    """
+    phase = 'None' if schedule['phase'] is None else f"{schedule['phase']:g}"
+    return f'''# ---------- Scheduling ----------
+# Each device reports at its own phase within the interval and backs off
+# exponentially (with full jitter) on failure, so a fleet never retries in
+# lockstep after a CSE restart.
+INTERVAL_S = {schedule['interval']:g}
+START_JITTER_S = {schedule['start_jitter']:g}
+BACKOFF_BASE_S = {schedule['backoff_base']:g}
+BACKOFF_MAX_S = {schedule['backoff_max']:g}
+PHASE_S = {phase}  # None = derive from this machine's MAC address
+
+if PHASE_S is None:
+    PHASE_S = zlib.crc32(uuid.getnode().to_bytes(6, "big")) % int(INTERVAL_S * 1000) / 1000.0
+
+
+def start_offset():
+    """Random delay before the first request after start-up."""
+    return random.uniform(0, START_JITTER_S)
+
+
+def next_slot_delay():
+    """Seconds until this device's next clock-aligned slot."""
+    return INTERVAL_S - ((time.time() - PHASE_S) % INTERVAL_S)
+
+
+def backoff_delay(failures):
+    """Capped exponential backoff with full jitter."""
+    return random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** (failures - 1)))'''
+
+
+def build_sensor_variables(params, indent='  ', prefix=''):
+    """Build C++ globals for the parameters and the code appending them to the con array.
+
+    Used by sketches that sample into variables instead of posting constants.
+
+    Args:
+        params: List of parameter dictionaries with 'name', 'type', and 'default'
+        indent: Indentation of the generated statements
+        prefix: Prepended to each name when reading values, e.g. 'r.' for
+                fields of a struct named r
+
+    Returns:
+        Tuple of (declarations_string, array_building_lines) where the lines
+        append ', value' for each parameter to a String named dataArray
+    """
+    decls = []
+    lines = []
+    for p in params if isinstance(params, list) else []:
+        if not isinstance(p, dict) or not p.get('name'):
+            continue
+        name = p['name']
+        dtype = (p.get('type') or 'string').lower()
+        default = p.get('default', '')
+        if dtype in ('int', 'integer'):
+            decls.append(f"int {name} = {default or 0};")
+            lines.append(f'{indent}dataArray += ", " + String({prefix}{name});')
+        elif dtype in ('float', 'decimal'):
+            decls.append(f"float {name} = {default or 0.0};")
+            lines.append(f'{indent}dataArray += ", " + String({prefix}{name}, 2);')
+        elif dtype in ('boolean', 'bool'):
+            val = 'true' if str(default).lower() in ('1', 'true', 'yes') else 'false'
+            decls.append(f"bool {name} = {val};")
+            lines.append(f'{indent}dataArray += {prefix}{name} ? ", 1" : ", 0";')
+        else:
+            decls.append(f'String {name} = "{default}";')
+            lines.append(f'{indent}dataArray += ", \\"" + String({prefix}{name}) + "\\"";')
+
+    return '\n'.join(decls), '\n'.join(lines)
+
+
+def build_combined_tasks(config, sensor_decls, indent='  '):
+    """Build the cooperative scheduler shared by the combined POST + GET sketches.
+
+    Sampling, POST (on the schedule's clock-aligned slot) and GET polling
+    each keep their own next-run time in millis(); loop() samples whenever
+    due and runs at most one network request per pass, so a request can
+    delay a sample by no more than the HTTP timeout.
+
+    Args:
+        config: Generation config with optional 'sample_interval',
+                'poll_interval' (seconds) and 'http_timeout' (seconds)
+        sensor_decls: Sensor globals from build_sensor_variables
+        indent: Indentation of one block level in the generated code
+
+    Returns:
+        Tuple of (declarations_and_helpers, loop_function, http_timeout_ms).
+        Expects the schedule block, maintainWiFi(),
+        postOneM2MData() and getOneM2MData() to be defined by the sketch.
+    """
+    def seconds(key, default):
+        try:
+            value = float(config.get(key))
+        except (TypeError, ValueError):
+            return default
+        return value if value > 0 else default
+
+    sample_ms = int(seconds('sample_interval', 1) * 1000)
+    poll_ms = int(seconds('poll_interval', 5) * 1000)
+    http_timeout_ms = int(seconds('http_timeout', 3) * 1000)
+    i1, i2 = indent, indent * 2
+
+    tasks = f'''// ---------- Task intervals ----------
+const unsigned long SAMPLE_MS     = {sample_ms}UL;  // sensor reads
+const unsigned long POLL_MS       = {poll_ms}UL;  // GET of the latest content instance
+const unsigned long WIFI_RETRY_MS = 5000UL;  // between reconnect attempts
+
+unsigned long nextSampleAt = 0;
+unsigned long nextPostAt = 0;
+unsigned long nextPollAt = 0;
+unsigned long nextWifiAttemptAt = 0;
+unsigned int postFailures = 0;
+unsigned int pollFailures = 0;
+
+// ---------- Sensor values (updated by sampleSensors, sent by POST) ----------
+{sensor_decls or '// No parameters configured'}
+
+// True once `at` has been reached (safe across millis() rollover)
+bool due(unsigned long now, unsigned long at) {{
+{i1}return (long)(now - at) >= 0;
+}}
+
+void sampleSensors() {{
+{i1}// Replace with real sensor reads; POST sends the latest values
+}}
+
+void handleCommand(const char* con) {{
+{i1}// Called once per new content instance (e.g. a command for this device)
+{i1}Serial.print("✅ con value: ");
+{i1}Serial.println(con);
+}}
+
+void startTasks() {{
+{i1}unsigned long now = millis();
+{i1}nextSampleAt = now;
+{i1}nextPostAt = now;
+{i1}nextPollAt = now + POLL_MS / 2;  // keep the first POST and GET apart
+}}'''
+
+    loop = f'''// ---------- Loop ----------
+void loop() {{
+{i1}unsigned long now = millis();
+
+{i1}if (due(now, nextSampleAt)) {{
+{i2}sampleSensors();
+{i2}nextSampleAt = now + SAMPLE_MS;
+{i1}}}
+
+{i1}// Sampling keeps running while WiFi reconnects
+{i1}if (!maintainWiFi(now)) {{
+{i2}return;
+{i1}}}
+
+{i1}// At most one request per pass so the next sample is never far behind
+{i1}if (due(now, nextPostAt)) {{
+{i2}bool ok = postOneM2MData();
+{i2}postFailures = ok ? 0 : postFailures + 1;
+{i2}nextPostAt = millis() + (ok ? msUntilNextSlot() : backoffMs(postFailures));
+{i1}}} else if (due(now, nextPollAt)) {{
+{i2}bool ok = getOneM2MData();
+{i2}pollFailures = ok ? 0 : pollFailures + 1;
+{i2}nextPollAt = millis() + (ok ? POLL_MS : backoffMs(pollFailures));
+{i1}}}
+}}'''
+
+    return tasks, loop, http_timeout_ms
+
+
+def normalize_retrieval(config):
+    """Read the GET retrieval options shared by every generator.
+
+    Args:
+        config: Generation config; optional 'retrieval' dictionary with
+                attributes (list or '+'/space separated string of attribute
+                short names, empty for the whole CIN) and conditional (bool)
+
+    Returns:
+        Dictionary with attributes (list) and conditional (bool)
+    """
+    retrieval = config.get('retrieval') or {}
+    attributes = retrieval.get('attributes', ['con', 'ct', 'ri'])
+    if isinstance(attributes, str):
+        attributes = attributes.replace('+', ' ').replace(',', ' ').split()
+    attributes = [a.strip() for a in attributes or [] if a and a.strip()]
+
+    # The client needs con to report and ct to ask for newer instances
+    if attributes:
+        for required in ('con', 'ct'):
+            if required not in attributes:
+                attributes.append(required)
+    return {'attributes': attributes, 'conditional': bool(retrieval.get('conditional', True))}
+
+
+def build_retrieval_block(retrieval, indent='  '):
+    """Build the C++ helpers for attribute-limited, conditional GET polling.
+
+    Defines lastRi/lastCt, pollQuery() (query string to append to the /la
+    path), countPollBytes() and rememberCin().
+
+    Args:
+        retrieval: Options from normalize_retrieval
+        indent: Indentation of one block level in the generated code
+    """
+    i1, i2 = indent, indent * 2
+    return f'''// ---------- Retrieval ----------
+// Ask only for these attributes and, once a CIN has been seen, only for a
+// newer one (fu=2&cra=<ct>). An unchanged container then costs an empty
+// response, or the same ri when the CSE ignores the conditions.
+const char* RETRIEVE_ATTRS = "{'+'.join(retrieval['attributes'])}";  // "" = whole CIN
+const bool CONDITIONAL_GET = {'true' if retrieval['conditional'] else 'false'};
+
+String lastRi = "";
+String lastCt = "";
+unsigned long pollCount = 0;
+unsigned long pollBytes = 0;
+
+String pollQuery() {{
+{i1}String query = "";
+{i1}if (RETRIEVE_ATTRS[0]) {{
+{i2}query += "?atrl=";
+{i2}query += RETRIEVE_ATTRS;
+{i1}}}
+{i1}if (CONDITIONAL_GET && lastCt.length() > 0) {{
+{i2}query += query.length() > 0 ? "&" : "?";
+{i2}query += "fu=2&cra=";
+{i2}query += lastCt;
+{i1}}}
+{i1}return query;
+}}
+
+// Body bytes of one poll response, with the running average
+void countPollBytes(size_t bytes) {{
+{i1}pollCount++;
+{i1}pollBytes += bytes;
+{i1}Serial.print("Poll bytes: ");
+{i1}Serial.print((unsigned long)bytes);
+{i1}Serial.print(" (avg ");
+{i1}Serial.print(pollBytes / pollCount);
+{i1}Serial.println(")");
+}}
+
+// True for a CIN not seen before; remembers its ri and ct
+bool rememberCin(const char* ri, const char* ct) {{
+{i1}if ((ri && lastRi == ri) || (!ri && ct && lastCt == ct)) {{
+{i2}return false;
+{i1}}}
+{i1}lastRi = ri ? ri : "";
+{i1}if (ct) {{
+{i2}lastCt = ct;
+{i1}}}
+{i1}return true;
+}}'''
+
+
+def build_python_retrieval_block(retrieval):
+    """Build the Python equivalent of build_retrieval_block.
+
+    Expects `quote` (from urllib.parse) to be imported by the template.
+    """
+    return f'''# ---------- Retrieval ----------
+# Ask only for these attributes and, once a CIN has been seen, only for a
+# newer one (fu=2&cra=<ct>). An unchanged container then costs an empty
+# response, or the same ri when the CSE ignores the conditions.
+ATTRIBUTES = "{'+'.join(retrieval['attributes'])}"  # "" = whole CIN
+CONDITIONAL = {retrieval['conditional']}
+
+last_ri = None
+last_ct = None
+poll_count = 0
+poll_bytes = 0
+
+
+def poll_url(base_url):
+    """`base_url` with the attribute list and, after the first CIN, the condition."""
+    query = []
+    if ATTRIBUTES:
+        query.append("atrl=" + ATTRIBUTES)
+    if CONDITIONAL and last_ct:
+        query.append("fu=2&cra=" + quote(last_ct))
+    return base_url + ("?" + "&".join(query) if query else "")
+
+
+def count_bytes(response):
+    """Print the bytes received for one poll (status line, headers and body)."""
+    global poll_count, poll_bytes
+    size = len(f"HTTP/1.1 {{response.status_code}} {{response.reason}}\\r\\n") + 2
+    size += sum(len(k) + len(v) + 4 for k, v in response.headers.items())
+    size += len(response.content)
+    poll_count += 1
+    poll_bytes += size
+    print(f"bytes: {{size}} (avg {{poll_bytes // poll_count}} over {{poll_count}} polls)")
+
+
+def is_new(cin):
+    """True for a CIN not seen before; remembers its ri and ct."""
+    global last_ri, last_ct
+    ri, ct = cin.get("ri"), cin.get("ct")
+    if (ri and ri == last_ri) or (not ri and ct and ct == last_ct):
+        return False
+    last_ri, last_ct = ri, ct or last_ct
+    return True'''
+
+
+# Serial output in release builds goes through these macros; LOG_LEVEL 1
+# keeps errors only and compiles everything else out
+_LOG_MACROS = '''
+// ---------- Logging (release profile) ----------
+// 0 = silent, 1 = errors (default), 2 = everything
+#ifndef LOG_LEVEL
+#define LOG_LEVEL 1
+#endif
+#if LOG_LEVEL >= 1
+#define LOG_ERROR(...)   Serial.print(__VA_ARGS__)
+#define LOG_ERRORLN(...) Serial.println(__VA_ARGS__)
+#define LOG_ERRORF(...)  Serial.{printf}(__VA_ARGS__)
+#else
+#define LOG_ERROR(...)   do {{}} while (0)
+#define LOG_ERRORLN(...) do {{}} while (0)
+#define LOG_ERRORF(...)  do {{}} while (0)
+#endif
+#if LOG_LEVEL >= 2
+#define LOG_INFO(...)    Serial.print(__VA_ARGS__)
+#define LOG_INFOLN(...)  Serial.println(__VA_ARGS__)
+#define LOG_INFOF(...)   Serial.{printf}(__VA_ARGS__)
+#else
+#define LOG_INFO(...)    do {{}} while (0)
+#define LOG_INFOLN(...)  do {{}} while (0)
+#define LOG_INFOF(...)   do {{}} while (0)
+#endif
+'''
+
+# Start of a Serial.print/println/printf statement; the arguments may span lines
+_SERIAL_CALL = re.compile(r'^([ \t]*)Serial\.(printf|println|print)\(', re.MULTILINE)
+_WAIT_FOR_SERIAL = re.compile(r'^[ \t]*while \(!Serial\);[ \t]*\n', re.MULTILINE)
+_TRAILING_COMMENT = re.compile(r'[ \t]*(//[^\n]*)?(?=\n|$)')
+_BODY_PRINTS = {'response', 'payload', '"Raw JSON:"', '"Response:"', '"Response Payload:"', '"Received payload:"'}
+_ERROR_WORDS = re.compile(r'fail|error|lost|disconnected|retrying|not found|❌', re.IGNORECASE)
+_MACROS = {('print', False): 'LOG_INFO', ('println', False): 'LOG_INFOLN', ('printf', False): 'LOG_INFOF',
+           ('print', True): 'LOG_ERROR', ('println', True): 'LOG_ERRORLN', ('printf', True): 'LOG_ERRORF'}
+# Rough per-call cost of a Serial.print in flash (argument setup and call)
+_CALL_BYTES = 12
+
+
+def _split_literals(text):
+    """Split C++ source into (is_top_level_literal, piece) chunks.
+
+    String literals at parenthesis depth 0 are returned on their own; char
+    literals and everything nested inside (...) stay in the code pieces.
+    """
+    pieces = []
+    depth = start = i = 0
+    while i < len(text):
+        char = text[i]
+        if char in '"\'':
+            end = i + 1
+            while text[end] != char:
+                end += 2 if text[end] == '\\' else 1
+            if char == '"' and depth == 0:
+                pieces.append((False, text[start:i]))
+                pieces.append((True, text[i:end + 1]))
+                start = end + 1
+            i = end + 1
+            continue
+        depth += char == '('
+        depth -= char == ')'
+        i += 1
+    pieces.append((False, text[start:]))
+    return pieces
+
+
+def _closing_paren(code, open_at):
+    """Index of the parenthesis closing the one at `open_at`, skipping literals."""
+    depth = 0
+    i = open_at
+    while True:
+        char = code[i]
+        if char in '"\'':
+            i += 1
+            while code[i] != char:
+                i += 2 if code[i] == '\\' else 1
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+
+
+def _literal_bytes(literal):
+    """Bytes a string literal takes in memory, terminating NUL included."""
+    return len(literal.encode('utf-8')) - 1
+
+
+def _wrap_literals(method, arg, literals_in_ram):
+    """Move the string literals of a print's arguments to flash.
+
+    print/println literals that make up a whole argument or a branch of a
+    ternary are wrapped in F(); a printf format literal is wrapped in PSTR()
+    on cores that would otherwise copy it into RAM.
+
+    Returns:
+        Tuple of (rewritten arguments, bytes of the wrapped literals)
+    """
+    pieces = _split_literals(arg)
+    wrapped = []
+    wrapped_bytes = 0
+    for index, (literal, piece) in enumerate(pieces):
+        if not literal:
+            wrapped.append(piece)
+            continue
+        before = ''.join(p for _, p in pieces[:index]).rstrip()
+        after = pieces[index + 1][1].lstrip() if index + 1 < len(pieces) else ''
+        if method == 'printf':
+            wrap = 'PSTR' if literals_in_ram and not before else None
+        else:
+            standalone = before[-1:] in ('', '?', ':') and after[:1] in ('', ':')
+            wrap = 'F' if standalone else None
+        if wrap:
+            wrapped.append(f'{wrap}({piece})')
+            wrapped_bytes += _literal_bytes(piece)
+        else:
+            wrapped.append(piece)
+    return ''.join(wrapped), wrapped_bytes
+
+
+def apply_release_profile(code, literals_in_ram):
+    """Rewrite a generated sketch for the release profile.
+
+    Serial.print/println/printf statements, including ones whose arguments
+    span several lines, become LOG_ERROR/LOG_INFO macro calls with their
+    string literals moved to flash, prints of response bodies are removed,
+    and status emoji are dropped. A header comment summarises the estimated
+    savings at the default LOG_LEVEL.
+
+    Args:
+        code: Generated sketch
+        literals_in_ram: True for cores that copy string literals into RAM
+                         unless they are in PROGMEM (ESP8266)
+
+    Returns:
+        Tuple of (rewritten sketch, report) where report is a dict with
+        log_level, compiled_out, removed, kept_in_flash, ram_saved and
+        flash_saved (bytes)
+    """
+    code = _WAIT_FOR_SERIAL.sub('', code)  # would hang without a serial monitor attached
+
+    out = []
+    removed = compiled_out = moved = 0
+    flash_saved = ram_saved = 0
+    continues_error = False
+    position = 0
+    for match in _SERIAL_CALL.finditer(code):
+        if match.start() < position:
+            continue
+        close = _closing_paren(code, match.end() - 1)
+        semicolon = close + 1
+        while code[semicolon] in ' \t\n':
+            semicolon += 1
+        if code[semicolon] != ';':
+            continue
+        out.append(code[position:match.start()])
+        trailer = _TRAILING_COMMENT.match(code, semicolon + 1)
+        position = trailer.end()
+
+        indent, method = match.group(1), match.group(2)
+        arg = code[match.end():close].strip().replace('✅ ', '').replace('❌ ', '')
+        if arg in _BODY_PRINTS:
+            removed += 1
+            literal_bytes = sum(_literal_bytes(p) for literal, p in _split_literals(arg) if literal)
+            flash_saved += literal_bytes + _CALL_BYTES
+            ram_saved += literal_bytes if literals_in_ram else 0
+            # Drop the whole line, newline included
+            if code.startswith('\n', position):
+                position += 1
+            continue
+
+        is_error = continues_error or bool(_ERROR_WORDS.search(arg))
+        continues_error = is_error and method == 'print'
+        arg, literal_bytes = _wrap_literals(method, arg, literals_in_ram)
+        if is_error:
+            if literal_bytes:
+                moved += 1
+                ram_saved += literal_bytes if literals_in_ram else 0
+        else:
+            compiled_out += 1
+            flash_saved += literal_bytes + _CALL_BYTES
+            ram_saved += literal_bytes if literals_in_ram else 0
+        out.append(f'{indent}{_MACROS[method, is_error]}({arg});{code[semicolon + 1:position]}')
+    out.append(code[position:])
+    code = ''.join(out)
+
+    # Macros go right after the last #include
+    last_include = code.rfind('\n#include')
+    insert_at = code.find('\n', last_include + 1) + 1 if last_include >= 0 else 0
+    macros = _LOG_MACROS.format(printf='printf_P' if literals_in_ram else 'printf')
+    code = code[:insert_at] + macros + code[insert_at:]
+
+    report = {'log_level': 1, 'compiled_out': compiled_out, 'removed': removed,
+              'kept_in_flash': moved, 'ram_saved': ram_saved, 'flash_saved': flash_saved}
+    header = (f'/*\n'
+              f' * Release profile (LOG_LEVEL 1): {compiled_out} log statements compiled out,\n'
+              f' * {removed} response-body prints removed, {moved} error messages kept in flash.\n'
+              f' * Estimated savings: ~{ram_saved} B RAM, ~{flash_saved} B flash.\n'
+              f' */\n')
+    return header + code, report
+
+
+def with_build_profile(literals_in_ram):
+    """Decorate a firmware generator so config['profile'] == 'release' applies
+    apply_release_profile to whatever sketch it returns. The generator's
+    `build(config)` attribute returns (code, report) instead, with report
+    None for debug sketches."""
+    def decorate(generate):
+        def build(config):
+            code = generate(config)
+            if (config.get('profile') or 'debug').lower() == 'release':
+                return apply_release_profile(code, literals_in_ram)
+            return code, None
+
+        @functools.wraps(generate)
+        def wrapper(config):
+            return build(config)[0]
+        wrapper.build = build
+        return wrapper
+    return decorate
@@ -0,0 +1,217 @@
+"""
+Bulk columnar decoder for the `[epoch, v1, v2, ...]` con format.
+
+Every generated client writes its readings as a JSON array string inside
+`m2m:cin.con`. This module turns a batch of CIN documents into one typed
+NumPy column per configured parameter instead of a Python list per row.
+
+NumPy is only needed here (and pyarrow only for `write_parquet`), so both
+are optional imports and not part of the web app's requirements.
+"""
+import json
+import warnings
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Parameter type (as used in the generation config) -> NumPy dtype
+DTYPES = {
+    'int': 'int64',
+    'integer': 'int64',
+    'float': 'float64',
+    'decimal': 'float64',
+    'boolean': 'bool',
+    'bool': 'bool',
+}
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError('decoder requires NumPy: pip install numpy')
+
+
+def schema_from_parameters(parameters):
+    """Return [(name, dtype)] for the configured parameters, in con order.
+
+    Args:
+        parameters: The 'parameters' list from a generation config
+    """
+    schema = []
+    for p in parameters or []:
+        if not isinstance(p, dict) or not p.get('name'):
+            continue
+        dtype = (p.get('type') or 'string').lower()
+        schema.append((p['name'], DTYPES.get(dtype, 'object')))
+    return schema
+
+
+def extract_cons(documents):
+    """Pull the con strings out of a batch of CIN documents.
+
+    Accepts parsed dictionaries or raw JSON strings; raw strings are parsed
+    with one json.loads call for the whole batch.
+    """
+    documents = list(documents)
+    if documents and all(isinstance(d, str) for d in documents):
+        documents = json.loads('[' + ','.join(documents) + ']')
+    cons = []
+    for d in documents:
+        cin = d.get('m2m:cin', d) if isinstance(d, dict) else {}
+        con = cin.get('con')
+        cons.append(con if isinstance(con, str) else json.dumps(con))
+    return cons
+
+
+def _decode_numeric(cons, width):
+    """Parse purely numeric con arrays in a single NumPy call, or return None."""
+    text = ','.join(cons)
+
+    # Every row must be one [...] holding exactly `width` values; check the
+    # bracket and comma positions for all rows at once
+    raw = np.frombuffer(text.encode('utf-8'), dtype='uint8')
+    opens = np.flatnonzero(raw == ord('['))
+    closes = np.flatnonzero(raw == ord(']'))
+    if len(opens) != len(cons) or len(closes) != len(cons):
+        return None
+    if not (np.all(opens < closes) and np.all(opens[1:] > closes[:-1])):
+        return None
+    commas = np.flatnonzero(raw == ord(','))
+    per_row = np.searchsorted(commas, closes) - np.searchsorted(commas, opens)
+    if not np.all(per_row == width - 1):
+        return None
+
+    with warnings.catch_warnings():
+        # Non-numeric input stops parsing early with a warning; the size
+        # check below rejects it
+        warnings.simplefilter('ignore')
+        try:
+            flat = np.fromstring(text.replace('[', '').replace(']', ''), dtype='float64', sep=',')
+        except ValueError:
+            return None
+    if flat.size != len(cons) * width:
+        return None
+    return flat.reshape(len(cons), width)
+
+
+# Python types a column can hold without checking each value
+CLEAN_TYPES = {
+    'int64': {int},
+    'float64': {int, float},
+    'bool': {bool},
+}
+
+
+def _valid_value(value, dtype):
+    """True if a decoded JSON value fits a column of `dtype`."""
+    if dtype == 'object':
+        return True
+    if dtype == 'bool':
+        return value in (0, 1) and not isinstance(value, float)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+    if dtype == 'int64':
+        return isinstance(value, int) or value.is_integer()
+    return True
+
+
+def _integral_rows(matrix, dtypes):
+    """Row mask of a float matrix: int columns integral, bool columns 0/1."""
+    valid = np.ones(len(matrix), dtype=bool)
+    for i, dtype in enumerate(dtypes):
+        column = matrix[:, i]
+        if dtype == 'int64':
+            valid &= np.isfinite(column) & (column == np.round(column))
+        elif dtype == 'bool':
+            valid &= (column == 0) | (column == 1)
+    return valid
+
+
+def decode_cons(cons, schema):
+    """Decode con array strings into typed columns.
+
+    Rows that are not JSON arrays of exactly 1 + len(schema) values, or that
+    hold a value its column can't take (null, a string in a numeric column,
+    a non-integral number in an int column, anything but true/false/0/1 in a
+    bool column), are skipped.
+
+    Args:
+        cons: Iterable of con strings, e.g. '[1700000000, 25.5, 60]'
+        schema: [(name, dtype)] as returned by schema_from_parameters
+
+    Returns:
+        Tuple of (columns, skipped) where columns maps 'epoch' and each
+        parameter name to a NumPy array
+    """
+    _require_numpy()
+    cons = list(cons)
+    width = 1 + len(schema)
+    dtypes = ['int64'] + [dtype for _, dtype in schema]
+
+    # Fast path: all-numeric schemas (booleans are sent as 1/0) parse the
+    # whole batch as one flat float array
+    if 'object' not in dtypes:
+        matrix = _decode_numeric(cons, width)
+        if matrix is not None:
+            valid = _integral_rows(matrix, dtypes)
+            if not valid.all():
+                matrix = matrix[valid]
+            columns = {'epoch': matrix[:, 0].astype('int64')}
+            for i, (name, dtype) in enumerate(schema, start=1):
+                columns[name] = matrix[:, i].astype(dtype)
+            return columns, len(cons) - len(matrix)
+
+    # General path: one json.loads for the batch (per row only if some con
+    # is not valid JSON), then column-wise conversion
+    try:
+        parsed = json.loads('[' + ','.join(cons) + ']')
+    except ValueError:
+        parsed = []
+        for con in cons:
+            try:
+                parsed.append(json.loads(con))
+            except (TypeError, ValueError):
+                parsed.append(None)
+    rows = [row for row in parsed if isinstance(row, list) and len(row) == width]
+    transposed = list(zip(*rows)) if rows else [()] * width
+
+    # Values are only checked one by one in columns holding unexpected types
+    bad = set()
+    for i, dtype in enumerate(dtypes):
+        if dtype in CLEAN_TYPES and not set(map(type, transposed[i])) <= CLEAN_TYPES[dtype]:
+            bad.update(r for r, value in enumerate(transposed[i]) if not _valid_value(value, dtype))
+    if bad:
+        rows = [row for r, row in enumerate(rows) if r not in bad]
+        transposed = list(zip(*rows)) if rows else [()] * width
+    skipped = len(cons) - len(rows)
+
+    columns = {'epoch': np.asarray(transposed[0], dtype='int64')}
+    for i, (name, dtype) in enumerate(schema, start=1):
+        columns[name] = np.asarray(transposed[i], dtype=dtype)
+    return columns, skipped
+
+
+def decode_batch(documents, parameters):
+    """Decode a batch of CIN documents into typed NumPy columns.
+
+    Args:
+        documents: Iterable of m2m:cin documents (dicts or JSON strings)
+        parameters: The 'parameters' list from the generation config
+
+    Returns:
+        Tuple of (columns, skipped), see decode_cons
+    """
+    return decode_cons(extract_cons(documents), schema_from_parameters(parameters))
+
+
+def write_parquet(columns, path):
+    """Write decoded columns to a Parquet file (requires pyarrow)."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError('write_parquet requires pyarrow: pip install pyarrow')
+    table = pa.table({name: pa.array(values) for name, values in columns.items()})
+    pq.write_table(table, path)
+    return table.num_rows
@@ -0,0 +1,196 @@
+"""
+oneM2M resource discovery helpers used by the /discover route.
+"""
+import bisect
+import threading
+import time
+from collections import OrderedDict
+
+from lazy import lazy_import
+
+requests = lazy_import('requests')
+
+# oneM2M resource type codes used in discovery filters (ty=)
+RESOURCE_TYPES = {
+    'ae': 2,
+    'container': 3,
+    'content_instance': 4,
+}
+
+
+class DiscoveryError(Exception):
+    """Raised when the CSE answers a discovery request with a non-200 status
+    or a body that isn't an m2m:uril document."""
+
+    def __init__(self, status_code, body, message=None):
+        super().__init__(message or f'Discovery failed with status {status_code}')
+        self.status_code = status_code
+        self.body = body
+
+
+def parse_uril(document):
+    """Extract the URI list from an m2m:uril discovery response.
+
+    CSEs return it either as a JSON list or as one space-separated string.
+    """
+    uril = document.get('m2m:uril', [])
+    if isinstance(uril, str):
+        return uril.split()
+    return list(uril)
+
+
+def fetch_discovery_page(url, origin, ty, offset=0, limit=500, level=1, timeout=10, filters=None):
+    """Run one discovery request (fu=1) and return the matching resource URIs.
+
+    Args:
+        url: Absolute URL of the resource to discover under
+        origin: X-M2M-Origin credentials
+        ty: oneM2M resource type code to filter on
+        offset: Number of results to skip (ofst)
+        limit: Maximum number of results to return (lim)
+        level: How many levels below `url` to search (lvl)
+        timeout: Request timeout in seconds
+        filters: Optional extra filter criteria, e.g. {'cra': ..., 'crb': ...}
+
+    Returns:
+        List of structured resource URIs
+    """
+    params = {'fu': 1, 'drt': 1, 'ty': ty, 'lvl': level, 'lim': limit}
+    if offset:
+        params['ofst'] = offset
+    if filters:
+        params.update(filters)
+    headers = {
+        'X-M2M-Origin': origin,
+        'Accept': 'application/json'
+    }
+    response = requests.get(url, params=params, headers=headers, timeout=timeout, verify=False)
+    if response.status_code != 200:
+        raise DiscoveryError(response.status_code, response.text)
+    try:
+        document = response.json()
+    except ValueError:
+        document = None
+    if not isinstance(document, dict):
+        raise DiscoveryError(response.status_code, response.text[:500],
+                             'CSE returned a discovery response that is not an m2m:uril JSON object')
+    return parse_uril(document)
+
+
+def iter_discovery(fetch_page, page_size):
+    """Yield pages of new resource URIs until the CSE runs out of results.
+
+    Args:
+        fetch_page: Callable taking an offset and returning a list of URIs
+        page_size: The `lim` used by `fetch_page`
+
+    Stops early if the CSE ignores `ofst` and repeats the previous page. Only
+    that page is kept for the check, so memory doesn't grow with the number
+    of resources (an export can run to millions of CINs).
+    """
+    offset = 0
+    previous = set()
+    while True:
+        uris = fetch_page(offset)
+        fresh = [u for u in uris if u not in previous]
+        previous = set(uris)
+        if fresh:
+            yield fresh
+        if len(uris) < page_size or not fresh:
+            return
+        offset += len(uris)
+
+
+def resource_name(uri):
+    """Return the last path segment (resource name) of a structured URI."""
+    return uri.rstrip('/').rsplit('/', 1)[-1]
+
+
+class DiscoveryCache:
+    """Per-key cache of sorted resource names with background refresh.
+
+    Entries younger than `ttl` are served as-is. Entries older than that but
+    younger than `max_stale` are still served immediately while a single
+    background thread reloads them. At most `max_entries` listings are kept;
+    past that the least recently used one is dropped.
+    """
+
+    def __init__(self, ttl=60.0, max_stale=900.0, max_entries=256):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._refreshing = set()
+
+    def has(self, key):
+        """True if `key` has an entry that can still be served."""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry is not None and time.monotonic() - entry[0] < self.max_stale
+
+    def get(self, key, load):
+        """Return (names, meta) for `key`, calling `load()` on a cold miss.
+
+        Args:
+            key: Hashable cache key (e.g. base URL, origin, parent, type)
+            load: Zero-argument callable returning an iterable of names
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is not None:
+            age = now - entry[0]
+            if age < self.ttl:
+                return entry[1], {'cache': 'hit', 'age': round(age, 1)}
+            if age < self.max_stale:
+                self._refresh_async(key, load)
+                return entry[1], {'cache': 'stale', 'age': round(age, 1)}
+
+        names = self.put(key, load())
+        return names, {'cache': 'miss', 'age': 0.0}
+
+    def put(self, key, names):
+        names = sorted(set(names))
+        with self._lock:
+            stored = time.monotonic()
+            self._entries[key] = (stored, names)
+            self._entries.move_to_end(key)
+            self._prune(stored)
+        return names
+
+    def _prune(self, now):
+        expired = [k for k, entry in self._entries.items() if now - entry[0] >= self.max_stale]
+        for k in expired:
+            del self._entries[k]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _refresh_async(self, key, load):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self.put(key, load())
+            except Exception as e:
+                print(f"[ERROR] Discovery refresh failed for {key[0]}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+
+def prefix_slice(names, prefix):
+    """Return the names in sorted list `names` that start with `prefix`."""
+    if not prefix:
+        return names
+    lo = bisect.bisect_left(names, prefix)
+    hi = bisect.bisect_left(names, prefix + '\uffff')
+    return names[lo:hi]
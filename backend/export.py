@@ -0,0 +1,257 @@
+"""
+Historical contentInstance export used by the /export route.
+"""
+import csv
+import io
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from discovery import RESOURCE_TYPES, DiscoveryError
+from lazy import lazy_import
+
+requests = lazy_import('requests')
+
+# Accepted input formats for created-after / created-before filters
+TIME_FORMATS = ('%Y%m%dT%H%M%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d')
+
+
+def to_onem2m_time(value):
+    """Convert an ISO 8601 or oneM2M timestamp to oneM2M basic format.
+
+    Raises:
+        ValueError: If the value isn't a string matching one of TIME_FORMATS
+    """
+    if not isinstance(value, str):
+        raise ValueError(f'Timestamps must be strings, got {type(value).__name__}: {value!r}')
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt).strftime('%Y%m%dT%H%M%S')
+        except ValueError:
+            continue
+    raise ValueError(f'Unrecognised timestamp: {value}')
+
+
+def fetch_cin_page(url, origin, offset=0, limit=200, timeout=10, filters=None):
+    """Retrieve one page of a container's contentInstances in a single request.
+
+    Uses rcn=4 (attributes and child resources) filtered on ty=4 with lim and
+    ofst, so a page of CINs costs one round trip instead of a discovery
+    request plus one GET per CIN.
+
+    Args:
+        url: Absolute URL of the container
+        origin: X-M2M-Origin credentials
+        offset: Number of CINs to skip (ofst)
+        limit: Maximum number of CINs to return (lim)
+        timeout: Request timeout in seconds
+        filters: Optional extra filter criteria, e.g. {'cra': ..., 'crb': ...}
+
+    Returns:
+        List of m2m:cin resources in the order the CSE returned them
+
+    Raises:
+        DiscoveryError: If the CSE answers with a non-200 status, a body that
+                        isn't a JSON object, or a container without children
+                        although it holds instances (rcn=4 not supported)
+    """
+    params = {'rcn': 4, 'ty': RESOURCE_TYPES['content_instance'], 'lim': limit}
+    if offset:
+        params['ofst'] = offset
+    if filters:
+        params.update(filters)
+    headers = {
+        'X-M2M-Origin': origin,
+        'Accept': 'application/json'
+    }
+    response = requests.get(url, params=params, headers=headers, timeout=timeout, verify=False)
+    if response.status_code != 200:
+        raise DiscoveryError(response.status_code, response.text)
+    try:
+        document = response.json()
+    except ValueError:
+        document = None
+    if not isinstance(document, dict):
+        raise DiscoveryError(response.status_code, response.text[:500],
+                             'CSE returned a container response that is not a JSON object')
+
+    # Children are nested in the container resource; some CSEs send them bare
+    container = document.get('m2m:cnt', document)
+    cins = container.get('m2m:cin') if isinstance(container, dict) else None
+    if cins is None:
+        if not offset and not filters and isinstance(container, dict) and container.get('cni'):
+            raise DiscoveryError(response.status_code, response.text[:500],
+                                 'CSE returned the container without its contentInstances (rcn=4 unsupported)')
+        return []
+    return cins if isinstance(cins, list) else [cins]
+
+
+def decode_cin(cin):
+    """Turn an m2m:cin resource into an export row.
+
+    The `[epoch, v1, v2, ...]` con array written by the generated clients is
+    split into `epoch` and `values`; any other con is kept verbatim.
+    """
+    if not isinstance(cin, dict):
+        return {'ri': None, 'error': 'Not a contentInstance resource'}
+    row = {'ri': cin.get('ri'), 'ct': cin.get('ct'), 'epoch': None, 'values': None, 'con': None}
+    con = cin.get('con')
+    try:
+        decoded = json.loads(con) if isinstance(con, str) else con
+    except ValueError:
+        decoded = None
+    if isinstance(decoded, list) and decoded:
+        row['epoch'] = decoded[0]
+        row['values'] = decoded[1:]
+    else:
+        row['con'] = con
+    return row
+
+
+def iter_cins(fetch_page, page_size, prefetch=2, max_rows=0):
+    """Yield decoded CIN rows page by page, fetching the next pages meanwhile.
+
+    While one page is streamed the following `prefetch` pages are already
+    being retrieved, at the offsets they will have if every page is full
+    (only the last one isn't). At most `prefetch + 1` pages are held at a
+    time, so memory stays flat regardless of how many rows are exported.
+    Stops early if the CSE ignores `ofst` and repeats the previous page.
+
+    The last item is always a summary, `{'summary': True, 'complete',
+    'rows', 'failed', 'error'}`; `complete` is False if a later page failed
+    and the export stopped early.
+
+    Args:
+        fetch_page: Callable taking an offset and returning a list of m2m:cin
+                    resources (see fetch_cin_page)
+        page_size: The `lim` used by `fetch_page`
+        prefetch: Pages requested ahead of the one being streamed
+        max_rows: Stop after this many rows (0 means no limit)
+    """
+    emitted = failed = 0
+    error = None
+    previous = set()
+    depth = max(0, prefetch) + 1
+    pool = ThreadPoolExecutor(max_workers=depth)
+    ahead = deque()
+    next_offset = 0
+    try:
+        while not (max_rows and emitted >= max_rows):
+            while len(ahead) < depth:
+                ahead.append(pool.submit(fetch_page, next_offset))
+                next_offset += page_size
+            try:
+                page = ahead.popleft().result()
+            except Exception as e:
+                # The rows sent so far are all the client will get
+                error = str(e) or type(e).__name__
+                break
+            keys = [cin.get('ri') if isinstance(cin, dict) else None for cin in page]
+            fresh = [cin for cin, key in zip(page, keys) if key is None or key not in previous]
+            previous = set(keys)
+            if max_rows:
+                fresh = fresh[:max_rows - emitted]
+            for cin in fresh:
+                row = decode_cin(cin)
+                failed += 'error' in row
+                emitted += 1
+                yield row
+            if len(page) < page_size or not fresh:
+                break
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    yield {'summary': True, 'complete': error is None, 'rows': emitted - failed, 'failed': failed, 'error': error}
+
+
+def _columns(row, names):
+    values = row.get('values') or []
+    columns = {}
+    for i, value in enumerate(values):
+        columns[names[i] if i < len(names) else f'value_{i + 1}'] = value
+    return columns
+
+
+def ndjson_lines(rows, names):
+    """Format rows as NDJSON, naming array values after the configured parameters.
+
+    The summary from iter_cins becomes a final `{"export": {...}}` line.
+    """
+    for row in rows:
+        if row.get('summary'):
+            yield json.dumps({'export': {k: v for k, v in row.items() if k != 'summary'}}) + '\n'
+            continue
+        if 'error' in row:
+            yield json.dumps(row) + '\n'
+            continue
+        line = {'ri': row['ri'], 'ct': row['ct'], 'epoch': row['epoch']}
+        if row['values'] is not None:
+            line.update(_columns(row, names))
+        else:
+            line['con'] = row['con']
+        yield json.dumps(line) + '\n'
+
+
+def csv_chunks(rows, names, batch=200):
+    """Format rows as CSV in chunks of `batch` rows.
+
+    Value columns use the configured parameter names, extended with
+    value_N up to the widest row in the first batch; trailing `con` and
+    `error` columns hold content that was not an array and why a row couldn't
+    be decoded. The header can't change once it is sent, so a later row with
+    more values than there are value columns keeps the ones that fit and
+    carries its whole `[epoch, ...]` array in `con`, with the mismatch noted
+    in `error`. The summary from iter_cins becomes a final
+    `# export complete: ...` or `# export incomplete: ...` comment line.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    header = None
+    pending = []
+    summary = None
+
+    def flush():
+        for row in pending:
+            values = list(row.get('values') or [])
+            con, error = row.get('con') or '', row.get('error', '')
+            if len(values) > len(header):
+                # The header has already been sent; keep the whole array in
+                # con rather than dropping the values that don't fit
+                con = json.dumps([row.get('epoch')] + values)
+                error = f'{len(values)} values for {len(header)} value columns; full array in con'
+                values = values[:len(header)]
+            values += [''] * (len(header) - len(values))
+            writer.writerow([row['ri'], row.get('ct'), row.get('epoch')] + values + [con, error])
+        pending.clear()
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+    for row in rows:
+        if row.get('summary'):
+            summary = row
+            continue
+        pending.append(row)
+        if len(pending) >= batch:
+            if header is None:
+                header = _csv_header(pending, names, writer)
+            yield flush()
+
+    if header is None:
+        header = _csv_header(pending, names, writer)
+    chunk = flush()
+    if summary is not None:
+        if summary['complete']:
+            chunk += f"# export complete: {summary['rows']} rows, {summary['failed']} failed\n"
+        else:
+            chunk += (f"# export incomplete: stopped after {summary['rows']} rows "
+                      f"({summary['failed']} failed): {summary['error']}\n")
+    yield chunk
+
+
+def _csv_header(rows, names, writer):
+    width = max([len(names)] + [len(row.get('values') or []) for row in rows])
+    header = names + [f'value_{i + 1}' for i in range(len(names), width)]
+    writer.writerow(['ri', 'ct', 'epoch'] + header + ['con', 'error'])
+    return header
@@ -0,0 +1,217 @@
+"""
+Headless fleet generation: build client code for every device in a CSV,
+YAML or JSON manifest without going through the web UI.
+
+    python fleet.py fleet.csv -o build/ [-j 8] [--force]
+
+Each row/entry is one target: `name`, `controller` and the same config keys
+the /generate route accepts (see manifest.py for the CSV/YAML/JSON formats).
+
+Outputs go to <out>/<name>/<name>.ino (or .py). <out>/fleet-manifest.json
+records a hash of each target's config and of the generator sources it was
+built with, so a rerun only regenerates targets whose config or generator
+changed (or whose output file is missing or was edited).
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from controllers import TARGETS, load_generator
+from manifest import load_manifest
+from validation import validate_request_config
+
+MANIFEST_NAME = 'fleet-manifest.json'
+
+CONTROLLERS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'controllers')
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def config_hash(config):
+    """Stable hash of a target config (key order doesn't matter)."""
+    return _sha256(json.dumps(config, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+
+
+def generator_hashes():
+    """Hash of the generator sources behind each controller."""
+    hashes = {}
+    for controller, target in TARGETS.items():
+        digest = hashlib.sha256()
+        for source in target.sources:
+            with open(os.path.join(CONTROLLERS_DIR, source), 'rb') as f:
+                digest.update(f.read())
+        hashes[controller] = digest.hexdigest()
+    return hashes
+
+
+def _output_path(out_dir, name, controller):
+    # Arduino IDE needs each sketch in a folder of the same name
+    return os.path.join(out_dir, name, name + TARGETS[controller].extension)
+
+
+def _file_hash(path):
+    try:
+        with open(path, 'rb') as f:
+            return _sha256(f.read())
+    except OSError:
+        return None
+
+
+def generate_target(target, out_dir):
+    """Generate and write one target (runs in a worker process).
+
+    Returns:
+        Tuple of (name, output_hash, elapsed_ms)
+    """
+    start = time.perf_counter()
+    config = dict(target)
+    name, controller = config['name'], config['controller']
+    valid, msg = validate_request_config(config, controller)
+    if not valid:
+        raise ValueError(msg)
+
+    code = load_generator(controller)(config)
+    path = _output_path(out_dir, name, controller)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(code)
+    return name, _sha256(code.encode('utf-8')), (time.perf_counter() - start) * 1000
+
+
+def generate_chunk(targets, out_dir):
+    """Run generate_target for several targets in one worker call.
+
+    Generating one target takes well under a millisecond, so targets are sent
+    to the pool in chunks to keep inter-process overhead down.
+
+    Returns:
+        List of (name, output_hash, elapsed_ms, error) tuples
+    """
+    results = []
+    for target in targets:
+        try:
+            results.append(generate_target(target, out_dir) + (None,))
+        except Exception as e:
+            results.append((target['name'], None, 0.0, str(e)))
+    return results
+
+
+def plan(targets, out_dir, previous, force=False):
+    """Split targets into (stale, fresh) against the previous manifest.
+
+    A target is stale if forced, new, or if its config hash, generator hash or
+    output file no longer match what the manifest recorded.
+    """
+    generators = generator_hashes()
+    stale, fresh = [], []
+    for target in targets:
+        record = previous.get(target['name'])
+        expected = {
+            'controller': target['controller'],
+            'config_hash': config_hash(target),
+            'generator_hash': generators[target['controller']],
+        }
+        path = _output_path(out_dir, target['name'], target['controller'])
+        if (force or record is None
+                or any(record.get(k) != v for k, v in expected.items())
+                or _file_hash(path) != record.get('output_hash')):
+            stale.append((target, expected))
+        else:
+            fresh.append((target, record))
+    return stale, fresh
+
+
+def build(manifest_path, out_dir, jobs=None, force=False, log=print):
+    """Regenerate the stale targets of a fleet manifest.
+
+    Args:
+        manifest_path: CSV/YAML/JSON fleet manifest
+        out_dir: Output directory (holds fleet-manifest.json)
+        jobs: Worker processes (default: CPU count); 1 runs in-process
+        force: Regenerate every target
+        log: Callable used for progress lines
+
+    Returns:
+        Dictionary with generated, unchanged and failed target names
+    """
+    targets = load_manifest(manifest_path)
+    for target in targets:
+        if target.get('controller') not in TARGETS:
+            raise ValueError(f"Target '{target['name']}': unknown controller '{target.get('controller')}'")
+
+    state_path = os.path.join(out_dir, MANIFEST_NAME)
+    try:
+        with open(state_path, encoding='utf-8') as f:
+            previous = json.load(f).get('targets', {})
+    except (OSError, ValueError):
+        previous = {}
+
+    stale, fresh = plan(targets, out_dir, previous, force)
+    records = {target['name']: record for target, record in fresh}
+    result = {'generated': [], 'unchanged': [t['name'] for t, _ in fresh], 'failed': []}
+    log(f"{len(targets)} targets: {len(stale)} to generate, {len(fresh)} unchanged")
+
+    def done(target, expected, output_hash, elapsed_ms):
+        records[target['name']] = dict(expected, output=os.path.relpath(
+            _output_path(out_dir, target['name'], target['controller']), out_dir), output_hash=output_hash)
+        result['generated'].append(target['name'])
+        log(f"  {target['name']:<32} {target['controller']:<12} {elapsed_ms:8.1f} ms")
+
+    def failed(target, error):
+        result['failed'].append(target['name'])
+        log(f"  {target['name']:<32} {target['controller']:<12}   FAILED: {error}")
+
+    started = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = jobs or os.cpu_count() or 1
+    pending = {target['name']: (target, expected) for target, expected in stale}
+    if jobs == 1 or len(stale) <= 1:
+        batches = [generate_chunk([target for target, _ in stale], out_dir)]
+    else:
+        size = max(1, -(-len(stale) // (jobs * 4)))
+        chunks = [[target for target, _ in stale[i:i + size]] for i in range(0, len(stale), size)]
+        with ProcessPoolExecutor(max_workers=min(jobs, len(chunks))) as pool:
+            futures = [pool.submit(generate_chunk, chunk, out_dir) for chunk in chunks]
+            batches = [future.result() for future in as_completed(futures)]
+    for batch in batches:
+        for name, output_hash, elapsed_ms, error in batch:
+            target, expected = pending[name]
+            if error is None:
+                done(target, expected, output_hash, elapsed_ms)
+            else:
+                failed(target, error)
+
+    # Failed targets drop out of the manifest so the next run retries them
+    with open(state_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'targets': dict(sorted(records.items()))}, f, indent=2)
+    os.replace(state_path + '.tmp', state_path)
+
+    log(f"Generated {len(result['generated'])}, unchanged {len(result['unchanged'])}, "
+        f"failed {len(result['failed'])} in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate oneM2M client code for a fleet manifest.')
+    parser.add_argument('manifest', help='CSV, YAML or JSON fleet manifest')
+    parser.add_argument('-o', '--out', default='build', help='output directory (default: build)')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--force', action='store_true', help='regenerate every target')
+    args = parser.parse_args(argv)
+
+    try:
+        result = build(args.manifest, args.out, jobs=args.jobs, force=args.force)
+    except (OSError, ValueError, ImportError) as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 2
+    return 1 if result['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
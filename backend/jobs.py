@@ -0,0 +1,265 @@
+"""
+Background fleet generation jobs for the /jobs routes.
+
+A job takes a list of targets, generates each one on a bounded worker pool
+and appends the result to a zip file on disk as it goes, so memory use
+doesn't grow with fleet size and nothing is lost if the job is cancelled.
+Progress can be polled or followed as a stream of snapshots.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+ARTIFACT_NAME = 'fleet.zip'
+REPORT_NAME = 'fleet-report.json'
+
+
+class JobError(Exception):
+    """Raised for an unknown job or one not in the right state."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class _Job:
+    def __init__(self, job_id, targets, directory):
+        self.id = job_id
+        self.targets = targets
+        self.total = len(targets)
+        self.directory = directory
+        self.cond = threading.Condition()
+        self.state = QUEUED
+        self.cancel_requested = False
+        self.generated = 0
+        self.failed = {}
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.version = 0   # bumped on every progress change
+        self.future = None
+
+    @property
+    def artifact_path(self):
+        return os.path.join(self.directory, ARTIFACT_NAME)
+
+    def snapshot(self):
+        total = self.total
+        processed = self.generated + len(self.failed)
+        elapsed = ((self.finished or time.time()) - self.started) if self.started else 0.0
+        snap = {
+            'id': self.id,
+            'state': self.state,
+            'total': total,
+            'generated': self.generated,
+            'failed': len(self.failed),
+            'progress': round(processed / total, 4) if total else 1.0,
+            'elapsed_s': round(elapsed, 2),
+            'created': self.created,
+            'errors': dict(list(self.failed.items())[:20]),
+        }
+        if self.state == RUNNING and processed and elapsed:
+            snap['eta_s'] = round(elapsed / processed * (total - processed), 1)
+        if self.error:
+            snap['error'] = self.error
+        if self.state in (DONE, CANCELLED) and os.path.exists(self.artifact_path):
+            snap['artifact_bytes'] = os.path.getsize(self.artifact_path)
+        return snap
+
+
+class JobQueue:
+    """Runs fleet generation jobs on a fixed number of worker threads.
+
+    Args:
+        render: Callable taking a config and returning (code, filename);
+                any exception it raises marks only that target as failed
+                (the job fails only if the archive can't be written)
+        root: Directory that holds one sub-directory per job
+        workers: Jobs generating at the same time; later jobs wait queued
+        max_jobs: Jobs kept (queued, running or finished) before new ones
+                  are refused; the oldest finished jobs are dropped first
+        ttl: Seconds a finished job and its artifact are kept
+        progress_every: Targets between progress notifications
+    """
+
+    def __init__(self, render, root, workers=2, max_jobs=50, ttl=3600.0, progress_every=100):
+        self.render = render
+        self.root = root
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self.progress_every = progress_every
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fleet-job')
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def submit(self, targets):
+        """Queue a job for a list of named targets.
+
+        Returns:
+            The job's snapshot
+
+        Raises:
+            JobError: If too many jobs are already held (status 503)
+        """
+        self._prune()
+        evicted = []
+        with self._lock:
+            finished = sorted((j for j in self._jobs.values() if j.state in FINISHED), key=lambda j: j.finished)
+            while len(self._jobs) >= self.max_jobs and finished:
+                evicted.append(self._jobs.pop(finished.pop(0).id))
+            if len(self._jobs) >= self.max_jobs:
+                raise JobError('Too many fleet jobs; retry once some have finished.', 503)
+            job_id = uuid.uuid4().hex
+            job = _Job(job_id, targets, os.path.join(self.root, job_id))
+            os.makedirs(job.directory, exist_ok=True)
+            self._jobs[job_id] = job
+        for old in evicted:
+            shutil.rmtree(old.directory, ignore_errors=True)
+        job.future = self._pool.submit(self._run, job)
+        return job.snapshot()
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise JobError(f'Job {job_id} not found.', 404)
+        return job
+
+    def list(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.snapshot() for job in sorted(jobs, key=lambda j: j.created, reverse=True)]
+
+    def cancel(self, job_id):
+        """Stop a queued or running job; targets generated so far are kept."""
+        job = self.get(job_id)
+        with job.cond:
+            if job.state in FINISHED:
+                return job.snapshot()
+            job.cancel_requested = True
+            if job.future is not None and job.future.cancel():
+                # Never started
+                self._finish(job, CANCELLED)
+        return job.snapshot()
+
+    def delete(self, job_id):
+        """Cancel a job and remove it with its files."""
+        job = self.get(job_id)
+        self.cancel(job_id)
+        with self._lock:
+            self._jobs.pop(job_id, None)
+        if job.state in FINISHED:
+            shutil.rmtree(job.directory, ignore_errors=True)
+        # A running job removes its directory when it notices the cancel
+
+    def artifact(self, job_id):
+        """Path of a finished job's zip."""
+        job = self.get(job_id)
+        if job.state not in (DONE, CANCELLED) or not os.path.exists(job.artifact_path):
+            raise JobError(f'Job {job_id} has no artifact yet (state: {job.state}).', 409)
+        return job.artifact_path
+
+    def watch(self, job_id, timeout=15.0):
+        """Yield a snapshot on every progress change until the job finishes.
+
+        None is yielded after `timeout` seconds without a change so the
+        caller can send a keepalive.
+        """
+        job = self.get(job_id)
+        seen = -1
+        while True:
+            with job.cond:
+                if job.version == seen:
+                    job.cond.wait(timeout)
+                if job.version == seen:
+                    snap = None
+                else:
+                    seen = job.version
+                    snap = job.snapshot()
+            yield snap
+            if snap is not None and snap['state'] in FINISHED:
+                return
+
+    def _notify(self, job):
+        with job.cond:
+            job.version += 1
+            job.cond.notify_all()
+
+    def _finish(self, job, state, error=None):
+        job.state = state
+        job.error = error
+        job.finished = time.time()
+        job.targets = None  # only the counts are needed from here on
+        self._notify(job)
+
+    def _run(self, job):
+        with job.cond:
+            if job.cancel_requested:
+                return
+            job.state = RUNNING
+            job.started = time.time()
+        self._notify(job)
+
+        partial = job.artifact_path + '.part'
+        try:
+            with zipfile.ZipFile(partial, 'w', zipfile.ZIP_DEFLATED) as archive:
+                for i, target in enumerate(job.targets, start=1):
+                    if job.cancel_requested:
+                        break
+                    name = target['name']
+                    try:
+                        code, filename = self.render(dict(target))
+                    except ValueError as e:
+                        job.failed[name] = str(e)
+                    except Exception as e:
+                        # A generator bug fails this target, not the whole job
+                        job.failed[name] = f'{type(e).__name__}: {e}'
+                    else:
+                        # Arduino IDE needs each sketch in a folder of the same name
+                        archive.writestr(f'{name}/{name}{os.path.splitext(filename)[1]}', code)
+                        job.generated += 1
+                    if i % self.progress_every == 0:
+                        self._notify(job)
+                archive.writestr(REPORT_NAME, json.dumps({
+                    'cancelled': job.cancel_requested,
+                    'total': job.total,
+                    'generated': job.generated,
+                    'failed': job.failed,
+                }, indent=2))
+            os.replace(partial, job.artifact_path)
+        except Exception as e:
+            self._finish(job, FAILED, str(e))
+            return
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+
+        with self._lock:
+            deleted = job.id not in self._jobs
+        if deleted:
+            shutil.rmtree(job.directory, ignore_errors=True)
+        self._finish(job, CANCELLED if job.cancel_requested else DONE)
+
+    def _prune(self):
+        """Drop finished jobs older than the TTL."""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.state in FINISHED and job.finished < cutoff]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            shutil.rmtree(job.directory, ignore_errors=True)
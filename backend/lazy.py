@@ -0,0 +1,49 @@
+"""
+Deferred imports for modules that are slow to load and not needed by every
+process: the HTTP client stack (only the /test-*, /discover and /export
+routes use it) and optional parsers such as PyYAML.
+"""
+import importlib
+import importlib.util
+import threading
+
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access.
+
+    The import runs under a lock, so threads racing on the first request all
+    see the fully initialised module.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._module is None:
+                self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._module or self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f'<lazy module {self._name!r} ({state})>'
+
+
+def lazy_import(name, optional=False):
+    """A LazyModule for `name`.
+
+    With optional=True, None is returned if the module isn't installed (the
+    same contract as the `try: import x except ImportError: x = None` idiom).
+    """
+    if optional and importlib.util.find_spec(name) is None:
+        return None
+    return LazyModule(name)
@@ -0,0 +1,165 @@
+"""
+Fleet manifests: lists of per-device generation configs.
+
+A manifest is CSV, YAML or JSON. Each row/entry is one target with `name`,
+`controller` and the same config keys the /generate route accepts. CSV cells
+holding JSON (e.g. `parameters`) are parsed, numbers and booleans are only
+converted for known numeric/boolean keys (see NUMERIC_KEYS), and dotted columns
+(`schedule.interval`) become nested dictionaries. YAML and JSON documents may
+hold a list of targets or `{defaults: {...}, devices: [...]}`.
+"""
+import csv
+import io
+import json
+import os
+import re
+
+from lazy import lazy_import
+from profiles import deep_merge
+
+# Optional; imported the first time a YAML manifest is parsed
+yaml = lazy_import('yaml', optional=True)
+
+# File extension -> manifest kind
+KINDS = {'.csv': 'csv', '.yaml': 'yaml', '.yml': 'yaml', '.json': 'json'}
+
+
+# Config keys (the last part of a dotted column name) whose CSV cells are
+# converted. Any other cell is kept as written, apart from JSON arrays/objects.
+NUMERIC_KEYS = frozenset({
+    'port', 'interval', 'start_jitter', 'backoff_base', 'backoff_max', 'phase',
+    'sample_interval', 'poll_interval', 'http_timeout', 'refresh_interval',
+    'sample_rate', 'window', 'max_rate', 'dump_interval',
+    'batch_size', 'queue_depth', 'sample_stack', 'network_stack',
+})
+BOOLEAN_KEYS = frozenset({'enabled', 'conditional'})
+
+# Keys that are always strings, even if they look like numbers or JSON
+STRING_KEYS = frozenset({
+    'name', 'controller', 'cse_url', 'protocol', 'ae_name', 'container_name', 'origin',
+    'wifi_ssid', 'wifi_password', 'path', 'bind', 'fingerprint', 'trust_anchor',
+})
+
+
+def _cell(key, value):
+    """Convert one CSV cell according to its column's key."""
+    value = value.strip()
+    leaf = key.rsplit('.', 1)[-1]
+    if leaf in STRING_KEYS:
+        return value
+    if leaf in NUMERIC_KEYS:
+        if re.fullmatch(r'-?\d+', value):
+            return int(value)
+        if re.fullmatch(r'-?\d+\.\d*', value):
+            return float(value)
+        return value
+    if leaf in BOOLEAN_KEYS and value.lower() in ('true', 'false'):
+        return value.lower() == 'true'
+    if value[:1] in ('[', '{'):
+        return json.loads(value)
+    return value
+
+
+def _strings(config):
+    """Turn YAML/JSON scalars under STRING_KEYS into strings (in place).
+
+    A password written as `12345678` loads as an int, which the generators
+    would fail on.
+    """
+    for key, value in config.items():
+        if isinstance(value, dict):
+            _strings(value)
+        elif key in STRING_KEYS and isinstance(value, (int, float)):
+            config[key] = str(value)
+    return config
+
+
+def _nest(flat):
+    """Turn {'schedule.interval': 5} into {'schedule': {'interval': 5}}."""
+    config = {}
+    for key, value in flat.items():
+        parts = key.split('.')
+        node = config
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+    return config
+
+
+def targets_from_document(document):
+    """Targets of a parsed YAML/JSON manifest (a list or defaults/devices)."""
+    if isinstance(document, dict):
+        defaults = document.get('defaults') or {}
+        return [deep_merge(defaults, device) for device in document.get('devices') or []]
+    if isinstance(document, list):
+        return list(document)
+    raise ValueError('A manifest must be a list of targets or {defaults, devices}')
+
+
+def name_targets(targets, source='manifest'):
+    """Give every target a file-system safe, unique 'name' (in place).
+
+    String fields that YAML/JSON loaded as numbers are turned back into
+    strings as well.
+
+    Raises:
+        ValueError: If a target isn't an object, its name is only dots or
+                    two targets share a name
+    """
+    names = set()
+    for i, target in enumerate(targets, start=1):
+        if not isinstance(target, dict):
+            raise ValueError(f'Target {i} in {source} is not an object')
+        _strings(target)
+        if not target.get('name'):
+            target['name'] = f"{target.get('ae_name', 'device')}-{target.get('container_name', i)}"
+        target['name'] = re.sub(r'[^A-Za-z0-9_.-]+', '_', str(target['name']))
+        if not target['name'].strip('.'):
+            # '.' and '..' would escape the output directory / zip folder
+            raise ValueError(f"Invalid target name '{target['name']}' in {source}")
+        if target['name'] in names:
+            raise ValueError(f"Duplicate target name '{target['name']}' in {source}")
+        names.add(target['name'])
+    return targets
+
+
+def parse_manifest(text, kind, source='manifest'):
+    """Parse manifest text into a list of named target configs.
+
+    Args:
+        text: Manifest contents
+        kind: 'csv', 'yaml' or 'json'
+        source: Name used in error messages
+
+    Returns:
+        List of config dictionaries, each with at least 'name'
+    """
+    if kind == 'csv':
+        rows = [{k.strip(): _cell(k.strip(), v) for k, v in row.items() if k and v and v.strip()}
+                for row in csv.DictReader(io.StringIO(text, newline=''))]
+        targets = [_nest(row) for row in rows if row]
+    elif kind == 'yaml':
+        if yaml is None:
+            raise ImportError('YAML manifests require PyYAML: pip install pyyaml')
+        targets = targets_from_document(yaml.safe_load(text) or [])
+    elif kind == 'json':
+        targets = targets_from_document(json.loads(text))
+    else:
+        raise ValueError(f'Unsupported manifest type: {source} (use .csv, .yaml, .yml or .json)')
+    return name_targets(targets, source)
+
+
+def load_manifest(path):
+    """Read a fleet manifest file into a list of target configs.
+
+    Args:
+        path: .csv, .yaml, .yml or .json file
+
+    Returns:
+        List of config dictionaries, each with at least 'name' and 'controller'
+    """
+    kind = KINDS.get(os.path.splitext(path)[1].lower())
+    if kind is None:
+        raise ValueError(f'Unsupported manifest type: {path} (use .csv, .yaml, .yml or .json)')
+    with open(path, newline='', encoding='utf-8') as f:
+        return parse_manifest(f.read(), kind, path)
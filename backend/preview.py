@@ -0,0 +1,170 @@
+"""
+Live preview sessions used by the /preview routes.
+
+The configure page POSTs every config edit to a session and keeps one
+Server-Sent Events stream open. Edits are debounced per session, the code is
+regenerated, and only a line diff against what that stream last sent is
+pushed back, tagged with the sketch sections it touches.
+"""
+import difflib
+import re
+import threading
+import time
+
+# Section headers used by the generated sketches and scripts, e.g.
+# "// ---------- WiFi Handling ----------" or "# ---------- Scheduling ----------"
+SECTION_HEADER = re.compile(r'^\s*(?://|#)\s*-{3,}\s*(.+?)\s*-{3,}\s*$')
+
+
+def _section_names(lines):
+    """Section name for every line (lines before the first header: 'Header')."""
+    names, current = [], 'Header'
+    for line in lines:
+        match = SECTION_HEADER.match(line)
+        if match:
+            current = match.group(1)
+        names.append(current)
+    return names
+
+
+def line_diff(old_lines, new_lines):
+    """Compact edit script turning `old_lines` into `new_lines`.
+
+    Returns:
+        Tuple of (ops, sections). ops is a list of ['k', n] (keep n lines),
+        ['d', n] (drop n lines) and ['i', [lines]] (insert lines); sections
+        names the sections of `new_lines` that changed, in order
+    """
+    names = _section_names(new_lines)
+    ops, sections = [], []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append(['k', i2 - i1])
+            continue
+        if i2 > i1:
+            ops.append(['d', i2 - i1])
+        if j2 > j1:
+            ops.append(['i', new_lines[j1:j2]])
+        # Pure deletions belong to the section of the line before them
+        touched = names[j1:j2] if j2 > j1 else names[max(j1 - 1, 0):max(j1, 1)]
+        for name in touched:
+            if name not in sections:
+                sections.append(name)
+    # A trailing keep is implied
+    if ops and ops[-1][0] == 'k':
+        ops.pop()
+    return ops, sections
+
+
+class _Session:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.config = None
+        self.seq = 0
+        self.updated_at = 0.0
+        self.touched_at = time.monotonic()
+
+
+class PreviewHub:
+    """Per-session debounced regeneration for live preview streams.
+
+    Args:
+        render: Callable taking a config and returning (code, filename);
+                exceptions are sent to the stream as 'invalid' events
+        debounce: Seconds a session must be quiet before regenerating
+        idle_timeout: Seconds after which an unused session is dropped
+        keepalive: Seconds between SSE comments on an idle stream
+    """
+
+    def __init__(self, render, debounce=0.15, idle_timeout=600.0, keepalive=15.0):
+        self.render = render
+        self.debounce = debounce
+        self.idle_timeout = idle_timeout
+        self.keepalive = keepalive
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def _session(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, s in self._sessions.items() if now - s.touched_at > self.idle_timeout]
+            for k in expired:
+                del self._sessions[k]
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = _Session()
+            session.touched_at = now
+            return session
+
+    def submit(self, session_id, config):
+        """Record the latest config for a session and wake its stream.
+
+        Returns:
+            The edit's sequence number within the session
+        """
+        session = self._session(session_id)
+        with session.cond:
+            session.config = config
+            session.seq += 1
+            session.updated_at = time.monotonic()
+            session.cond.notify_all()
+            return session.seq
+
+    def _next_config(self, session, after_seq):
+        """Block until an edit newer than `after_seq` has been quiet for
+        `debounce` seconds; returns (seq, config) or None on keepalive timeout."""
+        with session.cond:
+            # An open stream keeps its session from expiring
+            session.touched_at = time.monotonic()
+            if session.seq == after_seq:
+                session.cond.wait(self.keepalive)
+                if session.seq == after_seq:
+                    return None
+            while True:
+                remaining = session.updated_at + self.debounce - time.monotonic()
+                if remaining <= 0:
+                    return session.seq, session.config
+                session.cond.wait(remaining)
+
+    def stream(self, session_id):
+        """Yield preview events for one SSE connection.
+
+        The first event carries the full code; later ones carry a line diff
+        against the previous event. None is yielded while idle so the caller
+        can send a keepalive.
+        """
+        session = self._session(session_id)
+        sent_seq = 0
+        lines = None
+        version = 0
+        while True:
+            update = self._next_config(session, sent_seq)
+            if update is None:
+                yield None
+                continue
+            sent_seq, config = update
+
+            started = time.perf_counter()
+            try:
+                code, filename = self.render(dict(config))
+            except Exception as e:
+                yield {'type': 'invalid', 'seq': sent_seq, 'error': str(e)}
+                continue
+            render_ms = round((time.perf_counter() - started) * 1000, 2)
+
+            new_lines = code.split('\n')
+            if new_lines == lines:
+                yield {'type': 'unchanged', 'seq': sent_seq, 'version': version}
+                continue
+
+            version += 1
+            event = {'seq': sent_seq, 'version': version, 'filename': filename,
+                     'render_ms': render_ms, 'bytes': len(code.encode('utf-8'))}
+            if lines is None:
+                event.update(type='full', code=code)
+            else:
+                ops, sections = line_diff(lines, new_lines)
+                event.update(type='diff', ops=ops, sections=sections)
+            lines = new_lines
+            yield event
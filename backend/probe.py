@@ -0,0 +1,363 @@
+"""
+Upstream probe helpers used by the /test-* routes.
+"""
+import http.client
+import socket
+import ssl
+import threading
+import time
+from urllib.parse import urlsplit
+
+from lazy import lazy_import
+
+requests = lazy_import('requests')
+
+
+class _InFlight:
+    """A single upstream call that concurrent callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ProbeCache:
+    """Single-flight, short-TTL cache for identical upstream GET probes.
+
+    Concurrent callers asking for the same key share one upstream call, and
+    the result is reused for `ttl` seconds afterwards. Failed calls (raised
+    exceptions) are handed to the callers already waiting but never cached.
+    """
+
+    def __init__(self, ttl=3.0):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._inflight = {}
+
+    def fetch(self, key, func):
+        """Return `func()` for `key`, sharing in-flight calls and cached results.
+
+        Args:
+            key: Hashable identity of the upstream request (e.g. URL and origin)
+            func: Zero-argument callable that performs the upstream request
+
+        Returns:
+            Tuple of (result, meta) where meta describes how it was served
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[2], self._meta('hit', now - entry[1])
+
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = _InFlight()
+                self._inflight[key] = call
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, self._meta('coalesced', 0.0)
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                if call.error is None:
+                    self.misses += 1
+                    if self.ttl > 0:
+                        stored = time.monotonic()
+                        self._prune(stored)
+                        self._entries[key] = (stored + self.ttl, stored, call.result)
+            call.done.set()
+
+        return call.result, self._meta('miss', 0.0)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _prune(self, now):
+        expired = [k for k, entry in self._entries.items() if entry[0] <= now]
+        for k in expired:
+            del self._entries[k]
+
+    def _meta(self, status, age):
+        return {
+            'status': status,
+            'age': round(age, 3),
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+        }
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because the host's breaker is open."""
+
+    def __init__(self, host, retry_after):
+        super().__init__(f'Circuit open for {host}; retry in {retry_after:.0f}s')
+        self.host = host
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Per-host circuit breaker for upstream CSE calls.
+
+    After `failure_threshold` consecutive transport failures a host is marked
+    open and calls to it fail immediately for `reset_timeout` seconds. The
+    first call after that is let through as a half-open trial: success closes
+    the breaker, failure re-opens it. Other calls keep failing fast while the
+    trial is in flight.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def call(self, host, func, failure_types):
+        """Run `func()` for `host` unless its breaker is open.
+
+        Args:
+            host: Breaker key, typically "cse_url:port"
+            func: Zero-argument callable that performs the upstream request
+            failure_types: Exception types that count as host failures
+
+        Returns:
+            Whatever `func()` returns
+
+        Raises:
+            CircuitOpenError: If the host is open or a trial is already running
+        """
+        self._before(host)
+        try:
+            result = func()
+        except failure_types as e:
+            self._record_failure(host, e)
+            raise
+        except BaseException:
+            self._release_trial(host)
+            raise
+        self._record_success(host)
+        return result
+
+    def snapshot(self):
+        """Return the current state of every tracked host."""
+        now = time.monotonic()
+        with self._lock:
+            states = {}
+            for host, h in self._hosts.items():
+                retry_after = 0.0
+                if h['state'] == self.OPEN:
+                    retry_after = max(0.0, h['opened_at'] + self.reset_timeout - now)
+                states[host] = {
+                    'state': h['state'],
+                    'failures': h['failures'],
+                    'retry_after': round(retry_after, 1),
+                    'last_error': h['last_error'],
+                }
+            return states
+
+    def reset(self, host=None):
+        with self._lock:
+            if host is None:
+                self._hosts.clear()
+            else:
+                self._hosts.pop(host, None)
+
+    def _state(self, host):
+        h = self._hosts.get(host)
+        if h is None:
+            h = {'state': self.CLOSED, 'failures': 0, 'opened_at': 0.0,
+                 'trial': False, 'last_error': None}
+            self._hosts[host] = h
+        return h
+
+    def _before(self, host):
+        now = time.monotonic()
+        with self._lock:
+            h = self._state(host)
+            if h['state'] == self.OPEN:
+                remaining = h['opened_at'] + self.reset_timeout - now
+                if remaining > 0:
+                    raise CircuitOpenError(host, remaining)
+                h['state'] = self.HALF_OPEN
+                h['trial'] = False
+            if h['state'] == self.HALF_OPEN:
+                if h['trial']:
+                    raise CircuitOpenError(host, self.reset_timeout)
+                h['trial'] = True
+
+    def _record_success(self, host):
+        with self._lock:
+            h = self._state(host)
+            h.update(state=self.CLOSED, failures=0, trial=False, last_error=None)
+
+    def _record_failure(self, host, error):
+        with self._lock:
+            h = self._state(host)
+            h['failures'] += 1
+            h['last_error'] = type(error).__name__
+            if h['state'] == self.HALF_OPEN or h['failures'] >= self.failure_threshold:
+                h.update(state=self.OPEN, opened_at=time.monotonic(), trial=False)
+
+    def _release_trial(self, host):
+        with self._lock:
+            self._state(host)['trial'] = False
+
+
+def _ms(start, end):
+    return round((end - start) * 1000, 2)
+
+
+def timed_request(method, url, headers, body=None, timeout=10, verify=False):
+    """Perform one HTTP request and measure each connection phase.
+
+    Opens a fresh connection (no pooling) so DNS, TCP connect and TLS are
+    always measured. Transport errors are raised as the matching `requests`
+    exceptions so callers can handle both request paths the same way.
+
+    Args:
+        method: HTTP method, e.g. 'GET' or 'POST'
+        url: Absolute http:// or https:// URL
+        headers: Dictionary of request headers
+        body: Optional request body (str or bytes)
+        timeout: Per-operation socket timeout in seconds
+        verify: Verify the server certificate for https
+
+    Returns:
+        Tuple of (status_code, text, timing) where timing holds dns_ms,
+        connect_ms, tls_ms, ttfb_ms, download_ms and total_ms
+    """
+    parts = urlsplit(url)
+    host = parts.hostname
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+
+    sock = None
+    try:
+        start = time.perf_counter()
+        try:
+            addrinfo = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise requests.exceptions.ConnectionError(f'DNS lookup failed: {e}')
+        resolved = time.perf_counter()
+
+        last_error = None
+        for family, socktype, proto, _, address in addrinfo:
+            sock = socket.socket(family, socktype, proto)
+            sock.settimeout(timeout)
+            try:
+                sock.connect(address)
+                break
+            except OSError as e:
+                sock.close()
+                sock = None
+                last_error = e
+        if sock is None:
+            raise last_error
+        connected = time.perf_counter()
+
+        if parts.scheme == 'https':
+            context = ssl.create_default_context()
+            if not verify:
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+            sock = context.wrap_socket(sock, server_hostname=host)
+        handshaken = time.perf_counter()
+
+        conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        conn.sock = sock
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        first_byte = time.perf_counter()
+        content = response.read()
+        finished = time.perf_counter()
+        conn.close()
+    except socket.timeout as e:
+        raise requests.exceptions.Timeout(str(e))
+    except (OSError, http.client.HTTPException) as e:
+        if isinstance(e, requests.exceptions.RequestException):
+            raise
+        raise requests.exceptions.ConnectionError(str(e))
+    finally:
+        if sock is not None:
+            sock.close()
+
+    charset = response.headers.get_content_charset() or 'utf-8'
+    timing = {
+        'dns_ms': _ms(start, resolved),
+        'connect_ms': _ms(resolved, connected),
+        'tls_ms': _ms(connected, handshaken),
+        'ttfb_ms': _ms(handshaken, first_byte),
+        'download_ms': _ms(first_byte, finished),
+        'total_ms': _ms(start, finished),
+    }
+    return response.status, content.decode(charset, errors='replace'), timing
+
+
+def verify_ingest(url, headers, con, started, deadline=5.0, interval=0.25):
+    """Read the latest CIN back until it carries `con` and report the delay.
+
+    Args:
+        url: The container's .../Data/la URL
+        headers: Request headers (must include X-M2M-Origin)
+        con: The con string that was just posted
+        started: time.perf_counter() value taken before the POST was sent
+        deadline: Seconds to keep polling before giving up
+        interval: Seconds between polls
+
+    Returns:
+        Dictionary with verified, attempts, ingest_ms and error
+    """
+    attempts = 0
+    error = None
+    give_up = time.perf_counter() + deadline
+    while True:
+        attempts += 1
+        try:
+            response = requests.get(url, headers=headers, timeout=deadline, verify=False)
+            if response.status_code == 200:
+                body = response.json()
+                cin = body.get('m2m:cin') if isinstance(body, dict) else None
+                latest = cin.get('con') if isinstance(cin, dict) else None
+                if latest == con:
+                    return {
+                        'verified': True,
+                        'attempts': attempts,
+                        'ingest_ms': _ms(started, time.perf_counter()),
+                        'error': None,
+                    }
+                error = 'Latest CIN does not match the posted content yet.'
+            else:
+                error = f'Read-back returned status {response.status_code}.'
+        except (requests.exceptions.RequestException, ValueError) as e:
+            error = f'Read-back failed: {e}'
+
+        if time.perf_counter() + interval >= give_up:
+            return {'verified': False, 'attempts': attempts, 'ingest_ms': None, 'error': error}
+        time.sleep(interval)
@@ -0,0 +1,240 @@
+"""
+Saved device profiles: named generation configs kept in a local SQLite file.
+
+The searchable fields (controller, CSE host and port, AE, container, labels)
+are stored in their own indexed columns next to the full config JSON. Lists
+and searches read only those columns and page by name (keyset pagination),
+so they stay fast however many devices are saved.
+"""
+import json
+import sqlite3
+import threading
+import time
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS profiles (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    controller TEXT NOT NULL,
+    cse_url TEXT NOT NULL,
+    port INTEGER NOT NULL,
+    ae_name TEXT NOT NULL,
+    container_name TEXT NOT NULL,
+    config TEXT NOT NULL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS profiles_controller ON profiles (controller, name);
+CREATE INDEX IF NOT EXISTS profiles_host ON profiles (cse_url, port, name);
+CREATE INDEX IF NOT EXISTS profiles_ae ON profiles (ae_name, name);
+CREATE INDEX IF NOT EXISTS profiles_container ON profiles (container_name, name);
+CREATE TABLE IF NOT EXISTS profile_labels (
+    label TEXT NOT NULL,
+    profile_id INTEGER NOT NULL REFERENCES profiles (id) ON DELETE CASCADE,
+    PRIMARY KEY (label, profile_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS profile_labels_profile ON profile_labels (profile_id);
+'''
+
+# Columns returned by list/search (everything but the config JSON)
+SUMMARY_COLUMNS = ('id', 'name', 'controller', 'cse_url', 'port', 'ae_name', 'container_name', 'updated')
+
+# Fields a prefix search can run against, each backed by an index
+PREFIX_FIELDS = ('name', 'ae_name', 'container_name', 'cse_url')
+
+# Columns search() can filter on by exact value
+FILTER_COLUMNS = ('controller', 'cse_url', 'port', 'ae_name', 'container_name')
+
+
+class ProfileError(Exception):
+    """Raised for a missing profile or a name that is already taken."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def deep_merge(base, overrides):
+    """Return `base` with `overrides` applied; nested dictionaries are merged."""
+    merged = dict(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            value = deep_merge(merged[key], value)
+        merged[key] = value
+    return merged
+
+
+def _prefix_end(prefix):
+    """Smallest string greater than every string starting with `prefix`."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _columns(config):
+    try:
+        port = int(config.get('port') or 0)
+    except (TypeError, ValueError):
+        port = 0
+    return {
+        'controller': config.get('controller') or '',
+        'cse_url': config.get('cse_url') or '',
+        'port': port,
+        'ae_name': config.get('ae_name') or '',
+        'container_name': config.get('container_name') or '',
+    }
+
+
+def _labels(config):
+    labels = config.get('labels') or []
+    return sorted({str(label) for label in labels if str(label).strip()}) if isinstance(labels, list) else []
+
+
+class ProfileStore:
+    """SQLite-backed store of named device configs.
+
+    Args:
+        path: Database file; it is created (with its schema) on first use
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            with self._lock:
+                if not self._ready:
+                    conn.executescript(SCHEMA)
+                    self._ready = True
+            self._local.conn = conn
+        return conn
+
+    def _row(self, profile_id):
+        row = self._conn().execute('SELECT * FROM profiles WHERE id = ?', (profile_id,)).fetchone()
+        if row is None:
+            raise ProfileError(f'Profile {profile_id} not found.', 404)
+        return row
+
+    def _write_labels(self, conn, profile_id, config):
+        conn.execute('DELETE FROM profile_labels WHERE profile_id = ?', (profile_id,))
+        conn.executemany('INSERT INTO profile_labels (label, profile_id) VALUES (?, ?)',
+                         [(label, profile_id) for label in _labels(config)])
+
+    def get(self, profile_id):
+        """Full profile (with its config) by id."""
+        row = self._row(profile_id)
+        profile = {column: row[column] for column in SUMMARY_COLUMNS}
+        profile['created'] = row['created']
+        profile['config'] = json.loads(row['config'])
+        return profile
+
+    def create(self, name, config):
+        """Save a new profile.
+
+        Raises:
+            ProfileError: If the name is already taken (status 409)
+        """
+        now = time.time()
+        conn = self._conn()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    'INSERT INTO profiles (name, controller, cse_url, port, ae_name, container_name, '
+                    'config, created, updated) VALUES (:name, :controller, :cse_url, :port, :ae_name, '
+                    ':container_name, :config, :now, :now)',
+                    dict(_columns(config), name=name, config=json.dumps(config), now=now))
+                self._write_labels(conn, cursor.lastrowid, config)
+        except sqlite3.IntegrityError:
+            raise ProfileError(f"A profile named '{name}' already exists.", 409)
+        return self.get(cursor.lastrowid)
+
+    def update(self, profile_id, config, name=None):
+        """Replace a profile's config (and optionally rename it)."""
+        row = self._row(profile_id)
+        conn = self._conn()
+        try:
+            with conn:
+                conn.execute(
+                    'UPDATE profiles SET name = :name, controller = :controller, cse_url = :cse_url, '
+                    'port = :port, ae_name = :ae_name, container_name = :container_name, '
+                    'config = :config, updated = :now WHERE id = :id',
+                    dict(_columns(config), id=profile_id, name=name or row['name'],
+                         config=json.dumps(config), now=time.time()))
+                self._write_labels(conn, profile_id, config)
+        except sqlite3.IntegrityError:
+            raise ProfileError(f"A profile named '{name}' already exists.", 409)
+        return self.get(profile_id)
+
+    def delete(self, profile_id):
+        self._row(profile_id)
+        with self._conn() as conn:
+            conn.execute('DELETE FROM profiles WHERE id = ?', (profile_id,))
+
+    def clone(self, profile_id, name, overrides=None):
+        """Save a copy of a profile under a new name with `overrides` merged in."""
+        config = deep_merge(self.get(profile_id)['config'], overrides or {})
+        return self.create(name, config)
+
+    def search(self, prefix='', field='name', filters=None, label=None, after=None, limit=100):
+        """Page through profile summaries ordered by name.
+
+        Args:
+            prefix: Only profiles whose `field` starts with this (case-sensitive)
+            field: One of PREFIX_FIELDS
+            filters: Exact matches on controller, cse_url, port, ae_name or
+                     container_name
+            label: Only profiles carrying this label
+            after: Name of the last profile of the previous page
+            limit: Page size
+
+        Returns:
+            Tuple of (profiles, next_after); next_after is None on the last page
+        """
+        if field not in PREFIX_FIELDS:
+            raise ProfileError(f"Prefix search field must be one of: {', '.join(PREFIX_FIELDS)}.")
+        where, args = [], []
+        for column, value in (filters or {}).items():
+            if column not in FILTER_COLUMNS:
+                raise ProfileError(f"Unknown filter '{column}'.")
+            where.append(f'p.{column} = ?')
+            args.append(value)
+        if prefix:
+            # A range instead of LIKE, so the column's index is used
+            where.append(f'p.{field} >= ? AND p.{field} < ?')
+            args += [prefix, _prefix_end(prefix)]
+        if label:
+            where.append('p.id IN (SELECT profile_id FROM profile_labels WHERE label = ?)')
+            args.append(label)
+        if after:
+            where.append('p.name > ?')
+            args.append(after)
+
+        sql = (f"SELECT {', '.join('p.' + c for c in SUMMARY_COLUMNS)} FROM profiles p"
+               + (' WHERE ' + ' AND '.join(where) if where else '')
+               + ' ORDER BY p.name LIMIT ?')
+        rows = self._conn().execute(sql, args + [limit + 1]).fetchall()
+        profiles = [dict(row) for row in rows[:limit]]
+        next_after = profiles[-1]['name'] if len(rows) > limit else None
+        return profiles, next_after
+
+    def by_host(self, cse_url, port=None, controller=None):
+        """List (id, name, config) for every profile targeting a CSE host."""
+        sql = 'SELECT id, name, config FROM profiles WHERE cse_url = ?'
+        args = [cse_url]
+        if port is not None:
+            sql += ' AND port = ?'
+            args.append(int(port))
+        if controller:
+            sql += ' AND controller = ?'
+            args.append(controller)
+        rows = self._conn().execute(sql + ' ORDER BY name', args).fetchall()
+        return [(row['id'], row['name'], json.loads(row['config'])) for row in rows]
+
+    def count(self):
+        return self._conn().execute('SELECT COUNT(*) FROM profiles').fetchone()[0]
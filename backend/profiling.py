@@ -0,0 +1,206 @@
+"""
+Opt-in per-request profiling for the web routes.
+
+A profiled request runs under a deterministic call tracer (its own thread
+only) and tracemalloc. The result holds:
+
+- folded stacks (`outer;inner;leaf <microseconds>`), the input format of
+  flamegraph.pl, inferno and speedscope
+- wall time and net allocations of the instrumented spans (validation,
+  generators, upstream HTTP calls)
+- the top allocation sites of the request
+
+Spans are cheap no-ops on requests that aren't being profiled.
+"""
+import itertools
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+
+# The profiler's own bookkeeping isn't part of the request
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+)
+
+
+def _frame_name(frame, event, arg):
+    if event == 'c_call':
+        module = getattr(arg, '__module__', None) or 'builtins'
+        return f"{module}.{getattr(arg, '__qualname__', getattr(arg, '__name__', '?'))}"
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _Profile:
+    def __init__(self, profile_id, label):
+        self.id = profile_id
+        self.label = label
+        self.created = time.time()
+        self.started = time.perf_counter()
+        self.elapsed_ms = None
+        self.folded = defaultdict(int)   # stack -> exclusive nanoseconds
+        self.spans = []
+        self.allocations = []
+        self.memory = None
+        self._names = []
+        self._frames = []  # [start_ns, child_ns] per entry of _names
+        self._baseline = None
+        self._memory_before = 0
+
+    def trace(self, frame, event, arg):
+        now = time.perf_counter_ns()
+        if event in ('call', 'c_call'):
+            self._names.append(_frame_name(frame, event, arg))
+            self._frames.append([now, 0])
+            return
+        # return / c_return / c_exception; frames entered before tracing
+        # started have nothing on the stack and are ignored
+        if not self._frames:
+            return
+        start, child = self._frames.pop()
+        elapsed = now - start
+        self.folded[';'.join(self._names)] += elapsed - child
+        self._names.pop()
+        if self._frames:
+            self._frames[-1][1] += elapsed
+
+    def summary(self):
+        return {
+            'id': self.id,
+            'label': self.label,
+            'created': self.created,
+            'elapsed_ms': self.elapsed_ms,
+            'spans': len(self.spans),
+        }
+
+    def to_dict(self, top=25):
+        hot = sorted(self.folded.items(), key=lambda item: item[1], reverse=True)[:top]
+        return dict(self.summary(),
+                    spans=self.spans,
+                    memory=self.memory,
+                    allocations=self.allocations,
+                    hot_stacks=[{'stack': stack.split(';'), 'self_ms': round(ns / 1e6, 3)}
+                                for stack, ns in hot])
+
+    def folded_text(self):
+        """Folded stacks weighted in microseconds, one per line"""
+        return ''.join(f"{stack} {ns // 1000}\n"
+                       for stack, ns in sorted(self.folded.items()) if ns >= 1000)
+
+
+class RequestProfiler:
+    """Runs selected requests under a call tracer and tracemalloc.
+
+    Args:
+        keep: Number of finished profiles kept for /admin/profiles
+        top_allocations: Allocation sites reported per profile
+        trace_frames: Stack depth recorded by tracemalloc per allocation
+
+    tracemalloc is process-wide, so allocations of requests running at the
+    same time as a profiled one are attributed to it as well.
+    """
+
+    def __init__(self, keep=50, top_allocations=15, trace_frames=1):
+        self.keep = keep
+        self.top_allocations = top_allocations
+        self.trace_frames = trace_frames
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._profiles = OrderedDict()
+        self._local = threading.local()
+        self._tracing = 0  # profiles currently holding tracemalloc
+        self._started_tracemalloc = False
+
+    @property
+    def active(self):
+        """The profile running on this thread, if any"""
+        return getattr(self._local, 'profile', None)
+
+    def start(self, label):
+        """Begin profiling the current thread (no-op if already profiling)."""
+        if self.active is not None:
+            return self.active
+        with self._lock:
+            profile = _Profile(next(self._ids), label)
+            if self._tracing == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start(self.trace_frames)
+                self._started_tracemalloc = True
+            self._tracing += 1
+        profile._baseline = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        profile._memory_before = tracemalloc.get_traced_memory()[0]
+        self._local.profile = profile
+        sys.setprofile(profile.trace)
+        return profile
+
+    def finish(self):
+        """Stop profiling the current thread and store the result.
+
+        Returns:
+            The finished profile, or None if this thread wasn't profiling
+        """
+        profile = self.active
+        if profile is None:
+            return None
+        sys.setprofile(None)
+        self._local.profile = None
+        profile.elapsed_ms = round((time.perf_counter() - profile.started) * 1000, 3)
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        current, peak = tracemalloc.get_traced_memory()
+        profile.memory = {'net_kb': round((current - profile._memory_before) / 1024, 1),
+                          'peak_kb': round(peak / 1024, 1)}
+        profile.allocations = [
+            {'site': f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+             'size_kb': round(stat.size_diff / 1024, 2), 'count': stat.count_diff}
+            for stat in snapshot.compare_to(profile._baseline, 'lineno')[:self.top_allocations]
+            if stat.size_diff > 0
+        ]
+        profile._baseline = None
+
+        with self._lock:
+            self._tracing -= 1
+            # Leave tracemalloc alone if something else started it
+            if self._tracing == 0 and self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.keep:
+                self._profiles.popitem(last=False)
+        return profile
+
+    @contextmanager
+    def span(self, name):
+        """Time a block and its net allocations on the active profile."""
+        profile = self.active
+        if profile is None:
+            yield
+            return
+        memory_before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            profile.spans.append({
+                'name': name,
+                'offset_ms': round((started - profile.started) * 1000, 3),
+                'ms': round((time.perf_counter() - started) * 1000, 3),
+                'net_kb': round((tracemalloc.get_traced_memory()[0] - memory_before) / 1024, 2),
+            })
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self):
+        with self._lock:
+            return [p.summary() for p in reversed(self._profiles.values())]
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
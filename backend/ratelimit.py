@@ -0,0 +1,213 @@
+"""
+Token-bucket rate limiting for the /test-* routes.
+
+Each request takes one token from every bucket it is charged to (the
+client's IP and the target CSE's host:port). A bucket refills at `rate`
+tokens per second up to `burst`; a request is refused, without taking
+anything, if any of its buckets is short.
+
+Buckets live in memory (shared by the threads of one process) or in a local
+SQLite file, which lets every worker process of the server share them.
+"""
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class RateLimitedError(Exception):
+    """Raised when a request exceeds one of its rate limits."""
+
+    def __init__(self, scope, key, retry_after):
+        super().__init__(f'Rate limit exceeded for {scope} {key}; retry in {retry_after:.1f}s')
+        self.scope = scope
+        self.key = key
+        self.retry_after = retry_after
+
+
+def host_key(cse_url, port):
+    """Bucket key of a CSE: 'host:port' with the host lowercased and any
+    scheme, port, path or trailing slash of `cse_url` dropped, so every
+    spelling of one server shares a bucket."""
+    url = str(cse_url or '').strip()
+    try:
+        host = urlsplit(url if '://' in url else '//' + url).hostname
+    except ValueError:  # e.g. an unclosed IPv6 bracket
+        host = None
+    return f'{host or url.lower()}:{port}'
+
+
+def _refill(tokens, updated, rate, burst, now):
+    return min(float(burst), tokens + max(0.0, now - updated) * rate)
+
+
+def _take(states, charges, cost, now):
+    """Apply one request to bucket states (dict key -> (tokens, updated)).
+
+    Returns:
+        Tuple of (new_states, wait, refused_key); when the request is refused
+        new_states is None and wait is the time until every bucket has room
+    """
+    refilled = {}
+    refused, wait = None, 0.0
+    for key, rate, burst in charges:
+        tokens, updated = states.get(key, (float(burst), now))
+        tokens = _refill(tokens, updated, rate, burst, now)
+        refilled[key] = tokens
+        if tokens < cost:
+            need = (cost - tokens) / rate
+            if need > wait:
+                refused, wait = key, need
+    if refused is not None:
+        return None, wait, refused
+    return {key: (tokens - cost, now) for key, tokens in refilled.items()}, 0.0, None
+
+
+class MemoryBucketStore:
+    """Bucket state for a single process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def take(self, charges, cost, now):
+        with self._lock:
+            updates, wait, refused = _take(self._buckets, charges, cost, now)
+            if updates is not None:
+                self._buckets.update(updates)
+            return wait, refused
+
+    def prune(self, idle_before):
+        with self._lock:
+            for key in [k for k, (_, updated) in self._buckets.items() if updated < idle_before]:
+                del self._buckets[key]
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._buckets)
+
+    def reset(self, key=None):
+        with self._lock:
+            if key is None:
+                self._buckets.clear()
+            else:
+                self._buckets.pop(key, None)
+
+
+class SQLiteBucketStore:
+    """Bucket state in a local SQLite file shared by several worker processes.
+
+    Every take() runs in one IMMEDIATE transaction, so check-and-take is
+    atomic across threads and processes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets ("
+                         "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit mode; transactions are opened explicitly
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def take(self, charges, cost, now):
+        conn = self._conn()
+        keys = [key for key, _, _ in charges]
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute(f"SELECT key, tokens, updated FROM buckets WHERE key IN "
+                                f"({','.join('?' * len(keys))})", keys).fetchall()
+            updates, wait, refused = _take({k: (t, u) for k, t, u in rows}, charges, cost, now)
+            if updates is not None:
+                conn.executemany("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                                 [(k, t, u) for k, (t, u) in updates.items()])
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return wait, refused
+
+    def prune(self, idle_before):
+        self._conn().execute('DELETE FROM buckets WHERE updated < ?', (idle_before,))
+
+    def snapshot(self):
+        return {k: (t, u) for k, t, u in self._conn().execute('SELECT key, tokens, updated FROM buckets')}
+
+    def reset(self, key=None):
+        if key is None:
+            self._conn().execute('DELETE FROM buckets')
+        else:
+            self._conn().execute('DELETE FROM buckets WHERE key = ?', (key,))
+
+
+class RateLimiter:
+    """Token buckets per scope (e.g. 'client' and 'host').
+
+    Args:
+        limits: Dictionary scope -> (requests per minute, burst); a scope
+                with a rate of 0 is not limited
+        store: MemoryBucketStore (default) or SQLiteBucketStore
+    """
+
+    # take() calls between sweeps of fully refilled buckets
+    PRUNE_EVERY = 500
+
+    def __init__(self, limits, store=None):
+        self.limits = {scope: (per_minute / 60.0, max(1, int(burst)))
+                       for scope, (per_minute, burst) in limits.items() if per_minute > 0}
+        self.store = store or MemoryBucketStore()
+        self._calls = 0
+        self._lock = threading.Lock()
+
+    def take(self, keys, cost=1):
+        """Take `cost` tokens from the bucket of every scope in `keys`.
+
+        Args:
+            keys: Dictionary scope -> key, e.g. {'client': ip, 'host': 'cse:8080'}
+            cost: Tokens to take from each bucket
+
+        Raises:
+            RateLimitedError: If any bucket is short; nothing is taken then
+        """
+        charges = [(f'{scope}:{key}', *self.limits[scope])
+                   for scope, key in keys.items() if scope in self.limits]
+        if not charges:
+            return
+        now = time.time()
+        wait, refused = self.store.take(charges, cost, now)
+        self._maybe_prune(now)
+        if refused is not None:
+            scope, key = refused.split(':', 1)
+            raise RateLimitedError(scope, key, wait)
+
+    def _maybe_prune(self, now):
+        with self._lock:
+            self._calls += 1
+            if self._calls % self.PRUNE_EVERY:
+                return
+        # An idle bucket refills completely; dropping it changes nothing
+        refill = max(burst / rate for rate, burst in self.limits.values())
+        self.store.prune(now - refill)
+
+    def snapshot(self):
+        """Current tokens of every tracked bucket, refilled to now."""
+        now = time.time()
+        states = {}
+        for key, (tokens, updated) in self.store.snapshot().items():
+            scope = key.split(':', 1)[0]
+            if scope in self.limits:
+                rate, burst = self.limits[scope]
+                states[key] = round(_refill(tokens, updated, rate, burst, now), 2)
+        return states
+
+    def reset(self, key=None):
+        self.store.reset(key)
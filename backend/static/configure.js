@@ -0,0 +1,799 @@
+// Global state
+let serverConfig = {};
+let selectedOperation = '';
+let parameterCount = 1;
+let labelCount = 1;
+let testPassed = false;
+
+// Live preview: edits are POSTed to /preview/<id>; the server debounces
+// them and streams back line diffs over Server-Sent Events
+let previewSource = null;
+let previewSession = '';
+let previewLines = [];
+let previewInFlight = false;
+let previewDirty = false;
+
+// Server config validation and modal opening
+function openOperationModal() {
+    // Validate all required fields
+    const cseUrl = document.getElementById('cse_url').value.trim();
+    const port = document.getElementById('port').value.trim();
+    const aeName = document.getElementById('ae_name').value.trim();
+    const containerName = document.getElementById('container_name').value.trim();
+    const origin = document.getElementById('origin').value.trim();
+
+    if (!cseUrl || !port || !aeName || !containerName || !origin) {
+        alert('Please fill in all required fields before proceeding.');
+        return;
+    }
+
+    // Store server config
+    serverConfig = {
+        controller: document.body.dataset.controller,
+        cse_url: cseUrl,
+        port: parseInt(port),
+        protocol: document.getElementById('protocol').value,
+        ae_name: aeName,
+        container_name: containerName,
+        origin: origin,
+        wifi_ssid: document.getElementById('wifi_ssid').value.trim(),
+        wifi_password: document.getElementById('wifi_password').value.trim(),
+        schedule: {
+            interval: parseFloat(document.getElementById('sched_interval').value) || 10,
+            phase: document.getElementById('sched_phase').value.trim() || 'auto',
+            start_jitter: document.getElementById('sched_start_jitter').value.trim() || null,
+            backoff_base: parseFloat(document.getElementById('sched_backoff_base').value) || 2,
+            backoff_max: parseFloat(document.getElementById('sched_backoff_max').value) || 300
+        }
+    };
+
+    const buildProfile = document.getElementById('build_profile');
+    if (buildProfile) {
+        serverConfig.profile = buildProfile.value;
+    }
+
+    const tlsFingerprint = document.getElementById('tls_fingerprint');
+    if (tlsFingerprint) {
+        serverConfig.tls = {
+            fingerprint: tlsFingerprint.value.trim(),
+            trust_anchor: document.getElementById('tls_trust_anchor').value.trim()
+        };
+    }
+
+    // Reset modal state
+    const operationRadios = document.querySelectorAll('input[name="operation"]');
+    operationRadios.forEach(radio => radio.checked = false);
+    const proceedBtn = document.getElementById('proceedBtn');
+    proceedBtn.disabled = true;
+    selectedOperation = '';
+
+    // Show modal
+    document.getElementById('operationModal').classList.add('active');
+}
+
+// Probe candidate protocol:port bindings and pre-fill the fastest working one
+async function probeEndpoints() {
+    const cseUrl = document.getElementById('cse_url').value.trim();
+    const aeName = document.getElementById('ae_name').value.trim();
+    const containerName = document.getElementById('container_name').value.trim();
+    const origin = document.getElementById('origin').value.trim();
+    const resultEl = document.getElementById('endpointProbeResult');
+    const btn = document.getElementById('probeEndpointsBtn');
+    const btnText = document.getElementById('probeEndpointsBtnText');
+
+    if (!cseUrl || !aeName || !containerName || !origin) {
+        alert('Please fill in host, AE, container and authentication before probing.');
+        return;
+    }
+
+    let raw = document.getElementById('candidate_endpoints').value.trim();
+    if (!raw) {
+        raw = `${document.getElementById('protocol').value}:${document.getElementById('port').value}, http:8080, https:443`;
+    }
+    const candidates = [];
+    const seen = new Set();
+    raw.split(',').forEach(entry => {
+        const [protocol, port] = entry.trim().toLowerCase().split(':');
+        const key = `${protocol}:${port}`;
+        if (protocol && port && !seen.has(key)) {
+            seen.add(key);
+            candidates.push({ protocol, port: parseInt(port) });
+        }
+    });
+
+    btn.disabled = true;
+    btnText.textContent = 'Probing...';
+    resultEl.textContent = '';
+
+    try {
+        const response = await fetch('/test-endpoints', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                cse_url: cseUrl,
+                ae_name: aeName,
+                container_name: containerName,
+                origin: origin,
+                protocol: document.getElementById('protocol').value,
+                port: document.getElementById('port').value,
+                candidates
+            })
+        });
+        const result = await response.json();
+
+        if (!response.ok) {
+            resultEl.textContent = result.error || 'Probe failed';
+            return;
+        }
+
+        const summary = result.results.map(r =>
+            `${r.protocol}:${r.port} ${r.success ? `✓ ${r.latency_ms} ms` : `✗ ${r.error || r.status_code}`}`
+        ).join(' · ');
+
+        if (result.best) {
+            document.getElementById('protocol').value = result.best.protocol;
+            document.getElementById('port').value = result.best.port;
+            resultEl.textContent = `Using ${result.best.protocol}:${result.best.port}. ${summary}`;
+        } else {
+            resultEl.textContent = `No working endpoint found. ${summary}`;
+        }
+    } catch (error) {
+        resultEl.textContent = `Probe failed: ${error.message}`;
+    } finally {
+        btn.disabled = false;
+        btnText.textContent = 'Find Fastest Endpoint';
+    }
+}
+
+function closeOperationModal() {
+    document.getElementById('operationModal').classList.remove('active');
+}
+
+// Operation selection
+document.addEventListener('DOMContentLoaded', function() {
+    const operationRadios = document.querySelectorAll('input[name="operation"]');
+    const proceedBtn = document.getElementById('proceedBtn');
+
+    operationRadios.forEach(radio => {
+        radio.addEventListener('change', function() {
+            selectedOperation = this.value;
+            proceedBtn.disabled = false;
+        });
+    });
+
+    // Auto-strip protocol from CSE URL
+    const cseUrlField = document.getElementById('cse_url');
+    if (cseUrlField) {
+        cseUrlField.addEventListener('input', function() {
+            let value = this.value;
+            if (value.match(/^https?:\/\//i)) {
+                this.value = value.replace(/^https?:\/\//i, '');
+            }
+        });
+    }
+
+    // AE / container autocomplete from the CSE resource tree
+    setupDiscoveryAutocomplete('ae_name', 'aeSuggestions', false);
+    setupDiscoveryAutocomplete('container_name', 'containerSuggestions', true);
+
+    // Initialize parameter and label fields
+    generateParameterFields();
+    generateLabelFields();
+});
+
+// Fill a datalist with AE or container names discovered on the CSE
+function setupDiscoveryAutocomplete(inputId, listId, containers) {
+    const input = document.getElementById(inputId);
+    const list = document.getElementById(listId);
+    let timer = null;
+    let requestId = 0;
+
+    const refresh = () => {
+        const cseUrl = document.getElementById('cse_url').value.trim();
+        const port = document.getElementById('port').value.trim();
+        const origin = document.getElementById('origin').value.trim();
+        const aeName = document.getElementById('ae_name').value.trim();
+        if (!cseUrl || !port || !origin || (containers && !aeName)) return;
+
+        const current = ++requestId;
+        fetch('/discover', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                protocol: document.getElementById('protocol').value,
+                cse_url: cseUrl,
+                port: port,
+                origin: origin,
+                ae_name: containers ? aeName : '',
+                prefix: input.value.trim(),
+                limit: 50
+            })
+        })
+            .then(response => response.ok ? response.json() : null)
+            .then(result => {
+                if (!result || current !== requestId) return;
+                list.innerHTML = '';
+                result.items.forEach(name => {
+                    const option = document.createElement('option');
+                    option.value = name;
+                    list.appendChild(option);
+                });
+            })
+            .catch(() => {});
+    };
+
+    const schedule = () => {
+        clearTimeout(timer);
+        timer = setTimeout(refresh, 250);
+    };
+    input.addEventListener('focus', schedule);
+    input.addEventListener('input', schedule);
+}
+
+function proceedWithOperation() {
+    if (!selectedOperation) return;
+
+    closeOperationModal();
+
+    // Hide server config page
+    document.getElementById('serverConfigPage').classList.remove('active');
+
+    // Update progress
+    document.getElementById('step2').classList.remove('active');
+    document.getElementById('step2').classList.add('completed');
+    document.getElementById('step2').querySelector('.step-number').textContent = '✓';
+    document.getElementById('step3').classList.add('active');
+
+    // Reset test state
+    testPassed = false;
+
+    // Clear GET test results
+    document.getElementById('getResponseDisplay').classList.remove('active');
+
+    // Clear POST test results
+    document.getElementById('postResponseDisplay').classList.remove('active');
+
+    if (selectedOperation === 'GET') {
+        showGetTestPage();
+    } else {
+        showPostParamsPage();
+    }
+}
+
+// GET Test Page
+function showGetTestPage() {
+    const page = document.getElementById('getTestPage');
+    page.classList.add('active');
+
+    // Populate summary
+    document.getElementById('summary-host').textContent = serverConfig.cse_url;
+    document.getElementById('summary-port').textContent = serverConfig.port;
+    document.getElementById('summary-protocol').textContent = serverConfig.protocol.toUpperCase();
+    document.getElementById('summary-ae').textContent = serverConfig.ae_name;
+    document.getElementById('summary-container').textContent = serverConfig.container_name;
+
+    const endpoint = `${serverConfig.protocol}://${serverConfig.cse_url}:${serverConfig.port}/~/in-cse/in-name/${serverConfig.ae_name}/${serverConfig.container_name}/Data/la`;
+    document.getElementById('summary-endpoint').textContent = endpoint;
+}
+
+async function testGetOperation() {
+    const testBtn = document.getElementById('testGetBtn');
+    const btnText = document.getElementById('testGetBtnText');
+    const responseDisplay = document.getElementById('getResponseDisplay');
+
+    testBtn.disabled = true;
+    btnText.textContent = 'Testing...';
+    responseDisplay.classList.remove('active');
+
+    try {
+        const response = await fetch('/test-get', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                ...serverConfig,
+                timing: document.getElementById('getTiming').checked
+            })
+        });
+
+        const result = await response.json();
+
+        if (response.ok && result.success) {
+            showResponse('get', true, result.status_code, result.response, result.url, result);
+            testPassed = true;
+        } else {
+            showResponse('get', false, result.status_code || 'Error', result.error || result.response || 'Test failed', result.url, result);
+            testPassed = false;
+        }
+    } catch (error) {
+        showResponse('get', false, 'Error', `Test failed: ${error.message}`);
+        testPassed = false;
+    } finally {
+        testBtn.disabled = false;
+        btnText.textContent = 'Test GET Request';
+    }
+}
+
+// POST Parameters Page
+function showPostParamsPage() {
+    const page = document.getElementById('postParamsPage');
+    page.classList.add('active');
+
+    const combinedOptions = document.getElementById('combinedOptions');
+    if (combinedOptions) {
+        combinedOptions.style.display = selectedOperation === 'BOTH' ? 'block' : 'none';
+    }
+    const freertosOptions = document.getElementById('freertosOptions');
+    if (freertosOptions) {
+        freertosOptions.style.display = selectedOperation === 'POST' ? 'block' : 'none';
+    }
+}
+
+async function testPostOperation() {
+    const testBtn = document.getElementById('testPostBtn');
+    const btnText = document.getElementById('testPostBtnText');
+    const responseDisplay = document.getElementById('postResponseDisplay');
+
+    testBtn.disabled = true;
+    btnText.textContent = 'Testing...';
+    responseDisplay.classList.remove('active');
+
+    // Collect parameters
+    const parameters = [];
+    for (let i = 0; i < parameterCount; i++) {
+        const name = document.querySelector(`[name="param_name_${i}"]`)?.value || '';
+        const type = document.querySelector(`[name="param_type_${i}"]`)?.value || 'string';
+        const defaultVal = document.querySelector(`[name="param_default_${i}"]`)?.value || '';
+
+        if (name) {
+            parameters.push({ name, type, default: defaultVal || '0' });
+        }
+    }
+
+    // Collect labels
+    const labels = [];
+    for (let i = 0; i < labelCount; i++) {
+        const labelValue = document.querySelector(`[name="label_${i}"]`)?.value;
+        if (labelValue && labelValue.trim()) {
+            labels.push(labelValue.trim());
+        }
+    }
+
+    const postConfig = {
+        ...serverConfig,
+        parameters,
+        labels,
+        timing: document.getElementById('postTiming').checked,
+        verify_ingest: document.getElementById('postVerify').checked
+    };
+
+    try {
+        const response = await fetch('/test-post', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(postConfig)
+        });
+
+        const result = await response.json();
+
+        if (response.ok && result.success) {
+            showResponse('post', true, result.status_code, result.response, result.url, result);
+            testPassed = true;
+
+            // Store parameters and labels for code generation
+            serverConfig.parameters = parameters;
+            serverConfig.labels = labels;
+        } else {
+            showResponse('post', false, result.status_code || 'Error', result.error || result.response || 'Test failed', result.url, result);
+            testPassed = false;
+        }
+    } catch (error) {
+        showResponse('post', false, 'Error', `Test failed: ${error.message}`);
+        testPassed = false;
+    } finally {
+        testBtn.disabled = false;
+        btnText.textContent = 'Test POST Request';
+    }
+}
+
+// Format timing breakdown / ingest verification returned by /test-*
+function formatDiagnostics(result) {
+    const lines = [];
+    if (result && result.timing) {
+        const t = result.timing;
+        lines.push('Timing (ms):');
+        lines.push(`  DNS resolve    ${t.dns_ms}`);
+        lines.push(`  TCP connect    ${t.connect_ms}`);
+        lines.push(`  TLS handshake  ${t.tls_ms}`);
+        lines.push(`  First byte     ${t.ttfb_ms}`);
+        lines.push(`  Download       ${t.download_ms}`);
+        lines.push(`  Total          ${t.total_ms}`);
+    }
+    if (result && result.verify) {
+        const v = result.verify;
+        lines.push(v.verified
+            ? `Ingest verified: visible at /la after ${v.ingest_ms} ms (${v.attempts} read${v.attempts > 1 ? 's' : ''})`
+            : `Ingest not verified after ${v.attempts} reads: ${v.error}`);
+    }
+    return lines.length ? lines.join('\n') + '\n\n' : '';
+}
+
+// Show response helper
+function showResponse(type, success, statusCode, responseText, url = '', result = null) {
+    const prefix = type; // 'get' or 'post'
+    const display = document.getElementById(`${prefix}ResponseDisplay`);
+    const badge = document.getElementById(`${prefix}StatusBadge`);
+    const content = document.getElementById(`${prefix}ResponseContent`);
+
+    display.classList.add('active');
+
+    if (success) {
+        badge.className = 'status-badge success';
+        badge.textContent = `✓ ${statusCode}`;
+    } else {
+        badge.className = 'status-badge error';
+        badge.textContent = `✗ ${statusCode}`;
+    }
+
+    // Try to pretty-print JSON
+    let displayText = responseText;
+    try {
+        const jsonObj = JSON.parse(responseText);
+        displayText = JSON.stringify(jsonObj, null, 2);
+    } catch (e) {
+        // Not JSON, display as is
+    }
+
+    const diagnostics = formatDiagnostics(result);
+    if (url) {
+        content.textContent = `URL: ${url}\n\n${diagnostics}${displayText}`;
+    } else {
+        content.textContent = diagnostics + displayText;
+    }
+}
+
+// Parameter management
+function generateParameterFields() {
+    const container = document.getElementById('parametersContainer');
+
+    // Save existing values before clearing
+    const existingValues = [];
+    for (let i = 0; i < parameterCount; i++) {
+        const nameInput = document.querySelector(`[name="param_name_${i}"]`);
+        const typeInput = document.querySelector(`[name="param_type_${i}"]`);
+        const defaultInput = document.querySelector(`[name="param_default_${i}"]`);
+
+        if (nameInput || typeInput || defaultInput) {
+            existingValues[i] = {
+                name: nameInput?.value || '',
+                type: typeInput?.value || '',
+                default: defaultInput?.value || ''
+            };
+        }
+    }
+
+    container.innerHTML = '';
+
+    for (let i = 0; i < parameterCount; i++) {
+        const paramCard = document.createElement('div');
+        paramCard.className = 'parameter-card';
+        paramCard.innerHTML = `
+            <div class="param-header">
+                <span class="param-badge">Parameter ${i + 1}</span>
+                ${parameterCount > 1 ? `<button type="button" class="btn-remove-param" onclick="removeParameter(${i})" aria-label="Remove parameter">×</button>` : ''}
+            </div>
+            <div class="param-fields">
+                <div class="form-group">
+                    <label>Field Name <span class="required">*</span></label>
+                    <input type="text" name="param_name_${i}" placeholder="temperature | humidity | status" value="${existingValues[i]?.name || ''}" required>
+                </div>
+                <div class="form-group">
+                    <label>Data Type <span class="required">*</span></label>
+                    <select name="param_type_${i}" required>
+                        <option value="">Select type...</option>
+                        <option value="int" ${existingValues[i]?.type === 'int' ? 'selected' : ''}>Integer</option>
+                        <option value="float" ${existingValues[i]?.type === 'float' ? 'selected' : ''}>Decimal</option>
+                        <option value="string" ${existingValues[i]?.type === 'string' ? 'selected' : ''}>Text</option>
+                        <option value="boolean" ${existingValues[i]?.type === 'boolean' ? 'selected' : ''}>True/False</option>
+                    </select>
+                </div>
+                <div class="form-group">
+                    <label>Default Value</label>
+                    <input type="text" name="param_default_${i}" placeholder="25 | 0.0 | hello | true" value="${existingValues[i]?.default || ''}">
+                </div>
+            </div>
+        `;
+        container.appendChild(paramCard);
+    }
+    refreshPreview();
+}
+
+function addParameter() {
+    if (parameterCount < 20) {
+        parameterCount++;
+        generateParameterFields();
+    }
+}
+
+function removeParameter(index) {
+    if (parameterCount > 1) {
+        parameterCount--;
+        generateParameterFields();
+    }
+}
+
+// Label management
+function generateLabelFields() {
+    const container = document.getElementById('labelsContainer');
+
+    // Save existing values before clearing
+    const existingValues = [];
+    for (let i = 0; i < labelCount; i++) {
+        const labelInput = document.querySelector(`[name="label_${i}"]`);
+        if (labelInput) {
+            existingValues[i] = labelInput.value || '';
+        }
+    }
+
+    container.innerHTML = '';
+
+    for (let i = 0; i < labelCount; i++) {
+        const labelCard = document.createElement('div');
+        labelCard.className = 'parameter-card';
+        labelCard.innerHTML = `
+            <div class="param-header">
+                <span class="param-badge">Label ${i + 1}</span>
+                ${labelCount > 1 ? `<button type="button" class="btn-remove-param" onclick="removeLabel(${i})" aria-label="Remove label">×</button>` : ''}
+            </div>
+            <div class="param-fields">
+                <div class="form-group">
+                    <label>Label Value</label>
+                    <input type="text" name="label_${i}" placeholder="AE-EM | V2.0.0 | EM-CR-KH95-00" value="${existingValues[i] || ''}">
+                </div>
+            </div>
+        `;
+        container.appendChild(labelCard);
+    }
+    refreshPreview();
+}
+
+function addLabel() {
+    if (labelCount < 10) {
+        labelCount++;
+        generateLabelFields();
+    }
+}
+
+function removeLabel(index) {
+    if (labelCount > 1) {
+        labelCount--;
+        generateLabelFields();
+    }
+}
+
+// Code generation
+function buildGenerateConfig() {
+    // For POST (and combined) operation, collect parameters and labels before generating
+    if (selectedOperation !== 'GET') {
+        const parameters = [];
+        for (let i = 0; i < parameterCount; i++) {
+            const name = document.querySelector(`[name="param_name_${i}"]`)?.value || '';
+            const type = document.querySelector(`[name="param_type_${i}"]`)?.value || 'string';
+            const defaultVal = document.querySelector(`[name="param_default_${i}"]`)?.value || '';
+
+            if (name) {
+                parameters.push({ name, type, default: defaultVal || '0' });
+            }
+        }
+
+        const labels = [];
+        for (let i = 0; i < labelCount; i++) {
+            const labelValue = document.querySelector(`[name="label_${i}"]`)?.value;
+            if (labelValue && labelValue.trim()) {
+                labels.push(labelValue.trim());
+            }
+        }
+
+        serverConfig.parameters = parameters;
+        serverConfig.labels = labels;
+
+        const rtosEnabled = document.getElementById('rtos_enabled');
+        if (rtosEnabled && selectedOperation === 'POST') {
+            serverConfig.freertos = {
+                enabled: rtosEnabled.checked,
+                sample_interval: parseFloat(document.getElementById('rtos_sample_interval').value) || 1,
+                batch_size: parseInt(document.getElementById('rtos_batch_size').value) || null,
+                queue_depth: parseInt(document.getElementById('rtos_queue_depth').value) || null
+            };
+        }
+
+        const aggEnabled = document.getElementById('agg_enabled');
+        if (aggEnabled) {
+            serverConfig.aggregation = {
+                enabled: aggEnabled.checked,
+                sample_rate: parseFloat(document.getElementById('agg_sample_rate').value) || 10,
+                window: parseFloat(document.getElementById('agg_window').value) || 30
+            };
+            serverConfig.store_and_forward = {
+                enabled: document.getElementById('saf_enabled').checked,
+                max_rate: parseFloat(document.getElementById('saf_max_rate').value) || 5
+            };
+            serverConfig.metrics = {
+                enabled: document.getElementById('metrics_enabled').checked,
+                port: parseInt(document.getElementById('metrics_port').value) || null,
+                dump_interval: parseFloat(document.getElementById('metrics_dump').value) || 0
+            };
+        }
+    }
+
+    const config = {
+        ...serverConfig,
+        operation: selectedOperation
+    };
+
+    if (selectedOperation === 'BOTH') {
+        config.sample_interval = parseFloat(document.getElementById('sample_interval').value) || 1;
+        config.poll_interval = parseFloat(document.getElementById('poll_interval').value) || 5;
+    }
+
+    const targetsField = document.getElementById('dashboard_targets');
+    if (selectedOperation === 'GET' && targetsField && targetsField.value.trim()) {
+        config.targets = [`${serverConfig.ae_name}/${serverConfig.container_name}`]
+            .concat(targetsField.value.split('\n').map(line => line.trim()).filter(Boolean));
+    }
+    return config;
+}
+
+async function generateCode() {
+    const config = buildGenerateConfig();
+
+    try {
+        const response = await fetch('/generate', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(config)
+        });
+
+        const result = await response.json();
+
+        if (!response.ok) {
+            alert('Error: ' + (result.error || 'Failed to generate code'));
+            return;
+        }
+
+        // Store in sessionStorage and redirect
+        sessionStorage.setItem('generatedCode', result.code);
+        sessionStorage.setItem('filename', result.filename);
+        sessionStorage.setItem('controller', result.controller);
+
+        window.location.href = '/generate-view';
+    } catch (error) {
+        alert('Error generating code: ' + error.message);
+    }
+}
+
+async function saveProfile() {
+    const config = buildGenerateConfig();
+    const name = prompt('Save this configuration as profile:', `${config.ae_name}-${config.container_name}`);
+    if (!name) {
+        return;
+    }
+
+    try {
+        const response = await fetch('/saved-profiles', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ name: name, config: config })
+        });
+        const result = await response.json();
+        alert(response.ok ? `Saved profile "${result.name}" (#${result.id})` : 'Error: ' + result.error);
+    } catch (error) {
+        alert('Error saving profile: ' + error.message);
+    }
+}
+
+// Live preview
+function toggleLivePreview(enabled) {
+    const display = document.getElementById('livePreviewDisplay');
+    if (previewSource) {
+        previewSource.close();
+        previewSource = null;
+    }
+    if (!enabled) {
+        display.classList.remove('active');
+        return;
+    }
+
+    if (!previewSession) {
+        previewSession = Array.from(crypto.getRandomValues(new Uint8Array(12)),
+            b => b.toString(16).padStart(2, '0')).join('');
+    }
+    previewLines = [];
+    display.classList.add('active');
+    document.getElementById('livePreviewContent').textContent = 'Waiting for the first preview...';
+
+    previewSource = new EventSource(`/preview/${previewSession}/events`);
+    previewSource.onopen = () => refreshPreview();
+    previewSource.addEventListener('full', e => {
+        const event = JSON.parse(e.data);
+        previewLines = event.code.split('\n');
+        renderPreview(event, e.data.length, 'full file');
+    });
+    previewSource.addEventListener('diff', e => {
+        const event = JSON.parse(e.data);
+        const lines = [];
+        let pos = 0;
+        for (const [op, arg] of event.ops) {
+            if (op === 'k') {
+                lines.push(...previewLines.slice(pos, pos + arg));
+                pos += arg;
+            } else if (op === 'd') {
+                pos += arg;
+            } else {
+                lines.push(...arg);
+            }
+        }
+        lines.push(...previewLines.slice(pos));
+        previewLines = lines;
+        renderPreview(event, e.data.length, event.sections.join(', ') || 'no sections');
+    });
+    previewSource.addEventListener('invalid', e => {
+        const badge = document.getElementById('livePreviewBadge');
+        badge.className = 'status-badge error';
+        badge.textContent = JSON.parse(e.data).error;
+    });
+}
+
+function renderPreview(event, receivedBytes, changed) {
+    document.getElementById('livePreviewContent').textContent = previewLines.join('\n');
+    const badge = document.getElementById('livePreviewBadge');
+    badge.className = 'status-badge success';
+    badge.textContent = `v${event.version} · ${changed} · ${receivedBytes} B of ${event.bytes} B`;
+}
+
+async function refreshPreview() {
+    if (!previewSource || !selectedOperation) {
+        return;
+    }
+    // One request in flight at a time; the latest edit is sent after it
+    if (previewInFlight) {
+        previewDirty = true;
+        return;
+    }
+    previewInFlight = true;
+    try {
+        await fetch(`/preview/${previewSession}`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(buildGenerateConfig())
+        });
+    } catch (error) {
+        console.error('Live preview update failed:', error);
+    }
+    previewInFlight = false;
+    if (previewDirty) {
+        previewDirty = false;
+        refreshPreview();
+    }
+}
+
+document.getElementById('postParamsPage').addEventListener('input', refreshPreview);
+document.getElementById('postParamsPage').addEventListener('change', refreshPreview);
+
+function goBackToServer() {
+    // Hide current pages
+    document.getElementById('getTestPage').classList.remove('active');
+    document.getElementById('postParamsPage').classList.remove('active');
+
+    // Show server config page
+    document.getElementById('serverConfigPage').classList.add('active');
+
+    // Reset progress
+    document.getElementById('step2').classList.add('active');
+    document.getElementById('step2').classList.remove('completed');
+    document.getElementById('step2').querySelector('.step-number').textContent = '2';
+    document.getElementById('step3').classList.remove('active');
+
+    // Reset test state
+    testPassed = false;
+    selectedOperation = '';
+}
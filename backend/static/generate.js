@@ -0,0 +1,140 @@
+// Load generated code from sessionStorage
+document.addEventListener('DOMContentLoaded', function() {
+    const code = sessionStorage.getItem('generatedCode');
+    const filename = sessionStorage.getItem('filename');
+    const controller = sessionStorage.getItem('controller');
+
+    if (!code || !filename || !controller) {
+        window.location.href = '/';
+        return;
+    }
+
+    // Display code
+    document.getElementById('codeContent').textContent = code;
+    document.getElementById('filenameName').textContent = filename;
+
+    // Display controller name
+    const controllerNames = {
+        'arduino_nano': 'Arduino Nano 33 IoT',
+        'esp32': 'ESP32',
+        'esp8266': 'ESP8266',
+        'python': 'Python'
+    };
+    document.getElementById('controllerName').textContent = controllerNames[controller] || controller;
+
+    // Display instructions
+    const instructionsDiv = document.getElementById('instructions');
+
+    if (controller === 'python') {
+        instructionsDiv.innerHTML = `
+            <ol>
+                <li><strong>Save the file:</strong> Download as <code>${filename}</code></li>
+                <li><strong>Install dependencies:</strong> <code>pip install requests</code></li>
+                <li><strong>Run the script:</strong> <code>python ${filename}</code></li>
+                <li><strong>Customize:</strong> Update WiFi credentials and server settings</li>
+            </ol>
+            <div class="alert alert-info mt-3">
+                <strong>💡 Tip:</strong> The script will continuously send/receive data every 10 seconds. Press Ctrl+C to stop.
+            </div>
+        `;
+    } else {
+        instructionsDiv.innerHTML = `
+            <ol>
+                <li><strong>Open Arduino IDE</strong></li>
+                <li><strong>Install required libraries:</strong>
+                    <ul>
+                        ${controller === 'arduino_nano' ? '<li>WiFiNINA (Tools → Manage Libraries)</li>' : ''}
+                        ${controller === 'esp32' || controller === 'esp8266' ? '<li>ESP8266WiFi or WiFi.h (included in board package)</li>' : ''}
+                        ${controller === 'esp32' || controller === 'esp8266' ? '<li>HTTPClient (included in board package)</li>' : ''}
+                    </ul>
+                </li>
+                <li><strong>Copy the generated code</strong> into Arduino IDE</li>
+                <li><strong>Update WiFi credentials:</strong> Replace <code>YOUR_WIFI_SSID</code> and <code>YOUR_WIFI_PASSWORD</code></li>
+                <li><strong>Select your board:</strong> Tools → Board → ${controllerNames[controller]}</li>
+                <li><strong>Upload to your board</strong></li>
+                <li><strong>Open Serial Monitor</strong> (115200 baud) to see output</li>
+            </ol>
+            <div class="alert alert-warning mt-3">
+                <strong>⚠️ Important:</strong> Make sure your oneM2M server is running and accessible before uploading the code.
+            </div>
+        `;
+    }
+});
+
+function copyCode(event) {
+    const code = sessionStorage.getItem('generatedCode');
+    if (!code) {
+        alert('No code to copy');
+        return;
+    }
+
+    // Create a temporary textarea to copy from
+    const textarea = document.createElement('textarea');
+    textarea.value = code;
+    textarea.style.position = 'fixed';
+    textarea.style.opacity = '0';
+    document.body.appendChild(textarea);
+    textarea.select();
+
+    try {
+        const successful = document.execCommand('copy');
+        document.body.removeChild(textarea);
+
+        if (successful) {
+            const btn = event.target.tagName === 'BUTTON' ? event.target : event.target.closest('button');
+            const originalText = btn.innerHTML;
+            btn.innerHTML = '✅ Copied!';
+            btn.disabled = true;
+
+            setTimeout(() => {
+                btn.innerHTML = originalText;
+                btn.disabled = false;
+            }, 2000);
+        } else {
+            alert('Failed to copy code');
+        }
+    } catch (err) {
+        document.body.removeChild(textarea);
+        // Fallback to modern clipboard API
+        navigator.clipboard.writeText(code).then(() => {
+            const btn = event.target.tagName === 'BUTTON' ? event.target : event.target.closest('button');
+            const originalText = btn.innerHTML;
+            btn.innerHTML = '✅ Copied!';
+            btn.disabled = true;
+
+            setTimeout(() => {
+                btn.innerHTML = originalText;
+                btn.disabled = false;
+            }, 2000);
+        }).catch(err => {
+            alert('Failed to copy code: ' + err);
+        });
+    }
+}
+
+async function downloadCode() {
+    const code = sessionStorage.getItem('generatedCode');
+    const filename = sessionStorage.getItem('filename');
+
+    try {
+        const response = await fetch('/download', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ code, filename })
+        });
+
+        const blob = await response.blob();
+        const url = window.URL.createObjectURL(blob);
+        const a = document.createElement('a');
+        a.href = url;
+        a.download = filename;
+        document.body.appendChild(a);
+        a.click();
+        window.URL.revokeObjectURL(url);
+        document.body.removeChild(a);
+    } catch (error) {
+        alert('Download failed: ' + error.message);
+    }
+}
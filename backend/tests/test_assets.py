@@ -0,0 +1,64 @@
+import gzip
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from assets import AssetBundle, minify_css, minify_js
+
+STATIC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+
+
+def test_minify_css():
+    css = '/* theme */\n.a  >  .b ,\n.c {\n  color: red;\n  content: "  a  /* b */ ";\n}\n'
+    assert minify_css(css) == '.a>.b,.c{color:red;content:"  a  /* b */ "}'
+
+
+def test_minify_js_keeps_strings_templates_and_line_breaks():
+    js = ('// header\n'
+          'const url = "http://cse//x";  \n'
+          '\n'
+          '    let t = `line one\n'
+          '    // not a comment ${ {a: 1}.a }\n'
+          '  end`;\n'
+          'f()  // trailing comment stays\n')
+    assert minify_js(js) == ('const url = "http://cse//x";\n'
+                             'let t = `line one\n'
+                             '    // not a comment ${ {a: 1}.a }\n'
+                             '  end`;\n'
+                             'f()  // trailing comment stays')
+
+
+def test_minify_js_gives_up_on_unbalanced_templates():
+    js = 'let t = `open\n  // inside\n'
+    assert minify_js(js) == js
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='node is not installed')
+@pytest.mark.parametrize('name', ['configure.js', 'generate.js'])
+def test_minified_scripts_still_parse(tmp_path, name):
+    with open(os.path.join(STATIC, name), encoding='utf-8') as f:
+        minified = minify_js(f.read())
+    path = tmp_path / name
+    path.write_text(minified, encoding='utf-8')
+    subprocess.run(['node', '--check', str(path)], check=True)
+
+
+def test_bundle_fingerprints_and_reloads(tmp_path):
+    (tmp_path / 'site.css').write_text('body {  color: red; }', encoding='utf-8')
+    bundle = AssetBundle(str(tmp_path), ['site.css'], auto_reload=True)
+    first = bundle.url_name('site.css')
+    assert first.startswith('site.') and first.endswith('.css')
+    entry = bundle.get(first)
+    assert entry['body'] == b'body{color:red}'
+    assert gzip.decompress(entry['gzip']) == entry['body']
+
+    (tmp_path / 'site.css').write_text('body { color: blue; }', encoding='utf-8')
+    os.utime(tmp_path / 'site.css', (1, 1))
+    second = bundle.url_name('site.css')
+    assert second != first
+    assert bundle.get(first) is None
+    assert bundle.stats()['site.css']['url'] == second
+    with pytest.raises(KeyError):
+        bundle.url_name('other.css')
@@ -0,0 +1,114 @@
+import pytest
+import requests
+
+import app as backend
+import probe
+from probe import CircuitBreaker, CircuitOpenError
+
+CONFIG = {'cse_url': 'cse.example.com', 'port': 8080, 'protocol': 'http', 'ae_name': 'AE',
+          'container_name': 'data', 'origin': 'admin:admin'}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(probe.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def fail():
+    raise ConnectionError('refused')
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            breaker.call('cse:80', fail, ConnectionError)
+    with pytest.raises(CircuitOpenError) as e:
+        breaker.call('cse:80', lambda: pytest.fail('called while open'), ConnectionError)
+    assert e.value.retry_after == pytest.approx(30)
+    assert breaker.snapshot()['cse:80'] == {'state': 'open', 'failures': 3, 'retry_after': 30.0,
+                                            'last_error': 'ConnectionError'}
+    assert breaker.call('other:80', lambda: 'ok', ConnectionError) == 'ok'
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    with pytest.raises(ConnectionError):
+        breaker.call('cse:80', fail, ConnectionError)
+    breaker.call('cse:80', lambda: 'ok', ConnectionError)
+    with pytest.raises(ConnectionError):
+        breaker.call('cse:80', fail, ConnectionError)
+    assert breaker.snapshot()['cse:80']['state'] == 'closed'
+
+
+def test_other_errors_do_not_count(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    with pytest.raises(KeyError):
+        breaker.call('cse:80', lambda: {}['x'], ConnectionError)
+    assert breaker.snapshot()['cse:80']['state'] == 'closed'
+
+
+def test_half_open_trial(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    with pytest.raises(ConnectionError):
+        breaker.call('cse:80', fail, ConnectionError)
+
+    # A failed trial re-opens the breaker for another full timeout
+    clock[0] += 30
+    with pytest.raises(ConnectionError):
+        breaker.call('cse:80', fail, ConnectionError)
+    clock[0] += 29
+    with pytest.raises(CircuitOpenError):
+        breaker.call('cse:80', fail, ConnectionError)
+
+    # Only one trial runs at a time; a successful one closes the breaker
+    clock[0] += 1
+
+    def trial():
+        with pytest.raises(CircuitOpenError):
+            breaker.call('cse:80', lambda: 'concurrent', ConnectionError)
+        return 'ok'
+
+    assert breaker.call('cse:80', trial, ConnectionError) == 'ok'
+    assert breaker.snapshot()['cse:80']['state'] == 'closed'
+    assert breaker.call('cse:80', lambda: 'again', ConnectionError) == 'again'
+
+
+def test_open_breaker_fails_fast_with_503(monkeypatch):
+    calls = []
+
+    def refused(*args, **kwargs):
+        calls.append(1)
+        raise requests.exceptions.ConnectionError('refused')
+
+    monkeypatch.setattr(backend, 'breaker', CircuitBreaker(failure_threshold=2, reset_timeout=30))
+    monkeypatch.setattr(backend.rate_limiter, 'take', lambda keys: None)
+    monkeypatch.setattr(backend.requests, 'get', refused)
+    client = backend.app.test_client()
+
+    for _ in range(2):
+        assert 'circuit' not in client.post('/test-get', json=CONFIG).get_json()
+    response = client.post('/test-get', json=CONFIG)
+    assert response.status_code == 503
+    assert response.get_json()['circuit'] == 'open'
+    assert 1 <= int(response.headers['Retry-After']) <= 30
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize('configured', ['', 'secret'])
+def test_resetting_breakers_requires_the_admin_token(monkeypatch, configured):
+    monkeypatch.setitem(backend.app.config, 'ADMIN_TOKEN', configured)
+    monkeypatch.setattr(backend, 'breaker', CircuitBreaker(failure_threshold=1, reset_timeout=30))
+    with pytest.raises(ConnectionError):
+        backend.breaker.call('cse:80', fail, ConnectionError)
+    client = backend.app.test_client()
+
+    assert client.delete('/admin/breakers').status_code == 403
+    assert client.delete('/admin/breakers', headers={'X-Admin-Token': 'wrong'}).status_code == 403
+    assert backend.breaker.snapshot()['cse:80']['state'] == 'open'
+
+    if configured:
+        response = client.delete('/admin/breakers', headers={'X-Admin-Token': 'secret'})
+        assert response.status_code == 200 and response.get_json()['hosts'] == {}
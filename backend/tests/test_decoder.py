@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from decoder import decode_batch, decode_cons  # noqa: E402
+
+SCHEMA = [('temperature', 'float64'), ('humidity', 'int64'), ('relay', 'bool')]
+
+
+def test_fast_path_decodes_numeric_batch():
+    columns, skipped = decode_cons(['[1700000000, 25.5, 60, 1]', '[1700000001, 26, 61, 0]'], SCHEMA)
+    assert skipped == 0
+    assert columns['epoch'].tolist() == [1700000000, 1700000001]
+    assert columns['temperature'].tolist() == [25.5, 26.0]
+    assert columns['humidity'].dtype == np.int64 and columns['humidity'].tolist() == [60, 61]
+    assert columns['relay'].tolist() == [True, False]
+
+
+def test_non_integral_values_in_int_columns_are_skipped():
+    columns, skipped = decode_cons(['[1, 20.0, 4.7, 1]', '[2, 21.0, 5, 0]', '[3, 22.0, 6, 2]'], SCHEMA)
+    assert skipped == 2
+    assert columns['epoch'].tolist() == [2]
+    assert columns['humidity'].tolist() == [5]
+
+
+@pytest.mark.parametrize('bad', ['[3, 22.0, null, 1]', '[3, null, 7, 1]', '[3, 22.0, 7, null]',
+                                 '[3, "hot", 7, 1]', '[3, 22.0, 7.5, true]', 'not json', '[3, 1]'])
+def test_bad_rows_are_skipped_not_fatal(bad):
+    cons = ['[1, 20.0, 5, true]', bad, '[2, 21.5, 6, false]']
+    columns, skipped = decode_cons(cons, SCHEMA)
+    assert skipped == 1
+    assert columns['epoch'].tolist() == [1, 2]
+    assert columns['humidity'].tolist() == [5, 6]
+    assert columns['relay'].tolist() == [True, False]
+
+
+def test_object_columns_keep_any_value():
+    columns, skipped = decode_cons(['[1, "on"]', '[2, null]'], [('state', 'object')])
+    assert skipped == 0
+    assert columns['state'].tolist() == ['on', None]
+
+
+def test_decode_batch_from_documents():
+    parameters = [{'name': 'temperature', 'type': 'float'}, {'name': 'humidity', 'type': 'int'}]
+    documents = [json.dumps({'m2m:cin': {'con': json.dumps([1700000000 + i, 20.5, i])}}) for i in range(3)]
+    columns, skipped = decode_batch(documents, parameters)
+    assert skipped == 0 and columns['humidity'].tolist() == [0, 1, 2]
@@ -0,0 +1,83 @@
+import pytest
+import requests
+
+import app as backend
+import discovery
+from discovery import DiscoveryCache, DiscoveryError, fetch_discovery_page, prefix_slice
+
+CONFIG = {'cse_url': 'cse.example.com', 'port': 8080, 'protocol': 'http', 'origin': 'admin:admin'}
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.text = body
+
+    def json(self):
+        import json
+        return json.loads(self.text)
+
+
+def fake_get(status_code, body):
+    return lambda *args, **kwargs: FakeResponse(status_code, body)
+
+
+@pytest.mark.parametrize('body', ['<html>proxy error</html>', '["not", "an", "object"]', '42'])
+def test_non_uril_bodies_raise_discovery_error(monkeypatch, body):
+    monkeypatch.setattr(discovery.requests, 'get', fake_get(200, body))
+    with pytest.raises(DiscoveryError):
+        fetch_discovery_page('http://cse/~/in-cse/in-name', 'admin:admin', 2)
+
+
+def test_uril_string_and_list(monkeypatch):
+    monkeypatch.setattr(discovery.requests, 'get', fake_get(200, '{"m2m:uril": "/in-cse/a /in-cse/b"}'))
+    assert fetch_discovery_page('http://cse', '', 2) == ['/in-cse/a', '/in-cse/b']
+    monkeypatch.setattr(discovery.requests, 'get', fake_get(200, '{"m2m:uril": ["/in-cse/c"]}'))
+    assert fetch_discovery_page('http://cse', '', 2) == ['/in-cse/c']
+
+
+@pytest.mark.parametrize('error, status', [
+    (DiscoveryError(200, 'nope', 'not JSON'), 502),
+    (requests.exceptions.ConnectionError('refused'), 503),
+    (requests.exceptions.Timeout('slow'), 408),
+])
+def test_refresh_maps_upstream_errors(monkeypatch, error, status):
+    def fail(*args, **kwargs):
+        raise error
+
+    monkeypatch.setattr(backend, 'fetch_discovery_page', fail)
+    backend.breaker.reset()
+    response = backend.app.test_client().post('/discover', json=dict(CONFIG, refresh=True))
+    backend.breaker.reset()
+    assert response.status_code == status
+    assert 'error' in response.json
+
+
+def test_cache_serves_stale_entries_while_refreshing():
+    cache = DiscoveryCache(ttl=0, max_stale=60)
+    names, meta = cache.get('k', lambda: ['b', 'a'])
+    assert names == ['a', 'b']
+    names, meta = cache.get('k', lambda: ['c'])
+    assert names == ['a', 'b']
+    assert prefix_slice(['a', 'ab', 'b'], 'a') == ['a', 'ab']
+
+
+def test_cache_drops_the_least_recently_used_listing():
+    cache = DiscoveryCache(ttl=60, max_stale=900, max_entries=2)
+    cache.put('a', ['x'])
+    cache.put('b', ['y'])
+    assert cache.get('a', lambda: pytest.fail('reloaded'))[1]['cache'] == 'hit'
+    cache.put('c', ['z'])
+    assert cache.has('a') and cache.has('c') and not cache.has('b')
+
+
+def test_cache_forgets_listings_too_old_to_serve(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(discovery.time, 'monotonic', lambda: now[0])
+    cache = DiscoveryCache(ttl=10, max_stale=60)
+    cache.put('old', ['x'])
+    now[0] += 30
+    cache.put('recent', ['y'])
+    now[0] += 31
+    cache.put('new', ['z'])
+    assert list(cache._entries) == ['recent', 'new']
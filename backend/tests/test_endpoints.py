@@ -0,0 +1,123 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import app as backend
+
+CONFIG = {'cse_url': 'cse.example.com', 'ae_name': 'AE', 'container_name': 'data',
+          'candidates': [{'protocol': 'http', 'port': 8080}]}
+
+
+@pytest.fixture
+def deadlines(monkeypatch):
+    seen = []
+
+    def probe(data, deadline):
+        seen.append(deadline)
+        return {'protocol': data['protocol'], 'port': data['port'], 'success': True,
+                'status_code': 200, 'latency_ms': 1.0, 'error': None}
+
+    monkeypatch.setattr(backend, 'probe_candidate', probe)
+    monkeypatch.setattr(backend.rate_limiter, 'take', lambda keys: None)
+    monkeypatch.setitem(backend.app.config, 'PROBE_DEADLINE', 5.0)
+    return seen
+
+
+@pytest.mark.parametrize('requested, used', [
+    (None, 5.0), (2, 2.0), ('1.5', 1.5), (60, 5.0), (0, 5.0), (-3, backend.MIN_PROBE_DEADLINE),
+    (0.001, backend.MIN_PROBE_DEADLINE),
+])
+def test_deadline_is_clamped(deadlines, requested, used):
+    response = backend.app.test_client().post('/test-endpoints', json=dict(CONFIG, deadline=requested))
+    assert response.status_code == 200
+    assert deadlines == [used]
+
+
+@pytest.mark.parametrize('requested', ['soon', 'nan', 'inf', [1], {'s': 1}])
+def test_bad_deadline_is_rejected(deadlines, requested):
+    response = backend.app.test_client().post('/test-endpoints', json=dict(CONFIG, deadline=requested))
+    assert response.status_code == 400
+    assert 'Deadline' in response.get_json()['error']
+    assert deadlines == []
+
+
+# port: (success, status_code, latency_ms, error); None = never answers
+OUTCOMES = {8080: (True, 200, 30.0, None), 8081: (True, 201, 10.0, None), 8082: (False, 404, 5.0, None),
+            8083: (False, None, None, 'Connection error'), 8084: None}
+
+
+@pytest.fixture
+def outcomes(monkeypatch):
+    release = threading.Event()
+
+    def probe(data, deadline):
+        outcome = OUTCOMES[data['port']]
+        if outcome is None:
+            release.wait(5)
+            outcome = (True, 200, 1.0, None)
+        success, status_code, latency_ms, error = outcome
+        return {'protocol': data['protocol'], 'port': data['port'], 'success': success,
+                'status_code': status_code, 'latency_ms': latency_ms, 'error': error}
+
+    monkeypatch.setattr(backend, 'probe_candidate', probe)
+    monkeypatch.setattr(backend.rate_limiter, 'take', lambda keys: None)
+    yield
+    release.set()
+
+
+def rank(ports):
+    candidates = [{'protocol': 'http', 'port': port} for port in ports]
+    response = backend.app.test_client().post('/test-endpoints', json=dict(CONFIG, candidates=candidates,
+                                                                            deadline=0.2))
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_working_endpoints_rank_first_fastest_first(outcomes):
+    body = rank([8084, 8083, 8082, 8080, 8081])
+    assert [r['port'] for r in body['results']] == [8081, 8080, 8082, 8084, 8083]
+    assert body['best']['port'] == 8081
+    # Answered with an error beats no answer; no answer keeps the request order
+    assert body['results'][3]['error'] == 'Deadline exceeded'
+    assert body['results'][4]['error'] == 'Connection error'
+
+
+def test_no_best_when_nothing_works(outcomes):
+    body = rank([8083, 8082])
+    assert [r['port'] for r in body['results']] == [8082, 8083]
+    assert body['best'] is None
+
+
+@pytest.mark.parametrize('requested, timed', [(True, True), (False, False), ('false', False), ('yes', False),
+                                              (1, False), (None, False)])
+def test_get_probe_times_only_on_a_json_true(monkeypatch, requested, timed):
+    seen = []
+
+    def fetch_latest(data, timing=False, timeout=10):
+        seen.append(timing)
+        return 'http://cse/la', 200, '{}', None, {'total_ms': 1.0} if timing else None
+
+    monkeypatch.setattr(backend, 'fetch_latest', fetch_latest)
+    monkeypatch.setattr(backend.rate_limiter, 'take', lambda keys: None)
+    config = {'cse_url': 'cse.example.com', 'port': 8080, 'protocol': 'http', 'ae_name': 'AE',
+              'container_name': 'data', 'origin': 'admin:admin', 'timing': requested}
+    body = backend.app.test_client().post('/test-get', json=config).get_json()
+    assert seen == [timed]
+    assert ('timing' in body) is timed
+
+
+@pytest.mark.parametrize('requested, enabled', [(True, True), ('false', False), (0, False)])
+def test_post_probe_times_and_verifies_only_on_a_json_true(monkeypatch, requested, enabled):
+    sent = []
+    monkeypatch.setattr(backend.rate_limiter, 'take', lambda keys: None)
+    monkeypatch.setattr(backend.requests, 'post',
+                        lambda url, **kwargs: sent.append('plain') or SimpleNamespace(status_code=201, text='{}'))
+    monkeypatch.setattr(backend, 'timed_request',
+                        lambda *args, **kwargs: sent.append('timed') or (201, '{}', {'total_ms': 1.0}))
+    monkeypatch.setattr(backend, 'verify_ingest', lambda *args: {'verified': True})
+    config = {'cse_url': 'cse.example.com', 'port': 8080, 'protocol': 'http', 'ae_name': 'AE',
+              'container_name': 'data', 'origin': 'admin:admin', 'timing': requested, 'verify_ingest': requested}
+    body = backend.app.test_client().post('/test-post', json=config).get_json()
+    assert sent == ['timed' if enabled else 'plain']
+    assert ('timing' in body) is enabled and ('verify' in body) is enabled
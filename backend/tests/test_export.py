@@ -0,0 +1,173 @@
+import json
+
+import pytest
+
+import app as backend
+import export
+from discovery import DiscoveryError, iter_discovery
+from export import csv_chunks, fetch_cin_page, iter_cins, ndjson_lines
+
+
+def cin(ri, con):
+    return {'ri': ri, 'ct': '20240101T000000', 'con': json.dumps(con)}
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.text = json.dumps(body) if not isinstance(body, str) else body
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def pages_of(cins, size, fail_at=None, calls=None):
+    def fetch_page(offset):
+        if calls is not None:
+            calls.append(offset)
+        if fail_at is not None and offset >= fail_at:
+            raise ConnectionError('CSE went away')
+        return cins[offset:offset + size]
+    return fetch_page
+
+
+def test_iter_discovery_stops_on_repeated_page_and_keeps_only_one_page():
+    calls = []
+
+    def ignores_offset(offset):
+        calls.append(offset)
+        return ['/a', '/b']
+
+    assert list(iter_discovery(ignores_offset, 2)) == [['/a', '/b']]
+    assert calls == [0, 2]
+
+
+def test_iter_discovery_yields_every_page():
+    uris = [f'/cin-{i}' for i in range(7)]
+    assert [u for page in iter_discovery(pages_of(uris, 3), 3) for u in page] == uris
+
+
+def run_export(cins, fail_at=None, max_rows=0, calls=None, prefetch=1):
+    return list(iter_cins(pages_of(cins, 2, fail_at, calls), 2, prefetch=prefetch, max_rows=max_rows))
+
+
+def test_complete_export_ends_with_summary():
+    cins = [cin('c1', [1, 20.5]), 'garbage', cin('c3', [3, 21.0])]
+    rows = run_export(cins)
+    assert rows[-1] == {'summary': True, 'complete': True, 'rows': 2, 'failed': 1, 'error': None}
+
+    lines = [json.loads(line) for line in ndjson_lines(rows, ['temperature'])]
+    assert lines[0] == {'ri': 'c1', 'ct': '20240101T000000', 'epoch': 1, 'temperature': 20.5}
+    assert lines[1] == {'ri': None, 'error': 'Not a contentInstance resource'}
+    assert lines[-1]['export']['complete'] is True
+
+    text = ''.join(csv_chunks(rows, ['temperature']))
+    assert text.splitlines()[0] == 'ri,ct,epoch,temperature,con,error'
+    assert ',,,,,Not a contentInstance resource' in text
+    assert text.endswith('# export complete: 2 rows, 1 failed\n')
+
+
+def test_failed_later_page_marks_export_incomplete():
+    cins = [cin(f'c{i}', [i, i]) for i in range(1, 5)]
+    rows = run_export(cins, fail_at=2)
+    assert [row['ri'] for row in rows[:-1]] == ['c1', 'c2']
+    assert rows[-1]['complete'] is False and 'CSE went away' in rows[-1]['error']
+    assert ''.join(csv_chunks(rows, [])).splitlines()[-1].startswith('# export incomplete: stopped after 2 rows')
+
+
+def test_max_rows():
+    cins = [cin(f'c{i}', [1]) for i in range(5)]
+    rows = run_export(cins, max_rows=3)
+    assert len(rows) == 4 and rows[-1]['rows'] == 3
+
+
+def test_one_request_per_page_with_prefetch():
+    cins = [cin(f'c{i}', [i]) for i in range(1234)]
+    calls = []
+    rows = list(iter_cins(pages_of(cins, 200, calls=calls), 200, prefetch=2))
+    assert [row['ri'] for row in rows[:-1]] == [f'c{i}' for i in range(1234)]
+    # Seven pages, plus at most the two requested ahead of the short last one
+    assert sorted(calls)[:7] == [200 * i for i in range(7)]
+    assert len(calls) == len(set(calls)) <= 9
+
+
+def test_repeated_page_stops_the_export():
+    page = [cin('a', [1]), cin('b', [2])]
+    rows = list(iter_cins(lambda offset: page, 2, prefetch=0))
+    assert [row['ri'] for row in rows[:-1]] == ['a', 'b'] and rows[-1]['complete'] is True
+
+
+def test_fetch_cin_page_reads_children_of_the_container(monkeypatch):
+    seen = {}
+
+    def fake_get(url, params=None, **kwargs):
+        seen.update(params)
+        return FakeResponse(200, {'m2m:cnt': {'cni': 2, 'm2m:cin': [cin('a', [1]), cin('b', [2])]}})
+
+    monkeypatch.setattr(export.requests, 'get', fake_get)
+    assert [c['ri'] for c in fetch_cin_page('http://cse/Data', 'o', offset=400, limit=200,
+                                            filters={'cra': '20240101T000000'})] == ['a', 'b']
+    assert seen == {'rcn': 4, 'ty': 4, 'lim': 200, 'ofst': 400, 'cra': '20240101T000000'}
+
+
+@pytest.mark.parametrize('status, body', [
+    (200, {'m2m:cnt': {'cni': 5}}),   # rcn=4 ignored: attributes only
+    (200, '<html>proxy</html>'),
+    (200, ['a']),
+    (403, {'m2m:dbg': 'denied'}),
+])
+def test_fetch_cin_page_errors(monkeypatch, status, body):
+    monkeypatch.setattr(export.requests, 'get', lambda *args, **kwargs: FakeResponse(status, body))
+    with pytest.raises(DiscoveryError):
+        fetch_cin_page('http://cse/Data', 'o')
+
+
+def test_fetch_cin_page_empty_container(monkeypatch):
+    monkeypatch.setattr(export.requests, 'get', lambda *args, **kwargs: FakeResponse(200, {'m2m:cnt': {'cni': 0}}))
+    assert fetch_cin_page('http://cse/Data', 'o') == []
+
+
+def test_export_route_makes_one_request_per_page(monkeypatch):
+    cins = [cin(f'c{i}', [i, i / 10]) for i in range(1234)]
+    calls = []
+
+    def fake_get(url, params=None, **kwargs):
+        calls.append(params.get('ofst', 0))
+        offset = params.get('ofst', 0)
+        return FakeResponse(200, {'m2m:cnt': {'cni': len(cins), 'm2m:cin': cins[offset:offset + params['lim']]}})
+
+    monkeypatch.setattr(export.requests, 'get', fake_get)
+    monkeypatch.setitem(backend.app.config, 'EXPORT_PAGE_SIZE', 200)
+    response = backend.app.test_client().post('/export', json={
+        'cse_url': 'cse.example.com', 'port': 8080, 'protocol': 'http', 'ae_name': 'AE',
+        'container_name': 'data', 'origin': 'admin:admin', 'format': 'csv',
+        'parameters': [{'name': 'n'}, {'name': 'x'}]})
+    lines = response.get_data(as_text=True).splitlines()
+    assert response.status_code == 200
+    assert len(lines) == 1 + 1234 + 1 and lines[-1] == '# export complete: 1234 rows, 0 failed'
+    assert len(calls) <= 7 + backend.app.config['EXPORT_PREFETCH']
+
+
+@pytest.mark.parametrize('field, value', [
+    ('created_after', 20240101), ('created_before', ['2024-01-01']), ('created_after', 'yesterday'),
+    ('max_rows', [5]), ('max_rows', {'n': 1}), ('max_rows', 'many'),
+])
+def test_export_rejects_bad_filters(field, value):
+    response = backend.app.test_client().post('/export', json={
+        'cse_url': 'cse.example.com', 'port': 8080, 'protocol': 'http', 'ae_name': 'AE',
+        'container_name': 'data', 'origin': 'admin:admin', field: value})
+    assert response.status_code == 400
+    assert response.get_json()['error']
+
+
+def test_csv_rows_wider_than_the_header_keep_every_value():
+    rows = [{'ri': 'a', 'ct': 't', 'epoch': 1, 'values': [10], 'con': None},
+            {'ri': 'b', 'ct': 't', 'epoch': 2, 'values': [20, 21], 'con': None},
+            {'ri': 'c', 'ct': 't', 'epoch': 3, 'values': [30, 31, 32, 33], 'con': None},
+            {'ri': 'd', 'ct': 't', 'epoch': 4, 'values': [], 'con': None},
+            {'summary': True, 'complete': True, 'rows': 4, 'failed': 0, 'error': None}]
+    lines = ''.join(csv_chunks(rows, ['temperature'], batch=2)).splitlines()
+    assert lines[0] == 'ri,ct,epoch,temperature,value_2,con,error'
+    assert lines[1:3] == ['a,t,1,10,,,', 'b,t,2,20,21,,']
+    assert lines[3] == 'c,t,3,30,31,"[3, 30, 31, 32, 33]",4 values for 2 value columns; full array in con'
+    assert lines[4] == 'd,t,4,,,,'
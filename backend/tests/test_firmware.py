@@ -0,0 +1,167 @@
+import pytest
+
+from controllers import generate_arduino_code, generate_esp32_code, generate_esp8266_code
+from controllers.esp32 import _freertos_layout
+from controllers.utils import normalize_schedule
+
+BASE = {'cse_url': 'cse.example.com', 'port': 8080, 'protocol': 'http', 'ae_name': 'AE',
+        'container_name': 'data', 'origin': 'admin:admin', 'wifi_ssid': 'ssid', 'wifi_password': 'secret',
+        'parameters': [{'name': 'temperature', 'type': 'float', 'default': '21.5'}]}
+
+SKETCHES = [generate_arduino_code, generate_esp32_code, generate_esp8266_code]
+
+
+# ---------- Schedule ----------
+
+@pytest.mark.parametrize('generate', SKETCHES)
+def test_schedule_constants_and_backoff(generate):
+    code = generate(dict(BASE, schedule={'interval': 30, 'phase': 7, 'start_jitter': 5,
+                                         'backoff_base': 1, 'backoff_max': 60}))
+    for line in ['const unsigned long INTERVAL_MS     = 30000UL;',
+                 'const unsigned long START_JITTER_MS = 5000UL;',
+                 'const unsigned long BACKOFF_BASE_MS = 1000UL;',
+                 'const unsigned long BACKOFF_MAX_MS  = 60000UL;',
+                 'const long          PHASE_MS        = 7000;']:
+        assert line in code
+    assert 'unsigned long backoffMs(unsigned int attempt)' in code
+    assert 'return random(cap + 1);' in code
+    assert 'failures = 0;\n    return msUntilNextSlot();' in code
+    assert 'initSchedule();' in code
+
+
+@pytest.mark.parametrize('generate', SKETCHES)
+def test_phase_defaults_to_the_mac_hash(generate):
+    code = generate(BASE)
+    assert 'const long          PHASE_MS        = -1;' in code
+    assert 'h % INTERVAL_MS' in code and 'uint32_t macHash()' in code
+
+
+# ---------- Combined POST + GET ----------
+
+def loop_body(code):
+    start = code.index('void loop() {')
+    return code[start:code.index('\n}\n', start)]
+
+
+@pytest.mark.parametrize('generate', SKETCHES)
+def test_combined_sketch_runs_a_cooperative_scheduler(generate):
+    code = generate(dict(BASE, operation='BOTH', sample_interval=0.5, poll_interval=2, http_timeout=4))
+    assert 'const unsigned long SAMPLE_MS     = 500UL;' in code
+    assert 'const unsigned long POLL_MS       = 2000UL;' in code
+    assert 'HTTP_TIMEOUT_MS = 4000;' in code
+    for function in ['bool postOneM2MData()', 'bool getOneM2MData()', 'void handleCommand(const char* con)',
+                     'bool maintainWiFi(unsigned long now)', 'startTasks();']:
+        assert function in code
+    loop = loop_body(code)
+    # Nothing in loop() blocks, and a pass makes at most one request
+    assert 'delay(' not in loop
+    assert '} else if (due(now, nextPollAt)) {' in loop
+    assert 'backoffMs(postFailures)' in loop and 'backoffMs(pollFailures)' in loop
+
+
+@pytest.mark.parametrize('generate', SKETCHES)
+def test_combined_sketch_ignores_bad_intervals(generate):
+    code = generate(dict(BASE, operation='BOTH', sample_interval='x', poll_interval=-1, http_timeout=0))
+    assert 'SAMPLE_MS     = 1000UL;' in code and 'POLL_MS       = 5000UL;' in code
+    assert 'HTTP_TIMEOUT_MS = 3000;' in code
+
+
+# ---------- ESP32 FreeRTOS pipeline ----------
+
+PARAMETERS = [{'name': 'temperature', 'type': 'float', 'default': '21.5'},
+              {'name': 'door', 'type': 'bool', 'default': 'yes'},
+              {'name': 'label', 'type': 'string'}]
+
+
+def test_freertos_layout_is_sized_from_the_parameters():
+    layout = _freertos_layout(PARAMETERS, normalize_schedule({}), {})
+    assert layout['fields'] == [('temperature', 'float', '21.5'), ('door', 'bool', 'true'), ('label', 'string', '')]
+    # epoch + float + bool + char[32], padded to 4 bytes
+    assert layout['reading_bytes'] == 44
+    # One slot holds ten one-second samples; the queue rides out four missed slots
+    assert (layout['sample_ms'], layout['batch_size'], layout['queue_depth']) == (1000, 10, 40)
+    assert (layout['sample_stack'], layout['network_stack'], layout['json_capacity']) == (3072, 8192, 512)
+
+
+def test_freertos_queue_always_holds_a_batch():
+    layout = _freertos_layout(PARAMETERS, normalize_schedule({}), {'batch_size': 25, 'queue_depth': 5,
+                                                                   'sample_interval': 'x'})
+    assert (layout['sample_ms'], layout['batch_size'], layout['queue_depth']) == (1000, 25, 25)
+
+
+def test_freertos_sketch_splits_sampling_and_network_tasks():
+    code = generate_esp32_code(dict(BASE, operation='POST', parameters=PARAMETERS,
+                                    freertos={'enabled': True, 'sample_interval': 0.5, 'batch_size': 4}))
+    assert 'const uint32_t    SAMPLE_MS     = 500;' in code
+    assert 'const size_t      BATCH_SIZE    = 4;' in code
+    assert ('struct Reading {\n    uint32_t epoch;\n    float temperature;\n    bool door;\n'
+            '    char label[32];\n};') in code
+    assert 'readings = xQueueCreate(QUEUE_DEPTH, sizeof(Reading));' in code
+    assert ('xTaskCreatePinnedToCore(samplingTask, "sampling", SAMPLE_STACK, NULL, 2, &samplingHandle, '
+            'SAMPLE_CORE);') in code
+    assert 'xTaskCreatePinnedToCore(networkTask, "network", NETWORK_STACK, NULL, 1, NULL, NETWORK_CORE);' in code
+    # A full queue drops the oldest reading, and the drops are reported
+    assert 'xQueueReceive(readings, &oldest, 0);' in code and 'droppedReadings++;' in code
+    assert 'uxTaskGetStackHighWaterMark(samplingHandle)' in code
+    assert 'vTaskDelayUntil(&lastWake, pdMS_TO_TICKS(SAMPLE_MS));' in code
+
+
+# ---------- ESP8266 TLS ----------
+
+HTTPS = dict(BASE, protocol='https', port=8443)
+PEM = '-----BEGIN CERTIFICATE-----\nMIIB\n-----END CERTIFICATE-----'
+
+
+@pytest.mark.parametrize('operation', ['POST', 'GET', 'BOTH'])
+def test_esp8266_https_shrinks_buffers_and_resumes_sessions(operation):
+    code = generate_esp8266_code(dict(HTTPS, operation=operation))
+    assert 'WiFiClientSecure wifiClient;' in code
+    assert 'const char* tlsHost = "cse.example.com";\nconst uint16_t tlsPort = 8443;' in code
+    assert 'wifiClient.probeMaxFragmentLength(tlsHost, tlsPort, size)' in code
+    assert 'wifiClient.setBufferSizes(rx, 512);' in code
+    assert 'wifiClient.setSession(&tlsSession);' in code
+    assert 'heapReport("TLS connected");' in code
+    assert code.count('configureTls()') == 2  # defined and called from setup()
+
+
+@pytest.mark.parametrize('tls, present, absent', [
+    ({}, ['wifiClient.setInsecure();'], 'setFingerprint'),
+    ({'fingerprint': ' AB:CD '},
+     ['const char* tlsFingerprint = "AB:CD";', 'wifiClient.setFingerprint(tlsFingerprint);'], 'setInsecure'),
+    # A trust anchor wins over a fingerprint
+    ({'fingerprint': 'AB:CD', 'trust_anchor': PEM},
+     ['BearSSL::X509List trustAnchors(R"PEM(\n' + PEM + '\n)PEM");', 'wifiClient.setTrustAnchors(&trustAnchors);'],
+     'setFingerprint'),
+])
+def test_esp8266_server_authentication(tls, present, absent):
+    code = generate_esp8266_code(dict(HTTPS, tls=tls))
+    assert all(line in code for line in present)
+    assert absent not in code
+
+
+def test_esp8266_http_skips_tls():
+    code = generate_esp8266_code(BASE)
+    assert 'WiFiClient wifiClient;' in code
+    assert 'configureTls' not in code and 'BearSSL' not in code
+
+
+# ---------- Retrieval ----------
+
+@pytest.mark.parametrize('generate', SKETCHES)
+@pytest.mark.parametrize('operation', ['GET', 'BOTH'])
+def test_polls_ask_for_attributes_and_newer_instances(generate, operation):
+    code = generate(dict(BASE, operation=operation))
+    assert 'const char* RETRIEVE_ATTRS = "con+ct+ri";' in code
+    assert 'const bool CONDITIONAL_GET = true;' in code
+    assert 'pollQuery()' in code.split('String pollQuery() {', 1)[1]
+    assert '== 204 ||' in code
+    assert 'rememberCin(doc["m2m:cin"]["ri"], doc["m2m:cin"]["ct"])' in code
+
+
+@pytest.mark.parametrize('generate', SKETCHES)
+def test_retrieval_options_reach_the_sketch(generate):
+    code = generate(dict(BASE, operation='GET', retrieval={'attributes': 'lbl', 'conditional': False}))
+    assert 'const char* RETRIEVE_ATTRS = "lbl+con+ct";' in code
+    assert 'const bool CONDITIONAL_GET = false;' in code
+    code = generate(dict(BASE, operation='GET', retrieval={'attributes': []}))
+    assert 'const char* RETRIEVE_ATTRS = "";' in code
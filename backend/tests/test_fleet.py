@@ -0,0 +1,73 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import fleet
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_fleet_does_not_import_the_flask_app():
+    code = 'import sys, fleet; print("app" in sys.modules, "flask" in sys.modules)'
+    result = subprocess.run([sys.executable, '-c', code], cwd=BACKEND, capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ['False', 'False']
+
+
+def test_numeric_password_generates(tmp_path):
+    manifest = tmp_path / 'fleet.csv'
+    manifest.write_text('name,controller,cse_url,port,ae_name,container_name,wifi_ssid,wifi_password\n'
+                        'node-01,esp32,cse.example.com,8080,AE,data,lab,12345678\n')
+    result = fleet.build(str(manifest), str(tmp_path / 'out'), jobs=1, log=lambda *a, **k: None)
+    assert result == {'generated': ['node-01'], 'unchanged': [], 'failed': []}
+    sketch = tmp_path / 'out' / 'node-01' / 'node-01.ino'
+    assert '12345678' in sketch.read_text()
+
+
+FLEET = ('name,controller,cse_url,port,ae_name,container_name,wifi_ssid,wifi_password\n'
+         'node-01,esp32,cse.example.com,8080,AE,data,lab,secret01\n'
+         'node-02,esp32,cse.example.com,8080,AE,data,lab,secret02\n'
+         'node-03,esp8266,cse.example.com,8080,AE,data,lab,secret03\n'
+         'gateway,python,cse.example.com,8080,AE,data,,\n')
+
+
+def build_fleet(tmp_path, text=FLEET):
+    manifest = tmp_path / 'fleet.csv'
+    manifest.write_text(text)
+    return fleet.build(str(manifest), str(tmp_path / 'out'), jobs=1, log=lambda *a, **k: None)
+
+
+def test_rebuild_skips_unchanged_targets(tmp_path):
+    assert sorted(build_fleet(tmp_path)['generated']) == ['gateway', 'node-01', 'node-02', 'node-03']
+    assert build_fleet(tmp_path) == {'generated': [], 'unchanged': ['node-01', 'node-02', 'node-03', 'gateway'],
+                                     'failed': []}
+    result = fleet.build(str(tmp_path / 'fleet.csv'), str(tmp_path / 'out'), jobs=1, force=True,
+                         log=lambda *a, **k: None)
+    assert len(result['generated']) == 4
+
+
+def test_rebuild_regenerates_changed_configs_and_outputs(tmp_path):
+    build_fleet(tmp_path)
+    assert build_fleet(tmp_path, FLEET.replace('secret02', 'secret22'))['generated'] == ['node-02']
+
+    sketch = tmp_path / 'out' / 'node-03' / 'node-03.ino'
+    sketch.write_text('// edited by hand\n')
+    assert build_fleet(tmp_path, FLEET.replace('secret02', 'secret22'))['generated'] == ['node-03']
+    assert 'secret03' in sketch.read_text()
+
+
+def test_rebuild_follows_generator_sources(tmp_path, monkeypatch):
+    controllers = tmp_path / 'controllers'
+    shutil.copytree(fleet.CONTROLLERS_DIR, controllers, ignore=shutil.ignore_patterns('__pycache__'))
+    monkeypatch.setattr(fleet, 'CONTROLLERS_DIR', str(controllers))
+    build_fleet(tmp_path)
+
+    with open(controllers / 'esp32.py', 'a') as f:
+        f.write('\n# touched\n')
+    assert sorted(build_fleet(tmp_path)['generated']) == ['node-01', 'node-02']
+
+    # utils.py is a source of every generator
+    with open(controllers / 'utils.py', 'a') as f:
+        f.write('\n# touched\n')
+    assert len(build_fleet(tmp_path)['generated']) == 4
+    assert build_fleet(tmp_path)['generated'] == []
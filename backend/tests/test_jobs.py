@@ -0,0 +1,105 @@
+import json
+import shutil
+import threading
+import zipfile
+
+import pytest
+
+from jobs import CANCELLED, DONE, FAILED, FINISHED, JobError, JobQueue
+from manifest import name_targets
+
+
+def render(config):
+    if config.get('boom') == 'value':
+        raise ValueError('bad config')
+    if config.get('boom') == 'bug':
+        raise AttributeError("'int' object has no attribute 'strip'")
+    return f"// {config['name']}\n", 'onem2m_client.ino'
+
+
+def wait_finished(queue, job_id):
+    for snap in queue.watch(job_id, timeout=5):
+        if snap is not None and snap['state'] in FINISHED:
+            return snap
+    raise AssertionError('job never finished')
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(render, str(tmp_path), workers=2, progress_every=1)
+
+
+def test_generator_errors_fail_only_their_target(queue):
+    targets = [{'name': 'a'}, {'name': 'b', 'boom': 'bug'}, {'name': 'c', 'boom': 'value'}, {'name': 'd'}]
+    snap = wait_finished(queue, queue.submit(targets)['id'])
+    assert snap['state'] == DONE
+    assert (snap['generated'], snap['failed']) == (2, 2)
+    assert snap['errors']['b'].startswith('AttributeError')
+    with zipfile.ZipFile(queue.artifact(snap['id'])) as archive:
+        assert sorted(archive.namelist()) == ['a/a.ino', 'd/d.ino', 'fleet-report.json']
+        report = json.loads(archive.read('fleet-report.json'))
+    assert set(report['failed']) == {'b', 'c'}
+
+
+def test_archive_errors_fail_the_job(tmp_path):
+    def remove_job_dirs(config):
+        for job_dir in tmp_path.iterdir():
+            shutil.rmtree(job_dir)
+        return 'x', 'onem2m_client.py'
+
+    queue = JobQueue(remove_job_dirs, str(tmp_path), workers=1)
+    snap = wait_finished(queue, queue.submit([{'name': 'a'}])['id'])
+    assert snap['state'] == FAILED
+    assert snap['error']
+
+
+def test_cancel_keeps_generated_targets(tmp_path):
+    started, release = threading.Event(), threading.Event()
+
+    def slow(config):
+        started.set()
+        release.wait(5)
+        return 'x', 'onem2m_client.py'
+
+    queue = JobQueue(slow, str(tmp_path), workers=1, progress_every=1)
+    job_id = queue.submit([{'name': f'n{i}'} for i in range(50)])['id']
+    assert started.wait(5)
+    queue.cancel(job_id)
+    release.set()
+    snap = wait_finished(queue, job_id)
+    assert snap['state'] == CANCELLED
+    assert 1 <= snap['generated'] < 50
+    with zipfile.ZipFile(queue.artifact(job_id)) as archive:
+        assert json.loads(archive.read('fleet-report.json'))['cancelled'] is True
+
+
+def test_queued_job_cancelled_before_it_starts(tmp_path):
+    release = threading.Event()
+
+    def blocked(config):
+        release.wait(5)
+        return 'x', 'onem2m_client.py'
+
+    queue = JobQueue(blocked, str(tmp_path), workers=1)
+    first = queue.submit([{'name': 'a'}])['id']
+    second = queue.submit([{'name': 'b'}])['id']
+    assert queue.cancel(second)['state'] == CANCELLED
+    release.set()
+    assert wait_finished(queue, first)['state'] == DONE
+    with pytest.raises(JobError):
+        queue.artifact(second)
+
+
+def test_max_jobs_evicts_finished_then_refuses(tmp_path):
+    queue = JobQueue(render, str(tmp_path), workers=1, max_jobs=1)
+    first = queue.submit([{'name': 'a'}])['id']
+    wait_finished(queue, first)
+    queue.submit([{'name': 'b'}])
+    with pytest.raises(JobError):
+        queue.get(first)
+
+
+@pytest.mark.parametrize('name', ['.', '..', '...'])
+def test_dot_names_are_rejected(name):
+    with pytest.raises(ValueError, match='Invalid target name'):
+        name_targets([{'name': name}])
@@ -0,0 +1,32 @@
+import pytest
+
+from manifest import parse_manifest
+
+
+def test_csv_converts_only_known_numeric_and_boolean_keys():
+    text = ('name,controller,cse_url,port,wifi_ssid,wifi_password,ae_name,schedule.interval,metrics.enabled\n'
+            'node-01,esp32,cse.local,8080,1234,12345678,007,2.5,true\n')
+    [target] = parse_manifest(text, 'csv')
+    assert target['port'] == 8080
+    assert target['schedule'] == {'interval': 2.5}
+    assert target['metrics'] == {'enabled': True}
+    assert target['wifi_ssid'] == '1234'
+    assert target['wifi_password'] == '12345678'
+    assert target['ae_name'] == '007'
+
+
+def test_csv_keeps_json_looking_passwords_as_strings():
+    text = 'name,controller,wifi_password,parameters\nn1,esp32,{secret,"[{""name"": ""t""}]"\n'
+    [target] = parse_manifest(text, 'csv')
+    assert target['wifi_password'] == '{secret'
+    assert target['parameters'] == [{'name': 't'}]
+
+
+def test_json_numbers_in_string_fields_become_strings():
+    [target] = parse_manifest('[{"name": "n1", "controller": "esp32", "wifi_password": 12345678}]', 'json')
+    assert target['wifi_password'] == '12345678'
+
+
+def test_duplicate_names_are_rejected():
+    with pytest.raises(ValueError, match='Duplicate'):
+        parse_manifest('[{"name": "a"}, {"name": "a"}]', 'json')
@@ -0,0 +1,87 @@
+import threading
+import time
+
+from preview import PreviewHub, line_diff
+
+SKETCH = ['#include <WiFi.h>', '// ---------- WiFi ----------', 'ssid = "a";', 'connect();',
+          '// ---------- Loop ----------', 'post();', 'delay(1000);']
+
+
+def apply_ops(old_lines, ops):
+    lines, at = [], 0
+    for op, arg in ops:
+        if op == 'k':
+            lines += old_lines[at:at + arg]
+            at += arg
+        elif op == 'd':
+            at += arg
+        else:
+            lines += arg
+    return lines + old_lines[at:]
+
+
+def test_line_diff_round_trip_and_sections():
+    new = list(SKETCH)
+    new[2] = 'ssid = "b";'
+    del new[6]
+    ops, sections = line_diff(SKETCH, new)
+    assert apply_ops(SKETCH, ops) == new
+    assert sections == ['WiFi', 'Loop']
+    assert line_diff(SKETCH, SKETCH) == ([], [])
+
+
+def render(config):
+    if config.get('fail'):
+        raise ValueError('bad config')
+    lines = list(SKETCH)
+    lines[2] = f'ssid = "{config["ssid"]}";'
+    return '\n'.join(lines), 'sketch.ino'
+
+
+def test_burst_of_edits_renders_once():
+    renders = []
+    hub = PreviewHub(lambda config: renders.append(config) or render(config), debounce=0.25, keepalive=5)
+    stream = hub.stream('s1')
+
+    def type_ssid():
+        for i in range(5):
+            hub.submit('s1', {'ssid': f'net{i}'})
+            time.sleep(0.02)
+
+    typist = threading.Thread(target=type_ssid)
+    started = time.monotonic()
+    typist.start()
+    event = next(stream)
+    typist.join()
+
+    assert event['type'] == 'full' and event['seq'] == 5 and event['version'] == 1
+    assert 'ssid = "net4";' in event['code']
+    assert renders == [{'ssid': 'net4'}]
+    # Not before the last edit has been quiet for the debounce period
+    assert time.monotonic() - started >= 0.08 + 0.25
+
+
+def test_later_events_are_diffs_unchanged_or_invalid():
+    hub = PreviewHub(render, debounce=0, keepalive=0.05)
+    stream = hub.stream('s1')
+    assert next(stream) is None  # keepalive while idle
+
+    hub.submit('s1', {'ssid': 'a'})
+    first = next(stream)
+    hub.submit('s1', {'ssid': 'b'})
+    diff = next(stream)
+    assert diff['type'] == 'diff' and diff['version'] == 2 and diff['sections'] == ['WiFi']
+    assert apply_ops(first['code'].split('\n'), diff['ops']) == render({'ssid': 'b'})[0].split('\n')
+
+    hub.submit('s1', {'ssid': 'b', 'unused': True})
+    assert next(stream) == {'type': 'unchanged', 'seq': 3, 'version': 2}
+    hub.submit('s1', {'fail': True})
+    assert next(stream) == {'type': 'invalid', 'seq': 4, 'error': 'bad config'}
+
+
+def test_sessions_are_independent():
+    hub = PreviewHub(render, debounce=0, keepalive=0.05)
+    one, two = hub.stream('one'), hub.stream('two')
+    hub.submit('one', {'ssid': 'a'})
+    assert next(one)['seq'] == 1
+    assert next(two) is None
@@ -0,0 +1,160 @@
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import probe
+from probe import ProbeCache, timed_request, verify_ingest
+
+
+def test_concurrent_callers_share_one_call():
+    cache = ProbeCache(ttl=60)
+    release = threading.Event()
+    calls = []
+
+    def upstream():
+        calls.append(1)
+        release.wait(5)
+        return 'body'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.fetch('k', upstream)))
+               for _ in range(5)]
+    for t in threads:
+        t.start()
+    while cache.coalesced < 4:
+        time.sleep(0.005)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert [result for result, _ in results] == ['body'] * 5
+    assert sorted(meta['status'] for _, meta in results) == ['coalesced'] * 4 + ['miss']
+    assert cache.fetch('k', upstream)[1]['status'] == 'hit'
+    assert len(calls) == 1
+
+
+def test_results_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(probe.time, 'monotonic', lambda: now[0])
+    cache = ProbeCache(ttl=3)
+    assert cache.fetch('k', lambda: 1) == (1, cache._meta('miss', 0.0))
+    now[0] += 2
+    result, meta = cache.fetch('k', lambda: 2)
+    assert (result, meta['status'], meta['age']) == (1, 'hit', 2.0)
+    now[0] += 1
+    assert cache.fetch('k', lambda: 3)[0] == 3
+
+
+def test_failures_reach_waiters_but_are_not_cached():
+    cache = ProbeCache(ttl=60)
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise ConnectionError('down')
+
+    errors = []
+
+    def call():
+        try:
+            cache.fetch('k', failing)
+        except ConnectionError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for t in threads:
+        t.start()
+    while cache.coalesced < 2:
+        time.sleep(0.005)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(errors) == 3
+    assert cache.fetch('k', lambda: 'up')[0] == 'up'
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self._body = body
+
+    def json(self):
+        if isinstance(self._body, Exception):
+            raise self._body
+        return self._body
+
+
+@pytest.fixture
+def readback(monkeypatch):
+    bodies = []
+    monkeypatch.setattr(probe.requests, 'get', lambda url, **kwargs: bodies.pop(0))
+    return bodies
+
+
+def test_verify_ingest_polls_until_the_cin_matches(readback):
+    readback.extend([FakeResponse(404, None), FakeResponse(200, {'m2m:cin': {'con': 'old'}}),
+                     FakeResponse(200, {'m2m:cin': {'con': 'new'}})])
+    result = verify_ingest('http://cse/la', {}, 'new', time.perf_counter(), deadline=5, interval=0)
+    assert result['verified'] and result['attempts'] == 3 and result['error'] is None
+
+
+@pytest.mark.parametrize('body', [['m2m:cin'], 'text', None, {'m2m:cin': 'new'}, {'m2m:cin': None},
+                                  ValueError('not JSON')])
+def test_verify_ingest_reports_unexpected_bodies(readback, body):
+    readback.extend([FakeResponse(200, body)])
+    result = verify_ingest('http://cse/la', {}, 'new', time.perf_counter(), deadline=0.01, interval=0.05)
+    assert result['verified'] is False and result['attempts'] == 1
+    assert result['error']
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    """Answers after 50 ms with the request body echoed back"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        time.sleep(0.05)
+        self.send_response(201)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), SlowHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_timed_request_measures_each_phase(server):
+    status, text, timing = timed_request('POST', server + '/cse?rcn=1', {'Content-Type': 'application/json'},
+                                         body='{"m2m:cin": {"con": "é"}}'.encode())
+    assert (status, text) == (201, '{"m2m:cin": {"con": "é"}}')
+    phases = ['dns_ms', 'connect_ms', 'tls_ms', 'ttfb_ms', 'download_ms']
+    assert list(timing) == phases + ['total_ms']
+    assert all(timing[phase] >= 0 for phase in phases)
+    assert timing['tls_ms'] < 5  # plain http has no handshake
+    assert timing['ttfb_ms'] >= 45  # the server's 50 ms wait
+    # Phases are consecutive, so they add up to the total (give or take rounding)
+    assert sum(timing[phase] for phase in phases) == pytest.approx(timing['total_ms'], abs=0.05)
+    assert max(timing[phase] for phase in phases) <= timing['total_ms']
+
+
+def test_timed_request_raises_requests_errors():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    with pytest.raises(requests.exceptions.ConnectionError):
+        timed_request('GET', f'http://127.0.0.1:{port}/', {}, timeout=2)
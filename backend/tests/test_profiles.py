@@ -0,0 +1,72 @@
+import pytest
+
+from profiles import ProfileError, ProfileStore, deep_merge
+
+
+def config(ae, controller='esp32', cse_url='cse.example.com', port=8080, labels=()):
+    return {'controller': controller, 'cse_url': cse_url, 'port': port, 'ae_name': ae,
+            'container_name': 'data', 'labels': list(labels), 'schedule': {'mode': 'interval', 'seconds': 60}}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ProfileStore(str(tmp_path / 'profiles.db'))
+    for i in range(7):
+        store.create(f'dev-{i:02d}', config(f'AE{i}', controller='esp32' if i % 2 else 'python',
+                                           labels=['lab'] if i < 3 else []))
+    return store
+
+
+def test_keyset_pages_cover_every_profile_once(store):
+    names, after = [], None
+    while True:
+        page, after = store.search(after=after, limit=3)
+        names += [p['name'] for p in page]
+        if after is None:
+            break
+    assert names == [f'dev-{i:02d}' for i in range(7)]
+    assert 'config' not in page[0]
+
+
+def test_prefix_filters_and_labels(store):
+    store.create('gateway', config('GW1', cse_url='other.example.com'))
+    assert [p['name'] for p in store.search(prefix='dev-0')[0]] == [f'dev-{i:02d}' for i in range(7)]
+    assert [p['ae_name'] for p in store.search(prefix='GW', field='ae_name')[0]] == ['GW1']
+    assert len(store.search(filters={'controller': 'esp32', 'cse_url': 'cse.example.com'})[0]) == 3
+    assert [p['name'] for p in store.search(label='lab')[0]] == ['dev-00', 'dev-01', 'dev-02']
+    assert [name for _, name, _ in store.by_host('other.example.com', 8080)] == ['gateway']
+    with pytest.raises(ProfileError):
+        store.search(field='config')
+    with pytest.raises(ProfileError):
+        store.search(filters={'config': 'x'})
+
+
+def test_update_clone_and_delete(store):
+    profile = store.search(prefix='dev-00')[0][0]
+    updated = store.update(profile['id'], config('AE0', labels=['field']), name='renamed')
+    assert updated['name'] == 'renamed' and updated['config']['labels'] == ['field']
+    assert store.search(label='lab')[0][0]['name'] == 'dev-01'
+
+    clone = store.clone(profile['id'], 'copy', {'schedule': {'seconds': 5}, 'port': 9090})
+    assert clone['port'] == 9090
+    assert clone['config']['schedule'] == {'mode': 'interval', 'seconds': 5}
+
+    store.delete(profile['id'])
+    with pytest.raises(ProfileError) as e:
+        store.get(profile['id'])
+    assert e.value.status == 404
+    assert store.count() == 7
+
+
+def test_duplicate_names_conflict(store):
+    with pytest.raises(ProfileError) as e:
+        store.create('dev-01', config('X'))
+    assert e.value.status == 409
+    with pytest.raises(ProfileError) as e:
+        store.update(store.search(prefix='dev-02')[0][0]['id'], config('X'), name='dev-01')
+    assert e.value.status == 409
+
+
+def test_deep_merge_keeps_unrelated_keys():
+    assert deep_merge({'a': {'b': 1, 'c': 2}, 'd': 3}, {'a': {'b': 9}, 'e': 4}) == \
+        {'a': {'b': 9, 'c': 2}, 'd': 3, 'e': 4}
@@ -0,0 +1,49 @@
+import pytest
+
+import app as backend
+from profiling import RequestProfiler
+
+CONFIG = {'controller': 'python', 'cse_url': 'cse.example.com', 'port': 8080, 'protocol': 'http',
+          'ae_name': 'AE', 'container_name': 'data'}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setitem(backend.app.config, 'PROFILE_SAMPLE_RATE', 0)
+    backend.profiler.clear()
+    return backend.app.test_client()
+
+
+def test_profiling_is_refused_without_a_configured_token(client, monkeypatch):
+    monkeypatch.setitem(backend.app.config, 'ADMIN_TOKEN', '')
+    response = client.post('/generate', json=CONFIG, headers={'X-Profile': '1'})
+    assert response.status_code == 200
+    assert 'X-Profile-Id' not in response.headers
+    assert client.get('/admin/profiles').status_code == 403
+    assert client.get('/admin/profiles/1').status_code == 403
+
+
+def test_profiling_with_token(client, monkeypatch):
+    monkeypatch.setitem(backend.app.config, 'ADMIN_TOKEN', 'secret')
+    assert 'X-Profile-Id' not in client.post('/generate', json=CONFIG, headers={'X-Profile': '1'}).headers
+
+    response = client.post('/generate', json=CONFIG, headers={'X-Profile': '1', 'X-Admin-Token': 'secret'})
+    profile_id = response.headers['X-Profile-Id']
+    assert 'validate_request_config;dur=' in response.headers['Server-Timing']
+    assert client.get('/admin/profiles').status_code == 403
+    profile = client.get(f'/admin/profiles/{profile_id}', headers={'X-Admin-Token': 'secret'}).json
+    assert [span['name'] for span in profile['spans']] == ['validate_request_config', 'generate_python_code']
+
+
+def test_profiler_stops_tracemalloc_it_started():
+    import tracemalloc
+    profiler = RequestProfiler()
+    with profiler.span('noop'):
+        pass
+    profiler.start('test')
+    with profiler.span('work'):
+        [object() for _ in range(1000)]
+    profile = profiler.finish()
+    assert not tracemalloc.is_tracing()
+    assert [span['name'] for span in profile.spans] == ['work']
+    assert profiler.finish() is None
@@ -0,0 +1,241 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from controllers import generate_python_code
+from controllers.utils import normalize_retrieval, normalize_schedule
+
+BASE = {'cse_url': 'cse.example.com', 'port': 8080, 'protocol': 'http', 'ae_name': 'AE',
+        'container_name': 'data', 'origin': 'admin:admin',
+        'parameters': [{'name': 'temperature', 'type': 'float', 'default': '21.5'},
+                       {'name': 'door', 'type': 'bool', 'default': 'true'}]}
+
+
+def load_client(code):
+    """Compile a generated client and run its top level (main() is not started)."""
+    namespace = {'__name__': 'generated_client'}
+    exec(compile(code, 'client.py', 'exec'), namespace)
+    return namespace
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self._body = body
+
+    def json(self):
+        if isinstance(self._body, Exception):
+            raise self._body
+        return self._body
+
+
+# ---------- Dashboard ----------
+
+DASHBOARD = dict(BASE, operation='GET', targets=['AE1/c1', {'ae_name': 'AE2', 'container_name': 'c2'}, 'AE3/c3'])
+
+
+def test_dashboard_skips_targets_with_odd_bodies(capsys):
+    client = load_client(generate_python_code(DASHBOARD))
+    bodies = {'AE1': {'m2m:cin': {'ri': 'cin1', 'con': '[1, 2]', 'ct': '20240101T000000'}},
+              'AE2': ['not', 'an', 'object'],
+              'AE3': {'m2m:cin': None}}
+    client['session'].get = lambda url, **kwargs: FakeResponse(200, bodies[url.split('/')[-4]])
+
+    for target in client['TARGETS']:
+        client['fetch'](target)
+    client['render'](12.0)
+
+    state = client['state']
+    assert state[('AE1', 'c1')]['con'] == '[1, 2]' and state[('AE1', 'c1')]['changed']
+    assert state[('AE2', 'c2')]['status'] == 'bad body'
+    assert state[('AE3', 'c3')]['status'] == 'bad body'
+    assert 'AE2/c2' in capsys.readouterr().out
+
+
+def test_dashboard_reads_every_target_concurrently_and_drops_atrl_on_400():
+    code = generate_python_code(DASHBOARD)
+    assert 'ThreadPoolExecutor(max_workers=MAX_WORKERS)' in code and 'pool.map(fetch, TARGETS)' in code
+    client = load_client(code)
+    assert client['TARGETS'] == [('AE1', 'c1'), ('AE2', 'c2'), ('AE3', 'c3')]
+
+    calls = []
+
+    def get(url, params=None, **kwargs):
+        calls.append(params)
+        if params:
+            return FakeResponse(400, {})
+        return FakeResponse(200, {'m2m:cin': {'ri': 'r', 'con': 'x', 'ct': 't'}})
+
+    client['session'].get = get
+    client['fetch'](('AE1', 'c1'))
+    client['fetch'](('AE1', 'c1'))
+    assert calls == [{'atrl': 'con ct ri'}, None, None]
+    assert client['state'][('AE1', 'c1')]['changed'] is False
+
+
+# ---------- Edge aggregation ----------
+
+def test_aggregation_layout_and_parameter_overrides():
+    params = [dict(BASE['parameters'][0], aggregate={'window': 60, 'stats': ['mean', 'max']}),
+              BASE['parameters'][1], {'name': 'label', 'type': 'string', 'default': 'lab'}]
+    code = generate_python_code(dict(BASE, operation='POST', parameters=params,
+                                     aggregation={'enabled': True, 'sample_rate': 5, 'window': 30}))
+    client = load_client(code)
+    assert client['SAMPLE_RATE_HZ'] == 5
+    assert client['PARAMETERS'][0] == ('temperature', 60, ['mean', 'max'])
+    assert client['PARAMETERS'][1] == ('door', 30, ['mean', 'min', 'max', 'count'])
+    assert client['PARAMETERS'][2][0] == 'label' and not client['PARAMETERS'][2][1]
+    assert ('# con layout: ["epoch", "temperature_mean", "temperature_max", "door_mean", "door_min", '
+            '"door_max", "door_count", "label_last"]') in code
+
+
+def test_ring_window_keeps_only_its_trailing_window():
+    client = load_client(generate_python_code(dict(BASE, operation='POST',
+                                                   aggregation={'enabled': True, 'sample_rate': 2, 'window': 2})))
+    window = client['RingWindow'](2)
+    assert window.size == 4
+    assert window.stats(100.0, ['mean', 'count']) == [None, 0]
+    for i, value in enumerate([1.0, 2.0, 3.0, 4.0, 5.0, 6.0]):
+        window.add(100.0 + i * 0.5, value)
+    # Six samples into a four-slot ring; the two oldest were overwritten
+    assert window.stats(102.6, ['mean', 'min', 'max', 'count']) == [4.5, 3.0, 6.0, 4]
+    # ...and samples older than the window are left out
+    assert window.stats(103.1, ['mean', 'min', 'max', 'count']) == [5.0, 4.0, 6.0, 3]
+
+
+# ---------- Store-and-forward ----------
+
+def outbox_client(**store):
+    code = generate_python_code(dict(BASE, operation='POST', store_and_forward=dict(enabled=True, **store)))
+    assert 'PRAGMA journal_mode=WAL' in code and 'PRAGMA synchronous=FULL' in code
+    return load_client(code)
+
+
+def test_outbox_survives_a_restart(tmp_path):
+    client = outbox_client(path='outbox.db', max_rate=50)
+    assert client['OUTBOX_PATH'] == 'outbox.db' and client['MAX_POSTS_PER_S'] == 50
+    path = str(tmp_path / 'outbox.db')
+    outbox = client['Outbox'](path)
+    for i in range(3):
+        outbox.append(f'[{i}]')
+    first_id = outbox.pending()[0][0]
+    outbox.ack(first_id)
+
+    reopened = client['Outbox'](path)
+    assert [con for _, con in reopened.pending()] == ['[1]', '[2]']
+    assert reopened.depth() == 2
+
+
+def test_sender_drains_in_order_drops_rejects_and_retries(tmp_path):
+    client = outbox_client(max_rate=1000)
+    statuses = [201, 400, 503, None, 201, 201]
+    posted = []
+
+    class Session:
+        def post(self, url, json=None, **kwargs):
+            posted.append(json['m2m:cin']['con'])
+            status = statuses.pop(0)
+            if status is None:
+                raise requests.exceptions.ConnectionError('down')
+            return SimpleNamespace(status_code=status)
+
+    client['requests'] = SimpleNamespace(Session=Session, exceptions=requests.exceptions)
+    client['backoff_delay'] = lambda failures: 0.01
+    outbox = client['Outbox'](str(tmp_path / 'outbox.db'))
+    for con in ['a', 'b', 'c', 'd']:
+        outbox.append(con)
+
+    threading.Thread(target=client['sender'], args=(outbox,), daemon=True).start()
+    deadline = time.monotonic() + 5
+    while outbox.depth() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert outbox.depth() == 0
+    # 'b' is rejected for good; 'c' is retried until the CSE takes it
+    assert posted == ['a', 'b', 'c', 'c', 'c', 'd']
+
+
+# ---------- Schedule ----------
+
+def schedule_client(**schedule):
+    # The plain GET/POST clients loop at module level; the outbox client has a main()
+    return load_client(generate_python_code(dict(BASE, operation='POST', store_and_forward={'enabled': True},
+                                                  schedule=schedule)))
+
+def test_normalize_schedule_falls_back_on_bad_values():
+    assert normalize_schedule({}) == {'interval': 10, 'start_jitter': 10, 'backoff_base': 2,
+                                      'backoff_max': 300, 'phase': None}
+    schedule = normalize_schedule({'schedule': {'interval': 'x', 'phase': 25, 'start_jitter': -1,
+                                                'backoff_base': 0, 'backoff_max': 1}})
+    assert schedule == {'interval': 10, 'start_jitter': 10, 'backoff_base': 2, 'backoff_max': 2, 'phase': 5.0}
+
+
+def test_backoff_is_capped_with_full_jitter(monkeypatch):
+    client = schedule_client(interval=30, phase=7, start_jitter=5, backoff_base=1, backoff_max=60)
+    assert (client['INTERVAL_S'], client['PHASE_S'], client['START_JITTER_S']) == (30, 7, 5)
+    # uniform(0, cap) returns cap at the top of its range
+    monkeypatch.setattr(client['random'], 'uniform', lambda low, high: high)
+    assert [client['backoff_delay'](n) for n in (1, 2, 3, 6, 7, 20)] == [1, 2, 4, 32, 60, 60]
+    assert client['start_offset']() == 5
+
+
+# Slots fall at t = 7 (mod 30); a device on its slot waits a whole interval
+@pytest.mark.parametrize('now, expected', [(1000.0, 27.0), (1020.0, 7.0), (1026.5, 0.5), (1027.0, 30.0)])
+def test_next_slot_lands_on_the_device_phase(monkeypatch, now, expected):
+    client = schedule_client(interval=30, phase=7)
+    monkeypatch.setattr(client['time'], 'time', lambda: now)
+    assert client['next_slot_delay']() == pytest.approx(expected)
+
+
+# ---------- Retrieval ----------
+
+def get_client(**retrieval):
+    # The GET client polls at module level; load everything above that loop
+    code = generate_python_code(dict(BASE, retrieval=retrieval) if retrieval else BASE)
+    return load_client(code[:code.index('# Poll on this device')])
+
+
+def test_normalize_retrieval_always_keeps_con_and_ct():
+    assert normalize_retrieval({}) == {'attributes': ['con', 'ct', 'ri'], 'conditional': True}
+    assert normalize_retrieval({'retrieval': {'attributes': 'ri+lbl, ri', 'conditional': False}}) == {
+        'attributes': ['ri', 'lbl', 'ri', 'con', 'ct'], 'conditional': False}
+    assert normalize_retrieval({'retrieval': {'attributes': []}})['attributes'] == []
+
+
+def test_poll_url_adds_the_condition_after_the_first_cin():
+    client = get_client()
+    base = 'http://cse/AE/data/la'
+    assert client['poll_url'](base) == base + '?atrl=con+ct+ri'
+    assert client['is_new']({'ri': 'cin1', 'ct': '20240101T000000,5'})
+    assert client['poll_url'](base) == base + '?atrl=con+ct+ri&fu=2&cra=20240101T000000%2C5'
+
+    client = get_client(attributes=[], conditional=False)
+    client['is_new']({'ri': 'cin1', 'ct': '20240101T000000'})
+    assert client['poll_url'](base) == base
+
+
+def test_get_data_reports_only_new_instances(capsys):
+    client = get_client()
+    responses = [(200, {'m2m:cin': {'ri': 'cin1', 'ct': '20240101T000000', 'con': '[1]'}}),
+                 (204, None),
+                 # A CSE that ignores fu/cra sends the same instance again
+                 (200, {'m2m:cin': {'ri': 'cin1', 'ct': '20240101T000000', 'con': '[1]'}}),
+                 (200, {'m2m:cin': {'ri': 'cin2', 'ct': '20240101T000010', 'con': '[2]'}}),
+                 (503, None)]
+    urls = []
+
+    def request(method, url, **kwargs):
+        urls.append(url)
+        status, body = responses.pop(0)
+        text = json.dumps(body) if body else ''
+        return SimpleNamespace(status_code=status, reason='', headers={}, content=text.encode(), text=text)
+
+    client['requests'] = SimpleNamespace(request=request, exceptions=requests.exceptions)
+    assert [client['getData']() for _ in range(5)] == [True, True, True, True, False]
+    out = capsys.readouterr().out
+    assert out.count('con: ') == 2 and out.count('unchanged') == 2
+    assert 'cra' not in urls[0] and urls[1].endswith('&fu=2&cra=20240101T000000')
+    assert urls[4].endswith('&fu=2&cra=20240101T000010')
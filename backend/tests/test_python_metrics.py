@@ -0,0 +1,66 @@
+import itertools
+
+import pytest
+
+from controllers import generate_python_code
+from controllers.python_controller import _metrics_block, _normalize_metrics
+
+BASE = {'cse_url': 'cse.example.com', 'port': 8080, 'protocol': 'http', 'ae_name': 'AE',
+        'container_name': 'data', 'origin': 'admin:admin', 'operation': 'POST',
+        'parameters': [{'name': 'temperature', 'type': 'float', 'default': '21.5'}]}
+
+
+def variant(aggregation, store, metrics):
+    config = dict(BASE)
+    if aggregation:
+        config['aggregation'] = {'enabled': True, 'window': 10}
+    if store:
+        config['store_and_forward'] = {'enabled': True}
+    if metrics:
+        config['metrics'] = {'enabled': True, 'port': 9108}
+    return generate_python_code(config)
+
+
+@pytest.mark.parametrize('aggregation, store', list(itertools.product([False, True], repeat=2)))
+def test_every_post_variant_is_instrumented(aggregation, store):
+    code = variant(aggregation, store, metrics=True)
+    compile(code, 'client.py', 'exec')
+    assert 'requests.post(' not in code.replace('metered(requests.post, ', '')
+    assert 'session.post(' not in code.replace('metered(session.post, ', '')
+    assert code.count('metered(') >= 2  # definition + at least one call
+    assert 'import bisect\nimport http.server\n' in code
+    start = code.index('start_metrics()\n')
+    assert code.index('time.sleep(start_offset())', start) > start
+    assert code.index('# ---------- Metrics ----------') < code.index('# ---------- Scheduling ----------')
+    assert ('METRICS.queue_depth = outbox.depth' in code) == store
+
+
+@pytest.mark.parametrize('aggregation, store', list(itertools.product([False, True], repeat=2)))
+def test_disabled_metrics_leave_no_trace(aggregation, store):
+    code = variant(aggregation, store, metrics=False)
+    compile(code, 'client.py', 'exec')
+    assert 'metered' not in code and 'METRICS' not in code and 'import bisect' not in code
+
+
+def test_metrics_block_records_posts():
+    namespace = {}
+    exec('import bisect, http.server, json, threading, time\n'
+         + _metrics_block(_normalize_metrics({'metrics': {'enabled': True}})), namespace)
+
+    class Request:
+        body = b'{"m2m:cin": {}}'
+
+    class Response:
+        status_code = 201
+        request = Request()
+
+    def failing(*args, **kwargs):
+        raise OSError('unreachable')
+
+    namespace['metered'](lambda *a, **k: Response(), 'http://cse', json={})
+    with pytest.raises(OSError):
+        namespace['metered'](failing, 'http://cse')
+    snap = namespace['METRICS'].snapshot()
+    assert snap['posts'] == {'success': 1, 'http_error': 0, 'network_error': 1}
+    assert snap['bytes_sent'] == len(Request.body) and snap['in_flight'] == 0
+    assert 'onem2m_posts_total{result="success"} 1' in namespace['METRICS'].prometheus()
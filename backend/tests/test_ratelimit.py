@@ -0,0 +1,86 @@
+import pytest
+
+import app as backend
+import ratelimit
+from ratelimit import MemoryBucketStore, RateLimitedError, RateLimiter, SQLiteBucketStore, host_key
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    return MemoryBucketStore() if request.param == 'memory' else SQLiteBucketStore(str(tmp_path / 'buckets.db'))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, 'time', lambda: now[0])
+    return now
+
+
+def test_burst_then_refill(store, clock):
+    limiter = RateLimiter({'client': (60, 3)}, store)
+    for _ in range(3):
+        limiter.take({'client': '10.0.0.1'})
+    with pytest.raises(RateLimitedError) as e:
+        limiter.take({'client': '10.0.0.1'})
+    assert (e.value.scope, e.value.key) == ('client', '10.0.0.1')
+    assert e.value.retry_after == pytest.approx(1.0)
+
+    limiter.take({'client': '10.0.0.2'})  # other keys have their own bucket
+    clock[0] += 1
+    limiter.take({'client': '10.0.0.1'})
+
+
+def test_refused_request_takes_nothing(store, clock):
+    limiter = RateLimiter({'client': (60, 5), 'host': (60, 1)}, store)
+    limiter.take({'client': 'a', 'host': 'cse:80'})
+    with pytest.raises(RateLimitedError) as e:
+        limiter.take({'client': 'a', 'host': 'cse:80'})
+    assert e.value.scope == 'host'
+    assert limiter.snapshot() == {'client:a': 4.0, 'host:cse:80': 0.0}
+
+
+def test_zero_rate_disables_a_scope(store, clock):
+    limiter = RateLimiter({'client': (0, 1), 'host': (60, 1)}, store)
+    limiter.take({'client': 'a', 'host': 'cse:80'})
+    limiter.take({'client': 'a', 'host': 'other:80'})
+    assert set(limiter.snapshot()) == {'host:cse:80', 'host:other:80'}
+
+
+@pytest.mark.parametrize('cse_url', ['cse.example.com', 'CSE.Example.COM', 'http://cse.example.com',
+                                     'https://cse.example.com/', ' cse.example.com/ ',
+                                     'http://cse.example.com:9000/onem2m'])
+def test_host_key_normalizes_spellings(cse_url):
+    assert host_key(cse_url, 8080) == 'cse.example.com:8080'
+
+
+def test_host_key_keeps_unparseable_urls():
+    assert host_key('[::1', 80) == '[::1:80'
+    assert host_key(None, 80) == ':80'
+
+
+def test_spellings_of_one_host_share_a_bucket(monkeypatch):
+    limiter = RateLimiter({'host': (60, 2)})
+    monkeypatch.setattr(backend, 'rate_limiter', limiter)
+    with backend.app.test_request_context('/test-get'):
+        backend.take_test_tokens({'cse_url': 'CSE.example.com', 'port': 8080})
+        backend.take_test_tokens({'cse_url': 'http://cse.example.com/', 'port': 8080})
+        with pytest.raises(RateLimitedError):
+            backend.take_test_tokens({'cse_url': 'https://cse.example.com', 'port': 8080})
+
+
+@pytest.mark.parametrize('configured', ['', 'secret'])
+def test_resetting_buckets_requires_the_admin_token(monkeypatch, configured):
+    monkeypatch.setitem(backend.app.config, 'ADMIN_TOKEN', configured)
+    monkeypatch.setattr(backend, 'rate_limiter', RateLimiter({'client': (60, 1)}))
+    backend.rate_limiter.take({'client': '10.0.0.1'})
+    client = backend.app.test_client()
+
+    assert client.delete('/admin/rate-limits').status_code == 403
+    assert client.delete('/admin/rate-limits', headers={'X-Admin-Token': 'wrong'}).status_code == 403
+    assert list(backend.rate_limiter.snapshot()) == ['client:10.0.0.1']
+    assert client.get('/admin/rate-limits').status_code == (200 if not configured else 403)
+
+    if configured:
+        response = client.delete('/admin/rate-limits', headers={'X-Admin-Token': 'secret'})
+        assert response.status_code == 200 and response.get_json()['buckets'] == {}
@@ -0,0 +1,62 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import app as backend
+import controllers
+from controllers import TARGETS, load_generator, preload, status
+from lazy import LazyModule, lazy_import
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importing_app_defers_generators_and_requests():
+    code = ('import json, sys, app\n'
+            'print(json.dumps(sorted(m for m in sys.modules\n'
+            '                        if m == "requests" or m.startswith("controllers."))))')
+    env = dict(os.environ, PRELOAD_CONTROLLERS='')
+    result = subprocess.run([sys.executable, '-c', code], cwd=BACKEND, env=env,
+                            capture_output=True, text=True, check=True)
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == ['controllers.registry']
+
+
+def test_load_generator_and_status():
+    generator = load_generator('python')
+    assert generator is load_generator('python')
+    assert controllers.generate_python_code is generator
+    assert status()['python']['loaded'] is True
+    assert status()['python']['entry'] == 'python_controller.generate_python_code'
+    with pytest.raises(KeyError):
+        load_generator('z80')
+    with pytest.raises(AttributeError):
+        controllers.generate_z80_code
+
+
+def test_preload_names():
+    assert preload('') == []
+    assert preload(' esp32 , python ') == ['esp32', 'python']
+    assert preload('all') == list(TARGETS)
+    with pytest.raises(KeyError):
+        preload('esp32,z80')
+
+
+def test_lazy_module():
+    module = lazy_import('json')
+    assert isinstance(module, LazyModule)
+    assert module.dumps([1]) == '[1]'
+    assert module.loaded and 'loaded' in repr(module)
+    assert lazy_import('no_such_module_here', optional=True) is None
+
+
+@pytest.mark.parametrize('configured', ['', 'secret'])
+def test_preloading_requires_the_admin_token(monkeypatch, configured):
+    monkeypatch.setitem(backend.app.config, 'ADMIN_TOKEN', configured)
+    client = backend.app.test_client()
+    assert client.post('/admin/controllers?names=esp32').status_code == 403
+    assert client.get('/admin/controllers').status_code == (200 if not configured else 403)
+    if configured:
+        response = client.post('/admin/controllers?names=esp32', headers={'X-Admin-Token': 'secret'})
+        assert response.status_code == 200 and response.get_json()['controllers']['esp32']['loaded']
@@ -0,0 +1,84 @@
+import re
+
+import pytest
+
+import app as backend
+from controllers import generate_arduino_code, generate_esp32_code, generate_esp8266_code
+from controllers.utils import apply_release_profile
+
+BASE = {'cse_url': 'cse.example.com', 'port': 8443, 'protocol': 'https', 'ae_name': 'AE',
+        'container_name': 'data', 'wifi_ssid': 'ssid', 'wifi_password': 'secret', 'profile': 'release',
+        'parameters': [{'name': 'temperature', 'type': 'float', 'default': '21.5'}]}
+
+
+def serial_calls(code):
+    """Serial.* calls outside the LOG_* macro definitions, Serial.begin aside"""
+    body = '\n'.join(line for line in code.split('\n') if not line.startswith('#define'))
+    return re.findall(r'Serial\.(?!begin)\w+\(', body)
+
+
+@pytest.mark.parametrize('generate, config', [
+    (generate_arduino_code, {}),
+    (generate_esp32_code, {}),
+    (generate_esp32_code, {'freertos': {'enabled': True}}),
+    (generate_esp8266_code, {}),
+    (generate_esp8266_code, {'protocol': 'http', 'port': 8080}),
+])
+def test_release_sketches_print_only_through_macros(generate, config):
+    code, report = generate.build(dict(BASE, **config))
+    assert serial_calls(code) == []
+    assert 'F("' in code
+    assert '✅' not in code and '❌' not in code
+    assert report['compiled_out'] > 0
+    assert generate(dict(BASE, **config)) == code
+
+
+def test_generators_return_plain_strings():
+    code = generate_esp32_code(BASE)
+    assert type(code) is str and code.startswith('/*\n * Release profile')
+    code, report = generate_esp32_code.build(dict(BASE, profile='debug'))
+    assert type(code) is str and report is None
+
+
+def test_esp8266_heap_report_format_moves_to_flash():
+    code = generate_esp8266_code(dict(BASE))
+    assert 'LOG_INFOF(PSTR("[heap] %s:' in code
+    assert '#define LOG_INFOF(...)   Serial.printf_P(__VA_ARGS__)' in code
+    assert 'LOG_INFOLN(rx == 16384 ? F(" B (server does not support MFLN)") : F(" B (MFLN)"));' in code
+
+
+def test_esp32_freertos_status_line_is_compiled_out():
+    code = generate_esp32_code(dict(BASE, freertos={'enabled': True}))
+    assert 'LOG_INFOF("Posted %u readings' in code
+    assert 'PSTR(' not in code
+
+
+def test_multi_line_calls_and_body_prints():
+    sketch = ('#include <Arduino.h>\n'
+              'void loop() {\n'
+              '  Serial.println(\n'
+              '      "Connection lost");  // retry below\n'
+              '  Serial.print("a, (b)");\n'
+              '  Serial.println(payload);\n'
+              '  Serial.print(value, HEX);\n'
+              '  Serial.println(String("id=") + id);\n'
+              '}\n')
+    code, report = apply_release_profile(sketch, literals_in_ram=True)
+    assert '  LOG_ERRORLN(F("Connection lost"));  // retry below\n' in code
+    assert '  LOG_INFO(F("a, (b)"));\n' in code
+    assert 'payload' not in code
+    assert '  LOG_INFO(value, HEX);\n' in code
+    assert '  LOG_INFOLN(String("id=") + id);\n' in code
+    assert report == {'log_level': 1, 'compiled_out': 3, 'removed': 1, 'kept_in_flash': 1,
+                      'ram_saved': 16 + 7, 'flash_saved': 4 * 12 + 7}
+    assert f"~{report['ram_saved']} B RAM, ~{report['flash_saved']} B flash" in code
+
+
+def test_generate_returns_release_report():
+    response = backend.app.test_client().post('/generate', json=dict(BASE, controller='esp8266'))
+    assert response.status_code == 200
+    report = response.get_json()['release_report']
+    assert report['ram_saved'] > 0 and report['flash_saved'] > 0
+
+    response = backend.app.test_client().post('/generate', json=dict(BASE, controller='esp8266', profile='debug'))
+    assert 'release_report' not in response.get_json()
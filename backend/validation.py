@@ -0,0 +1,44 @@
+"""
+Config validation shared by the web routes, fleet jobs and the fleet CLI.
+
+Importing this module has no side effects, so worker processes can use it
+without starting the Flask app.
+"""
+import re
+
+from controllers import TARGETS
+
+
+def validate_request_config(data, controller):
+    """Validate incoming config for URL/port and platform rules.
+
+    Returns (True, None) or (False, message)
+    """
+    cse = (data.get('cse_url') or '').strip()
+    port = data.get('port')
+    protocol = data.get('protocol', 'https').lower()
+
+    if not cse:
+        return False, 'CSE host is required.'
+
+    if re.match(r'^https?://', cse, re.IGNORECASE):
+        return False, 'CSE host should not include a protocol (enter host only).'
+
+    try:
+        p = int(port)
+        if not (1 <= p <= 65535):
+            return False, 'Port must be between 1 and 65535.'
+    except Exception:
+        return False, 'Port must be an integer.'
+    
+    # Validate protocol
+    if protocol not in ('http', 'https'):
+        return False, 'Protocol must be either http or https.'
+    
+    data['protocol'] = protocol  # Ensure protocol is in data for generators to use
+
+    if controller in TARGETS and TARGETS[controller].microcontroller:
+        if cse.lower() in ('localhost', '127.0.0.1', '::1'):
+            return False, 'Localhost is not allowed for microcontroller targets.'
+
+    return True, None